@@ -0,0 +1,131 @@
+# local imports
+from lib.bot_funcs.coordination_manager import CoordinationManager, StockSignal
+# other imports
+import argparse, multiprocessing, os, statistics, tempfile, time
+
+
+# processes are spawned like the race workers so nothing is shared but the database and the sockets
+CONTEXT = multiprocessing.get_context('spawn')
+# first udp port of the nodes (node i listens on BASE_PORT + i)
+BASE_PORT = 47200
+
+
+def node(index:int, nodes:int, directory:str, accounts:list, account_limit:int, global_limit:int, transport:str, signals:int, ready:object, start:object, results:object) -> None:
+    """
+    Purpose - One bot node that leases an account, waits for stock signals and then tries to buy twice on its own account and once on every other account
+
+    Param - index: Node number (node 0 sees the stock first)
+
+    Param - nodes: Number of nodes
+
+    Param - directory: Directory of the database and unix sockets
+
+    Param - accounts: Account names shared by every node
+
+    Param - account_limit: Purchases per account
+
+    Param - global_limit: Purchases over every account
+
+    Param - transport: 'unix' or 'udp'
+
+    Param - signals: Number of stock signals node 0 sends
+
+    Param - ready: Queue the node reports it is listening on
+
+    Param - start: Event set once every node is listening
+
+    Param - results: Queue for the node results
+    """
+    node_id = f'node-{index}'
+    if transport == 'udp':
+        signal = StockSignal(node_id, BASE_PORT + index, [f'127.0.0.1:{BASE_PORT + peer}' for peer in range(nodes) if peer != index])
+    else:
+        signal = StockSignal(node_id, socket_dir=directory)
+    coordination = CoordinationManager(os.path.join(directory, 'coordination.db'), node_id, lease_seconds=30.0, account_limit=account_limit, global_limit=global_limit, signal=signal)
+    # lease an account (nodes past the number of accounts get none)
+    account = coordination.next_account(accounts)
+    ready.put(index)
+    start.wait()
+    # stock signal latency
+    latencies = []
+    if index == 0:
+        for _ in range(signals):
+            coordination.signal.send('http://127.0.0.1/product/4295', ['4gb'])
+            time.sleep(.02)
+    else:
+        for _ in range(signals):
+            sighting = coordination.signal.wait(5.0)
+            if sighting:
+                latencies.append(time.time() - sighting['ts'])
+    # everyone races to buy, twice on the leased account and once on every account it does not own
+    bought, stolen = 0, 0
+    for target in ([account, account] if account else []) + [other for other in accounts if other != account]:
+        ledger_id = coordination.reserve(target, 'http://127.0.0.1/product/4295', '4gb')
+        if ledger_id is None:
+            continue
+        coordination.commit(ledger_id)
+        if target == account:
+            bought += 1
+        else:
+            stolen += 1
+    results.put({'node':node_id, 'account':account, 'latencies':latencies, 'bought':bought, 'stolen':stolen})
+    coordination.signal.close()
+
+
+def run(nodes:int=4, accounts:int=3, account_limit:int=1, global_limit:int=None, transport:str='unix', signals:int=20) -> dict:
+    """
+    Purpose - Runs several nodes as processes on one host against one coordination database, returns signal latency and what each node bought
+
+    Param - nodes: Number of node processes
+
+    Param - accounts: Number of shared accounts
+
+    Param - account_limit: Purchases per account
+
+    Param - global_limit: Purchases over every account (None is unlimited)
+
+    Param - transport: 'unix' or 'udp'
+
+    Param - signals: Number of stock signals node 0 sends
+    """
+    account_names = [f'account_{number}' for number in range(accounts)]
+    with tempfile.TemporaryDirectory() as directory:
+        ready, results, start = CONTEXT.Queue(), CONTEXT.Queue(), CONTEXT.Event()
+        processes = [CONTEXT.Process(target=node, args=(index, nodes, directory, account_names, account_limit, global_limit, transport, signals, ready, start, results)) for index in range(nodes)]
+        for process in processes:
+            process.start()
+        # wait until every node is listening
+        for _ in processes:
+            ready.get(timeout=30)
+        start.set()
+        node_results = sorted([results.get(timeout=60) for _ in processes], key=lambda result: result['node'])
+        for process in processes:
+            process.join()
+        purchases = CoordinationManager(os.path.join(directory, 'coordination.db'), 'bench').purchases()
+    latencies = sorted(latency for result in node_results for latency in result['latencies'])
+    per_account = {account:sum(1 for purchase in purchases if purchase[2] == account) for account in account_names}
+    return {
+        'nodes' : nodes,
+        'transport' : transport,
+        'leases' : {result['node']:result['account'] for result in node_results},
+        'signals_received' : f'{len(latencies)}/{signals * (nodes - 1)}',
+        'signal_p50_us' : statistics.median(latencies) * 1000000 if latencies else None,
+        'signal_max_us' : latencies[-1] * 1000000 if latencies else None,
+        'purchases' : len(purchases),
+        'purchases_per_account' : per_account,
+        'purchases_on_unleased_accounts' : sum(result['stolen'] for result in node_results),
+        'double_buys' : sum(1 for count in per_account.values() if count > account_limit),
+    }
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Benchmark multi node coordination with node processes on one host')
+    arg_parser.add_argument('--nodes', type=int, default=4)
+    arg_parser.add_argument('--accounts', type=int, default=3)
+    arg_parser.add_argument('--account-limit', type=int, default=1)
+    arg_parser.add_argument('--global-limit', type=int, default=None)
+    arg_parser.add_argument('--transport', choices=['unix', 'udp'], default='unix')
+    arg_parser.add_argument('--signals', type=int, default=20)
+    args = arg_parser.parse_args()
+    for key, value in run(args.nodes, args.accounts, args.account_limit, args.global_limit, args.transport, args.signals).items():
+        print(f'{key}: {value}')
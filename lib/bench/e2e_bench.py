@@ -0,0 +1,169 @@
+# local imports
+from lib.funcs import *
+from lib.bench.fake_site import FakeSite
+# other imports
+import argparse, json, statistics, sys, tempfile, time, types
+
+
+# benchmark results
+RESULTS_PATH = convert_path_os('data/bench/')
+# account used against the fake site (the otp secret is a throwaway base32 string)
+BENCH_ACCOUNT = {
+    'login_info' : {'username':'bench@example.com', 'password':'bench-password', 'otp':'JBSWY3DPEHPK3PXP'},
+    'checkout_info' : {'name':'Bench Bot', 'address':'1 Bench Street', 'additional_address':'', 'city':'Benchville', 'state':'Texas', 'postal_code':'75001', 'phone_number':'5555550100'},
+}
+# variant that is flipped in stock (the testing state product type)
+BENCH_VARIANT = ('9000', 'PCB Antenna - Stacking Headers')
+
+
+def use_bench_config(site:FakeSite) -> dict:
+    """
+    Purpose - Points the bot config at the fake site (the real config is only changed in memory)
+
+    Param - site: The running fake site
+    """
+    try:
+        from lib.config import config
+    # no config.py yet, the benchmark does not need one
+    except ImportError:
+        config = {}
+        sys.modules['lib.config'] = types.ModuleType('lib.config')
+        sys.modules['lib.config'].config = config
+    driver_path = config.get('selenium', {}).get('driver_path', '')
+    config.clear()
+    config.update({
+        'selenium' : {'driver_path':driver_path, 'url':site.product_url, 'pool_size':0},
+        'ada_fruit_accounts' : {'bench':BENCH_ACCOUNT},
+    })
+    return config
+
+
+def summarize(values:list) -> dict:
+    """
+    Purpose - Summarizes a list of seconds as ms stats
+
+    Param - values: List of seconds
+    """
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        'n' : len(values),
+        'mean_ms' : statistics.mean(values) * 1000,
+        'p50_ms' : values[len(values) // 2] * 1000,
+        'p95_ms' : values[min(len(values) - 1, int(len(values) * .95))] * 1000,
+        'max_ms' : values[-1] * 1000,
+    }
+
+
+def run(polls:int=20, rounds:int=3, prestage:bool=False) -> dict:
+    """
+    Purpose - Runs AdaFruitManager end to end in testing state against the fake site with headless chromium and returns timing stats
+
+    Param - polls: Out of stock polls to time per round
+
+    Param - rounds: Number of times stock is flipped in and checked out
+
+    Param - prestage: Stage the address in a checkout tab before stock appears
+    """
+    # fake site with the testing state variant
+    site = FakeSite(product_name='Adafruit Bench Product', variants=[('8999','uFL Connector - Stacking Headers'), BENCH_VARIANT]).start()
+    use_bench_config(site)
+    # imported after the config points at the fake site
+    from lib.web_funcs.ada_fruit_manager import AdaFruitManager
+    from lib.web_funcs.session_manager import SessionManager
+    from lib.bot_funcs.history_manager import HistoryManager
+    timings = {'startup':[], 'sign_in':[], 'poll':[], 'detection_to_cart':[], 'cart_to_submit':[], 'detection_to_submit':[]}
+    ada_fruit_manager = None
+    try:
+        with tempfile.TemporaryDirectory() as temp_path:
+            # launch browser
+            start = time.perf_counter()
+            ada_fruit_manager = AdaFruitManager(OS_TYPE, True)
+            timings['startup'].append(time.perf_counter() - start)
+            # keep sessions and history out of the real data directory
+            ada_fruit_manager.session_manager = ada_fruit_manager.login_manager.session_manager = SessionManager(temp_path)
+            ada_fruit_manager.history.close()
+            ada_fruit_manager.history = HistoryManager(os.path.join(temp_path, 'history.db'))
+            ada_fruit_manager.prestage = prestage
+            # sign in with otp
+            start = time.perf_counter()
+            ada_fruit_manager.sign_in()
+            timings['sign_in'].append(time.perf_counter() - start)
+            for _ in range(rounds):
+                # empty cart and out of stock page
+                site.set_stock(BENCH_VARIANT[0], False)
+                ada_fruit_manager.cart_cleared = False
+                ada_fruit_manager.parser.set_page(site.product_url)
+                ada_fruit_manager.clear_cart()
+                # address entry while waiting
+                if prestage:
+                    assert ada_fruit_manager.prestage_checkout()
+                # out of stock polls (refresh and scan)
+                for _ in range(polls):
+                    start = time.perf_counter()
+                    ada_fruit_manager.parser.refresh_page()
+                    assert not ada_fruit_manager.get_products()
+                    timings['poll'].append(time.perf_counter() - start)
+                # stock appears, time the poll that sees it through carting the item
+                site.set_stock(BENCH_VARIANT[0], True)
+                start = time.perf_counter()
+                ada_fruit_manager.parser.refresh_page()
+                assert ada_fruit_manager.check_for_product_variants()
+                timings['detection_to_cart'].append(time.perf_counter() - start)
+                # checkout up to the submit button (testing state does not click it)
+                start = time.perf_counter()
+                ada_fruit_manager.checkout()
+                timings['cart_to_submit'].append(time.perf_counter() - start)
+                timings['detection_to_submit'].append(ada_fruit_manager.last_detection_to_submit)
+    finally:
+        if ada_fruit_manager:
+            ada_fruit_manager.parser.quit()
+        site.stop()
+    return {
+        'time' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'mode' : 'staged' if prestage else 'full',
+        'polls_per_round' : polls,
+        'rounds' : rounds,
+        'commands_per_poll' : ada_fruit_manager.poll_command_count if ada_fruit_manager else None,
+        'unchanged_hit_rate' : ada_fruit_manager.change_detector.hit_rate if ada_fruit_manager and ada_fruit_manager.change_detector else None,
+        'waits' : {step:{'n':count, 'mean_ms':mean_ms, 'timeouts':timeouts} for step, (count, mean_ms, timeouts) in ada_fruit_manager.parser.wait_policy.summary().items()} if ada_fruit_manager else {},
+        **{name:summarize(values) for name, values in timings.items()},
+    }
+
+
+def compare(results:dict, baseline:dict) -> str:
+    """
+    Purpose - Formats the mean change of every timing against a baseline run
+
+    Param - results: Results of this run
+
+    Param - baseline: Results of an earlier run
+    """
+    lines = []
+    for name, stats in results.items():
+        if isinstance(stats, dict) and stats.get('mean_ms') and isinstance(baseline.get(name), dict) and baseline[name].get('mean_ms'):
+            change = (stats['mean_ms'] - baseline[name]['mean_ms']) / baseline[name]['mean_ms'] * 100
+            lines.append(f"{name:<20} {baseline[name]['mean_ms']:>10.1f} ms -> {stats['mean_ms']:>10.1f} ms  ({change:+.1f}%)")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Benchmark poll, detection to cart and cart to submit latency against a local fake Adafruit site')
+    arg_parser.add_argument('--polls', type=int, default=20)
+    arg_parser.add_argument('--rounds', type=int, default=3)
+    arg_parser.add_argument('--prestage', action='store_true', help='stage the address in a checkout tab before stock appears')
+    arg_parser.add_argument('--compare', default=None, help='results json of an earlier run to compare against')
+    args = arg_parser.parse_args()
+    results = run(args.polls, args.rounds, args.prestage)
+    # save results
+    os.makedirs(RESULTS_PATH, exist_ok=True)
+    results_file = os.path.join(RESULTS_PATH, f"e2e_{results['time'].replace(':', '')}.json")
+    with open(results_file, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(json.dumps(results, indent=4))
+    print(f'Saved to {results_file}')
+    # compare with an earlier run
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(results, json.load(f)))
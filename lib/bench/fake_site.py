@@ -0,0 +1,251 @@
+# local imports
+from lib.bench.fixture_server import FixtureServer
+# other imports
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import html, uuid
+
+
+# page shell shared by every page
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>{title} : Adafruit Industries</title></head>
+<body>
+<header id="site-header">
+  <div id="nav_account"><div onclick="location.href='/shopping_cart'">My Cart</div>{account}</div>
+  <a class="cart" href="/shopping_cart"><span class="cart-count">{cart_count}</span></a>
+</header>
+<main>
+{body}
+</main>
+</body>
+</html>
+"""
+# nav when signed out / signed in
+SIGNED_OUT_NAV = """<span onclick="location.href='/users/sign_in'">Sign In</span>"""
+SIGNED_IN_NAV = """<div class="account-dropdown dropdown"><span>Account</span>
+  <div class="dropdown-container"><ul><li><a href="/account">Account</a></li><li><a href="/users/sign_out">Sign Out</a></li></ul></div>
+</div>"""
+# product page
+PRODUCT_BODY = """<div id="prod-left-side"><img src="/images/{pid}.jpg" alt="{name}"></div>
+<div id="prod-right-side">
+  <h1 class="products_name">{name}</h1>
+  <div class="meta_pid_boxes">
+{options}
+  </div>
+  <div id="prod-stock"><button id="prod-add-btn" type="button" onclick="location.href='/cart/add?pid=' + (document.querySelector('.option_selected') || document.querySelector('.top_10enabled')).dataset.pid">Add to Cart</button></div>
+</div>
+<script>
+document.querySelectorAll('.top_10enabled').forEach(function (option) {{
+  option.addEventListener('click', function () {{
+    document.querySelectorAll('.top_10enabled').forEach(function (other) {{ other.classList.remove('option_selected'); }});
+    option.classList.add('option_selected');
+  }});
+}});
+</script>"""
+OPTION = """    <div class="top_10enabled" data-pid="{pid}"><span class="option_name">{name}</span><span class="option_meta">{stock}</span></div>"""
+# sign in and otp pages
+SIGN_IN_BODY = """<form id="new_user" action="/users/sign_in/submit" method="get">
+  <p><input type="text" id="user_login" name="login"></p>
+  <p><input type="password" id="user_password" name="password"></p>
+  <p><input type="submit" value="Sign In"></p>
+</form>"""
+OTP_BODY = """{alert}<form id="edit_user" action="/users/otp/submit" method="get">
+  <p><input type="text" id="user_otp_attempt" name="otp"></p>
+  <p><input type="submit" value="Verify"></p>
+</form>"""
+OTP_ALERT = """<div class="alert alert-danger alert-dismissable">Invalid two-factor code.</div>"""
+# cart page
+CART_BODY = """<div id="cart">
+{items}
+  <div class="mobile-button-row" onclick="location.href='/checkout'">Checkout</div>
+</div>"""
+CART_ITEM = """  <div class="cart-item">{name}<span class="cart-fake-button" onclick="location.href='/cart/remove?index={index}'">Delete</span></div>"""
+# checkout steps
+DELIVERY_BODY = """<form action="/checkout/address" method="get">
+  <input type="text" id="delivery_name" name="name">
+  <input type="text" id="delivery_address1" name="address1">
+  <input type="text" id="delivery_address2" name="address2">
+  <input type="text" id="delivery_city" name="city">
+  <select id="delivery_state_dropdown" name="state"><option value="">Select</option>{states}</select>
+  <input type="text" id="delivery_postcode" name="postcode">
+  <input type="tel" id="delivery_phone" name="phone">
+  <button type="submit" class="blue-button sg-button savecontinueblue">Save &amp; Continue</button>
+</form>"""
+VALIDATE_BODY = """<p>We could not verify this address.</p>
+<button type="button" class="blue-button sg-button savecontinueblue" onclick="location.href='/checkout/shipping'">Use Address as Entered</button>"""
+SHIPPING_BODY = """<form action="/checkout/payment" method="get">
+{options}
+  <button type="submit" class="blue-button sg-button savecontinueblue">Save &amp; Continue</button>
+</form>"""
+SHIPPING_OPTION = """  <input type="radio" name="shipping" id="{label_id}" value="{label_id}"><label for="{label_id}" class="checkboxLabel sg-label checkout-shipping-method-label">{carrier}: ${price}</label>"""
+PAYMENT_BODY = """<p>Card ending in 4242</p>
+<button type="button" class="blue-button sg-button savecontinueblue" onclick="location.href='/checkout/review'">Save &amp; Continue</button>"""
+REVIEW_BODY = """<button type="button" class="sg-button green-button bold submitOrder" onclick="location.href='/checkout/complete'">Submit Order</button>"""
+COMPLETE_BODY = """<h1>Thank you for your order!</h1>"""
+# default shipping options (label id, carrier, price)
+SHIPPING_OPTIONS = [('shipping_usps_first', 'USPS First Class', '4.50'), ('shipping_usps_priority', 'USPS Priority', '9.50'), ('shipping_ups_ground', 'UPS Ground', '12.25')]
+STATES = ['New York', 'Pennsylvania', 'Texas']
+
+
+class FakeSite(FixtureServer):
+    """
+    Purpose - A local stand-in for every Adafruit page the bot touches (product, sign in with OTP, cart and checkout) with per cookie session state
+    """
+    def __init__(self, product_name:str='Raspberry Pi 4 Model B', variants:list=[('4292','1GB'),('4295','2GB'),('4296','4GB'),('4564','8GB')], product_id:str='4295', host:str='127.0.0.1', port:int=0) -> None:
+        super().__init__({}, host, port, conditional=False)
+        # product on the fake product page
+        self.product_name = product_name
+        self.product_id = product_id
+        # variant pid -> name and the pids that are in stock
+        self.variants = dict(variants)
+        self.in_stock = set()
+        # session id -> state
+        self.sessions = {}
+        # orders submitted
+        self.orders = []
+        # if the next otp attempt should fail
+        self.fail_next_otp = False
+
+    @property
+    def product_url(self) -> str:
+        """
+        Purpose - Url of the fake product page
+        """
+        return f'{self.url}/product/{self.product_id}'
+
+    def set_stock(self, pid:str, in_stock:bool) -> None:
+        """
+        Purpose - Flips a variant in or out of stock
+
+        Param - pid: Variant pid
+
+        Param - in_stock: If the variant is in stock
+        """
+        (self.in_stock.add if in_stock else self.in_stock.discard)(pid)
+
+    """ ------------------------------------------ Request Methods ------------------------------------------------ """
+    def handle(self, request:BaseHTTPRequestHandler) -> None:
+        """
+        Purpose - Routes a request to a page of the fake site
+
+        Param - request: The request handler
+        """
+        url = urlparse(request.path)
+        query = {key:values[0] for key, values in parse_qs(url.query).items()}
+        self.hits[url.path] = self.hits.get(url.path, 0) + 1
+        # session from cookie
+        session_id = None
+        for cookie in request.headers.get('Cookie', '').split(';'):
+            name, _, value = cookie.strip().partition('=')
+            if name == 'fake_session' and value in self.sessions:
+                session_id = value
+        new_session = session_id is None
+        if new_session:
+            session_id = uuid.uuid4().hex
+            self.sessions[session_id] = {'logged_in':False, 'otp_pending':False, 'cart':[], 'address':None, 'order':{}}
+        session = self.sessions[session_id]
+        # route
+        page = self.route(url.path, query, session)
+        # redirect
+        if page.startswith('redirect:'):
+            request.send_response(302)
+            request.send_header('Location', page[len('redirect:'):])
+            request.send_header('Content-Length', '0')
+        # page
+        else:
+            body = page.encode()
+            request.send_response(404 if page == '' else 200)
+            request.send_header('Content-Type', 'text/html; charset=utf-8')
+            request.send_header('Content-Length', str(len(body)))
+        if new_session:
+            request.send_header('Set-Cookie', f'fake_session={session_id}; Path=/')
+        request.end_headers()
+        if not page.startswith('redirect:'):
+            request.wfile.write(body)
+
+    def render(self, title:str, body:str, session:dict) -> str:
+        """
+        Purpose - Renders a page inside the site shell
+
+        Param - title: Page title
+
+        Param - body: Page body html
+
+        Param - session: The session state
+        """
+        return PAGE.format(title=title, body=body, account=SIGNED_IN_NAV if session['logged_in'] else SIGNED_OUT_NAV, cart_count=len(session['cart']))
+
+    def route(self, path:str, query:dict, session:dict) -> str:
+        """
+        Purpose - Returns the html of a path or 'redirect:<location>'
+
+        Param - path: Url path
+
+        Param - query: Query parameters
+
+        Param - session: The session state
+        """
+        # product page
+        if path == f'/product/{self.product_id}':
+            options = '\n'.join(OPTION.format(pid=pid, name=html.escape(name), stock='In stock' if pid in self.in_stock else 'Out of stock') for pid, name in self.variants.items())
+            return self.render(self.product_name, PRODUCT_BODY.format(pid=self.product_id, name=html.escape(self.product_name), options=options), session)
+        # sign in
+        if path == '/users/sign_in':
+            return self.render('Sign In', SIGN_IN_BODY, session)
+        if path == '/users/sign_in/submit':
+            session['otp_pending'] = bool(query.get('login') and query.get('password'))
+            return 'redirect:/users/otp' if session['otp_pending'] else 'redirect:/users/sign_in'
+        if path == '/users/otp':
+            return self.render('Two Factor', OTP_BODY.format(alert=''), session)
+        if path == '/users/otp/submit':
+            # failed otp stays on the otp page with an alert
+            if self.fail_next_otp or not (session['otp_pending'] and len(query.get('otp', '')) == 6):
+                self.fail_next_otp = False
+                return self.render('Two Factor', OTP_BODY.format(alert=OTP_ALERT), session)
+            session['logged_in'], session['otp_pending'] = True, False
+            return f'redirect:/product/{self.product_id}'
+        if path == '/users/sign_out':
+            session['logged_in'] = False
+            return f'redirect:/product/{self.product_id}'
+        # cart
+        if path == '/cart/add':
+            if query.get('pid') in self.in_stock:
+                session['cart'].append(query['pid'])
+            return f'redirect:/product/{self.product_id}'
+        if path == '/cart/remove':
+            index = int(query.get('index', 0))
+            if index < len(session['cart']):
+                session['cart'].pop(index)
+            return 'redirect:/shopping_cart'
+        if path == '/shopping_cart':
+            items = '\n'.join(CART_ITEM.format(name=html.escape(self.variants.get(pid, pid)), index=index) for index, pid in enumerate(session['cart']))
+            return self.render('Shopping Cart', CART_BODY.format(items=items), session)
+        # checkout steps
+        if path == '/checkout':
+            # a checkout that already has an address goes straight to shipping
+            if session['cart'] and session['address']:
+                return 'redirect:/checkout/shipping'
+            # signed in accounts can enter an address before anything is in the cart
+            if not session['cart'] and not session['logged_in']:
+                return 'redirect:/shopping_cart'
+            states = ''.join(f'<option value="{html.escape(state)}">{html.escape(state)}</option>' for state in STATES)
+            return self.render('Checkout', DELIVERY_BODY.format(states=states), session)
+        if path == '/checkout/address':
+            session['address'] = query
+            return self.render('Checkout', VALIDATE_BODY, session)
+        if path == '/checkout/shipping':
+            if not session['cart']:
+                return 'redirect:/shopping_cart'
+            options = '\n'.join(SHIPPING_OPTION.format(label_id=label_id, carrier=carrier, price=price) for label_id, carrier, price in SHIPPING_OPTIONS)
+            return self.render('Checkout', SHIPPING_BODY.format(options=options), session)
+        if path == '/checkout/payment':
+            session['order']['shipping'] = query.get('shipping')
+            return self.render('Checkout', PAYMENT_BODY, session)
+        if path == '/checkout/review':
+            return self.render('Checkout', REVIEW_BODY, session)
+        if path == '/checkout/complete':
+            self.orders.append({'cart':list(session['cart']), 'address':session['address'], **session['order']})
+            session['cart'], session['order'] = [], {}
+            return self.render('Order Complete', COMPLETE_BODY, session)
+        return ''
@@ -0,0 +1,131 @@
+# local imports
+from lib.funcs import *
+# other imports
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from email.utils import formatdate
+import threading, time, zlib
+
+
+# recorded pages
+FIXTURE_PATH = convert_path_os('data/fixtures/')
+
+
+def load_fixture(file_name:str) -> bytes:
+    """
+    Purpose - Loads a recorded page from the fixture directory
+
+    Param - file_name: Name of the fixture file
+    """
+    with open(os.path.join(FIXTURE_PATH, file_name), 'rb') as f:
+        return f.read()
+
+
+class FixtureServer:
+    """
+    Purpose - A local stand-in server that serves recorded pages from memory on a background thread
+    """
+    def __init__(self, routes:dict={}, host:str='127.0.0.1', port:int=0, conditional:bool=True, latency:float=0.0) -> None:
+        # url path -> (page bytes, etag, last modified)
+        self.routes = {}
+        [self.set_route(path, body) for path, body in routes.items()]
+        # answer conditional requests with 304 not modified
+        self.conditional = conditional
+        # seconds to wait before answering (simulates a remote server)
+        self.latency = latency
+        # request and not modified count per path
+        self.hits = {}
+        self.not_modified = {}
+        # build handler bound to this server
+        fixture_server = self
+        class Handler(BaseHTTPRequestHandler):
+            # keep alive so pooled clients reuse the connection
+            protocol_version = 'HTTP/1.1'
+            # send small responses right away
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:
+                fixture_server.handle(self)
+
+            def do_POST(self) -> None:
+                # form posts get the same pages (the body is read so the connection can be reused)
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                fixture_server.handle(self)
+
+            def log_message(self, format:str, *args) -> None:
+                pass
+        # http server
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        """
+        Purpose - Base url of the server
+        """
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def set_route(self, path:str, body:bytes) -> None:
+        """
+        Purpose - Sets (or swaps) the page served on a path
+
+        Param - path: Url path
+
+        Param - body: Page bytes
+        """
+        self.routes[path] = (body, f'"{zlib.crc32(body):08x}"', formatdate(usegmt=True))
+
+    def handle(self, request:BaseHTTPRequestHandler) -> None:
+        """
+        Purpose - Serves a route for the request handler
+
+        Param - request: The request handler
+        """
+        # strip query string
+        path = request.path.split('?')[0]
+        self.hits[path] = self.hits.get(path, 0) + 1
+        route = self.routes.get(path)
+        # simulated latency
+        if self.latency:
+            time.sleep(self.latency)
+        # unknown route
+        if route is None:
+            request.send_response(404)
+            request.send_header('Content-Length', '0')
+            request.end_headers()
+            return
+        body, etag, last_modified = route
+        # page not modified since the client last saw it (etag takes precedence over the date)
+        if_none_match = request.headers.get('If-None-Match')
+        not_modified = if_none_match == etag if if_none_match else request.headers.get('If-Modified-Since') == last_modified
+        if self.conditional and not_modified:
+            self.not_modified[path] = self.not_modified.get(path, 0) + 1
+            request.send_response(304)
+            request.send_header('ETag', etag)
+            request.end_headers()
+            return
+        # send page
+        request.send_response(200)
+        request.send_header('Content-Type', 'text/html; charset=utf-8')
+        if self.conditional:
+            request.send_header('ETag', etag)
+            request.send_header('Last-Modified', last_modified)
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def start(self) -> 'FixtureServer':
+        """
+        Purpose - Starts serving on a daemon thread
+        """
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Purpose - Stops the server
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,55 @@
+# local imports
+from lib.bench.smtp_server import SmtpServer
+from lib.bot_funcs.notification_manager import NotificationManager, SmtpSink
+# other imports
+import argparse, statistics, time
+
+
+def run(errors:int=100, failures:int=2) -> dict:
+    """
+    Purpose - Sends a purchase notification and a burst of repeated errors through the smtp sink to a local stand-in that rejects the first messages, returns how long the caller was blocked and what was delivered
+
+    Param - errors: Number of repeated error notifications
+
+    Param - failures: Number of messages the stand-in rejects before accepting
+    """
+    server = SmtpServer(fail_next=failures).start()
+    try:
+        host, port = server.address
+        notification_manager = NotificationManager([SmtpSink(host, port, to='bot@localhost')], retry_delay=.05, coalesce_window=60.0)
+        # time what the bot loop pays per notification
+        times = []
+        start = time.perf_counter()
+        notification_manager.notify('Ada Fruit Bot Purchased a Raspberry Pi 4')
+        times.append(time.perf_counter() - start)
+        for _ in range(errors):
+            start = time.perf_counter()
+            notification_manager.notify("Ada Fruit Bot went offline due to the following error:\n<class 'TimeoutError'>\nread timed out", coalesce=True)
+            times.append(time.perf_counter() - start)
+        # wait for delivery (coalesced repeats go out as one summary)
+        start = time.perf_counter()
+        notification_manager.flush()
+        delivery_time = time.perf_counter() - start
+        received = server.received()
+    finally:
+        server.stop()
+    return {
+        'notifications' : errors + 1,
+        'notify_mean_us' : statistics.mean(times) * 1000000,
+        'notify_max_us' : max(times) * 1000000,
+        'delivery_ms' : delivery_time * 1000,
+        'rejected_then_retried' : failures,
+        'emails_received' : len(received),
+        'sent' : notification_manager.sent,
+        'failed' : notification_manager.failed,
+        'subjects' : [body.splitlines()[0] for subject, body in received],
+    }
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Benchmark the notification queue against a local stand-in smtp server')
+    arg_parser.add_argument('--errors', type=int, default=100)
+    arg_parser.add_argument('--failures', type=int, default=2)
+    args = arg_parser.parse_args()
+    for key, value in run(args.errors, args.failures).items():
+        print(f'{key}: {value}')
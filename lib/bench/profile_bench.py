@@ -0,0 +1,121 @@
+# local imports
+from lib.funcs import *
+# other imports
+from concurrent.futures import ProcessPoolExecutor
+import argparse, json, multiprocessing, statistics, time
+
+
+# browser profiles to compare
+PROFILES = ['default', 'lean']
+
+
+def get_config_value(section:str, key:str, default:object=None) -> object:
+    """
+    Purpose - Reads a value from the bot config, the benchmark runs without one
+
+    Param - section: Config section
+
+    Param - key: Key in the section
+
+    Param - default: Value if the config or key is missing
+    """
+    try:
+        from lib.config import config
+    except ImportError:
+        return default
+    return config.get(section, {}).get(key, default)
+
+
+def transfer_stats(performance_log:list) -> tuple:
+    """
+    Purpose - Sums the bytes received and counts the finished and blocked requests in a chrome performance log
+
+    Param - performance_log: Entries from driver.get_log('performance')
+    """
+    received, finished, blocked = 0, 0, 0
+    for entry in performance_log:
+        message = json.loads(entry['message'])['message']
+        if message['method'] == 'Network.loadingFinished':
+            received += message['params'].get('encodedDataLength', 0)
+            finished += 1
+        elif message['method'] == 'Network.loadingFailed' and message['params'].get('blockedReason'):
+            blocked += 1
+    return received, finished, blocked
+
+
+def measure(profile:str, url:str, loads:int) -> dict:
+    """
+    Purpose - Loads a page in a headless browser with a profile and returns load time, bytes transferred and chrome memory (runs in its own process since chrome options are process wide)
+
+    Param - profile: 'default' or 'lean'
+
+    Param - url: Page to load
+
+    Param - loads: Number of warm page loads to time
+    """
+    from lib.web_funcs.parser_manager import ParserManager, OPTIONS
+    # network events for the byte counts
+    OPTIONS.set_capability('goog:loggingPrefs', {'performance':'ALL'})
+    parser = ParserManager(OS_TYPE, get_config_value('selenium', 'driver_path', ''), url, ['--window-size=1920,1080','--headless'], lean=profile == 'lean')
+    try:
+        # drop the events of the first load
+        parser.driver.get_log('performance')
+        # cold load
+        parser.driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+        start = time.perf_counter()
+        parser.refresh_page()
+        cold_time = time.perf_counter() - start
+        cold_bytes, cold_requests, cold_blocked = transfer_stats(parser.driver.get_log('performance'))
+        # warm loads (what a poll refresh costs)
+        times, received = [], []
+        for _ in range(loads):
+            start = time.perf_counter()
+            parser.refresh_page()
+            times.append(time.perf_counter() - start)
+            received.append(transfer_stats(parser.driver.get_log('performance'))[0])
+        rss = parser.get_driver_rss(parser.driver)
+    finally:
+        parser.quit()
+    times.sort()
+    return {
+        'cold_load_ms' : cold_time * 1000,
+        'cold_kb' : cold_bytes / 1024,
+        'cold_requests' : cold_requests,
+        'blocked_requests' : cold_blocked,
+        'warm_load_mean_ms' : statistics.mean(times) * 1000,
+        'warm_load_p95_ms' : times[min(len(times) - 1, int(len(times) * .95))] * 1000,
+        'warm_kb_mean' : statistics.mean(received) / 1024,
+        'chrome_rss_mb' : rss / (1024 * 1024),
+    }
+
+
+def run(url:str, loads:int=20) -> dict:
+    """
+    Purpose - Measures every profile in a fresh process and returns {profile: stats}
+
+    Param - url: Page to load
+
+    Param - loads: Number of warm page loads to time per profile
+    """
+    results = {}
+    for profile in PROFILES:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            results[profile] = executor.submit(measure, profile, url, loads).result()
+    return results
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Compare page load time, bytes transferred and chrome memory of the default and lean browser profiles')
+    arg_parser.add_argument('--url', default=None, help='page to load (defaults to the selenium url of the config)')
+    arg_parser.add_argument('--loads', type=int, default=20)
+    args = arg_parser.parse_args()
+    url = args.url or get_config_value('selenium', 'url')
+    if not url:
+        arg_parser.error('no --url given and no selenium url in the config')
+    results = run(url, args.loads)
+    # side by side with the change of the lean profile
+    print(f"{'':<20} {'default':>12} {'lean':>12} {'change':>10}")
+    for key, default_value in results['default'].items():
+        lean_value = results['lean'][key]
+        change = f'{(lean_value - default_value) / default_value * 100:+.1f}%' if default_value else ''
+        print(f'{key:<20} {default_value:>12.1f} {lean_value:>12.1f} {change:>10}')
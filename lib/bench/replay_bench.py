@@ -0,0 +1,202 @@
+# local imports
+from lib.funcs import *
+from lib.bench.replay_server import ReplayServer
+from lib.bench.e2e_bench import use_bench_config, summarize, compare, RESULTS_PATH
+from lib.web_funcs.snapshot_manager import load_recording
+from lib.web_funcs.stock_manager import parse_product_block, OTS_STRING
+from lib.web_funcs.shipping_manager import parse_shipping_options, select_option
+# other imports
+from urllib.parse import urlparse
+import argparse, json, tempfile, time
+
+
+# variant names the decisions are made for
+VARIANTS = ['2gb', '4gb', '8gb']
+# markers of the recorded pages the bot parses
+PRODUCT_MARKER = 'id="prod-right-side"'
+SHIPPING_MARKER = 'checkout-shipping-method-label'
+
+
+def decide_stock(html:str, variants:list) -> dict:
+    """
+    Purpose - Parses a product page the way the http poller does and decides what to cart
+
+    Param - html: The product page html
+
+    Param - variants: Valid variant names
+    """
+    parsed = parse_product_block(html)
+    return {'variants':len(parsed), 'in_stock':[name for name, stock in parsed if name in variants and stock != OTS_STRING]}
+
+
+def decide_shipping(html:str, shipping_type:str) -> dict:
+    """
+    Purpose - Parses the shipping options of a checkout page and picks one
+
+    Param - html: The checkout page html
+
+    Param - shipping_type: 'cheapest', 'expensive' or part of a label id
+    """
+    options = parse_shipping_options(html)
+    picked = select_option(options, shipping_type)
+    return {'options':len(options), 'picked':picked.label_id if picked else None}
+
+
+def time_call(function:object, repeat:int, *args) -> tuple:
+    """
+    Purpose - Runs a function repeat times, returns (fastest seconds, result)
+
+    Param - function: The function to time
+
+    Param - repeat: Number of runs
+
+    Param - args: Arguments of the function
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def run(recording:str, repeat:int=20, variants:list=VARIANTS, shipping_type:str='cheapest', browser:bool=False) -> dict:
+    """
+    Purpose - Replays the pages of a recorded session through the parsers (and the browser) and returns parse and decision latency with the decision made on every page
+
+    Param - recording: Directory of the recording
+
+    Param - repeat: Runs per page (the fastest is kept)
+
+    Param - variants: Valid variant names
+
+    Param - shipping_type: Shipping option to pick
+
+    Param - browser: Also poll every recorded product page with AdaFruitManager in headless chromium against the replay server
+    """
+    commands, pages = load_recording(recording)
+    # first url every page was recorded on
+    urls = {}
+    for entry in commands:
+        if entry.get('page'):
+            urls.setdefault(entry['page'], entry['url'])
+    timings = {'stock_decision':[], 'shipping_decision':[]}
+    decisions = {}
+    for page, html in sorted(pages.items(), key=lambda item: urls.get(item[0], '')):
+        if PRODUCT_MARKER in html:
+            seconds, decisions[page] = time_call(decide_stock, repeat, html, variants)
+            timings['stock_decision'].append(seconds)
+        elif SHIPPING_MARKER in html:
+            seconds, decisions[page] = time_call(decide_shipping, repeat, html, shipping_type)
+            timings['shipping_decision'].append(seconds)
+        else:
+            continue
+        decisions[page]['url'] = urls.get(page)
+    # recorded live latency of every webdriver command
+    recorded = {}
+    for entry in commands:
+        if entry['command'] != 'start':
+            recorded.setdefault(entry['command'], []).append(entry['ms'] / 1000)
+    results = {
+        'time' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'recording' : recording,
+        'commands' : len(commands),
+        'pages' : len(pages),
+        # product pages the parser found no variants on (the markup may have changed)
+        'empty_product_pages' : [page for page, decision in decisions.items() if decision.get('variants') == 0],
+        **{name:summarize(values) for name, values in timings.items()},
+        'recorded_commands' : {command:summarize(values) for command, values in sorted(recorded.items())},
+        'decisions' : decisions,
+    }
+    if browser:
+        results.update(run_browser(recording, decisions, variants))
+    return results
+
+
+def run_browser(recording:str, decisions:dict, variants:list) -> dict:
+    """
+    Purpose - Polls every recorded product page with AdaFruitManager in headless chromium against the replay server, returns poll latency and the pages where the browser decided differently from the http parser
+
+    Param - recording: Directory of the recording
+
+    Param - decisions: Page hash -> decision of the http parser
+
+    Param - variants: Valid variant names
+    """
+    server = ReplayServer(recording).start()
+    product_pages = [page for page, decision in decisions.items() if 'in_stock' in decision]
+    if not product_pages:
+        server.stop()
+        return {}
+    # bot config pointed at the replay server
+    server.product_url = f"{server.url}{urlparse(decisions[product_pages[0]]['url']).path}"
+    use_bench_config(server)
+    # imported after the config points at the replay server
+    from lib.web_funcs.ada_fruit_manager import AdaFruitManager
+    from lib.bot_funcs.history_manager import HistoryManager
+    polls, mismatches = [], []
+    ada_fruit_manager = None
+    try:
+        with tempfile.TemporaryDirectory() as temp_path:
+            ada_fruit_manager = AdaFruitManager(OS_TYPE, True)
+            ada_fruit_manager.history.close()
+            ada_fruit_manager.history = HistoryManager(os.path.join(temp_path, 'history.db'))
+            # every page is parsed (the pages differ but the poll has to be measured in full)
+            ada_fruit_manager.change_detector = None
+            ada_fruit_manager.valid_product_types = variants
+            for page in product_pages:
+                path = urlparse(decisions[page]['url']).path
+                server.pin(path, page)
+                ada_fruit_manager.parser.set_page(f'{server.url}{path}')
+                start = time.perf_counter()
+                ada_fruit_manager.get_products()
+                polls.append(time.perf_counter() - start)
+                if sorted(ada_fruit_manager.in_stock_types) != sorted(decisions[page]['in_stock']):
+                    mismatches.append({'page':page, 'browser':ada_fruit_manager.in_stock_types, 'http':decisions[page]['in_stock']})
+    finally:
+        if ada_fruit_manager:
+            ada_fruit_manager.parser.quit()
+        server.stop()
+    return {'browser_poll':summarize(polls), 'browser_mismatches':mismatches}
+
+
+def compare_decisions(results:dict, baseline:dict) -> str:
+    """
+    Purpose - Formats the pages where a run decided differently from an earlier run on the same recording
+
+    Param - results: Results of this run
+
+    Param - baseline: Results of an earlier run
+    """
+    lines = []
+    for page, decision in results['decisions'].items():
+        before = baseline.get('decisions', {}).get(page)
+        if before is not None and {key:value for key, value in before.items() if key != 'url'} != {key:value for key, value in decision.items() if key != 'url'}:
+            lines.append(f"{decision.get('url')}: {before} -> {decision}")
+    return '\n'.join(lines) if lines else 'Same decisions on every page.'
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Measure parse and decision latency on the pages of a recorded session and catch decisions that changed')
+    arg_parser.add_argument('recording', help='directory of the recording (data/recordings/<session>)')
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    arg_parser.add_argument('--variants', nargs='+', default=VARIANTS)
+    arg_parser.add_argument('--shipping-type', default='cheapest')
+    arg_parser.add_argument('--browser', action='store_true', help='also poll every product page with AdaFruitManager in headless chromium')
+    arg_parser.add_argument('--compare', default=None, help='results json of an earlier run to compare against')
+    args = arg_parser.parse_args()
+    results = run(args.recording, args.repeat, [variant.lower().strip() for variant in args.variants], args.shipping_type, args.browser)
+    # save results
+    os.makedirs(RESULTS_PATH, exist_ok=True)
+    results_file = os.path.join(RESULTS_PATH, f"replay_{results['time'].replace(':', '')}.json")
+    with open(results_file, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(json.dumps({key:value for key, value in results.items() if key != 'decisions'}, indent=4))
+    print(f'Saved to {results_file}')
+    # compare with an earlier run
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(compare(results, baseline))
+        print(compare_decisions(results, baseline))
@@ -0,0 +1,134 @@
+# local imports
+from lib.funcs import *
+from lib.bench.fixture_server import FixtureServer
+from lib.web_funcs.snapshot_manager import load_recording
+# other imports
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlparse
+import argparse, threading, time
+
+
+def get_sequence(commands:list) -> list:
+    """
+    Purpose - Gets the pages of a recording in the order the session saw them, a list of (url, page hash)
+
+    Param - commands: Command entries of the recording
+    """
+    return [(entry['url'], entry['page']) for entry in commands if entry.get('page')]
+
+
+class ReplayServer(FixtureServer):
+    """
+    Purpose - Serves the page snapshots of a recorded session in the order they were recorded so the bot can run the session again without the network
+    """
+    def __init__(self, recording_path:str, host:str='127.0.0.1', port:int=0, latency:float=0.0) -> None:
+        super().__init__({}, host, port, conditional=False, latency=latency)
+        # recorded commands, page hash -> html and the pages in order as (url path, page hash)
+        self.commands, self.pages = load_recording(recording_path)
+        urls = get_sequence(self.commands)
+        self.sequence = [(urlparse(url).path or '/', page) for url, page in urls]
+        # site the session was recorded on (its links are pointed at this server)
+        self.origin = '{0.scheme}://{0.netloc}'.format(urlparse(urls[0][0])) if urls else None
+        # next page of the sequence and the last page served per path (served again once the sequence is used up)
+        self.cursor = 0
+        self.last = {}
+        self.lock = threading.Lock()
+
+    def next_page(self, path:str) -> tuple:
+        """
+        Purpose - Gets what to answer a page request with, ('page', hash) for the next recorded page of the path, ('redirect', path) if the session went to another page next (a form post or a redirect) and (None, None) if nothing was recorded for it
+
+        Param - path: Url path of the request
+        """
+        with self.lock:
+            for index in range(self.cursor, len(self.sequence)):
+                if self.sequence[index][0] == path:
+                    self.cursor = index + 1
+                    self.last[path] = self.sequence[index][1]
+                    return 'page', self.sequence[index][1]
+            # the recorded session landed somewhere else after this request
+            if path not in self.last and self.cursor < len(self.sequence):
+                return 'redirect', self.sequence[self.cursor][0]
+            return ('page', self.last[path]) if path in self.last else (None, None)
+
+    def handle(self, request:BaseHTTPRequestHandler) -> None:
+        """
+        Purpose - Serves pinned routes like a fixture server and everything else from the recorded sequence
+
+        Param - request: The request handler
+        """
+        path = request.path.split('?')[0]
+        # pages set with set_route (benchmarks pin a snapshot to a path)
+        if path in self.routes:
+            return super().handle(request)
+        self.hits[path] = self.hits.get(path, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        # only documents are recorded (images, scripts and styles are not)
+        if request.headers.get('Sec-Fetch-Dest', 'document') != 'document':
+            kind, value = None, None
+        else:
+            kind, value = self.next_page(path)
+        if kind == 'redirect':
+            request.send_response(303)
+            request.send_header('Location', value)
+            request.send_header('Content-Length', '0')
+            request.end_headers()
+            return
+        if kind is None:
+            request.send_response(404)
+            request.send_header('Content-Length', '0')
+            request.end_headers()
+            return
+        body = self.get_body(value)
+        request.send_response(200)
+        request.send_header('Content-Type', 'text/html; charset=utf-8')
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def get_body(self, page:str) -> bytes:
+        """
+        Purpose - Gets a snapshot with links to the recorded site pointed at this server
+
+        Param - page: Hash of the page
+        """
+        html = self.pages[page]
+        if self.origin:
+            html = html.replace(self.origin, self.url)
+        return html.encode('utf-8')
+
+    def pin(self, path:str, page:str) -> None:
+        """
+        Purpose - Serves one snapshot on a path every time (e.g. to poll a recorded product page over and over)
+
+        Param - path: Url path
+
+        Param - page: Hash of the page
+        """
+        self.set_route(path, self.get_body(page))
+
+    def rewind(self) -> None:
+        """
+        Purpose - Starts the recorded sequence over
+        """
+        with self.lock:
+            self.cursor = 0
+            self.last = {}
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Serve a recorded session so the bot can run it again without the network')
+    arg_parser.add_argument('recording', help='directory of the recording (data/recordings/<session>)')
+    arg_parser.add_argument('--port', type=int, default=8000)
+    arg_parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before every answer')
+    args = arg_parser.parse_args()
+    server = ReplayServer(args.recording, port=args.port, latency=args.latency).start()
+    print(f'Replaying {len(server.sequence)} pages of {args.recording} recorded on {server.origin}')
+    if server.sequence:
+        print(f'Point the selenium url at {server.url}{server.sequence[0][0]}')
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
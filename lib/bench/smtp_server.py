@@ -0,0 +1,94 @@
+# other imports
+from email import message_from_bytes
+import socketserver, threading
+
+
+class SmtpServer:
+    """
+    Purpose - A local stand-in smtp server that keeps every message it receives in memory on a background thread
+    """
+    def __init__(self, host:str='127.0.0.1', port:int=0, fail_next:int=0) -> None:
+        # received messages
+        self.messages = []
+        # number of upcoming messages to reject with a temporary failure
+        self.fail_next = fail_next
+        self.lock = threading.Lock()
+        # build handler bound to this server
+        smtp_server = self
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                smtp_server.handle(self)
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def address(self) -> tuple:
+        """
+        Purpose - Host and port the server listens on
+        """
+        return self.server.server_address[:2]
+
+    def start(self) -> 'SmtpServer':
+        """
+        Purpose - Starts serving on a background thread
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Purpose - Stops the server
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, request:socketserver.StreamRequestHandler) -> None:
+        """
+        Purpose - Speaks just enough smtp for smtplib to send a message
+
+        Param - request: The connection handler
+        """
+        def reply(line:str) -> None:
+            request.wfile.write(f'{line}\r\n'.encode())
+        reply('220 localhost stand-in smtp')
+        while True:
+            line = request.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().split(' ')[0].upper()
+            if command == 'EHLO':
+                reply('250-localhost')
+                reply('250 8BITMIME')
+            elif command in ['HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP']:
+                reply('250 OK')
+            elif command == 'DATA':
+                reply('354 End data with <CR><LF>.<CR><LF>')
+                data = b''
+                while True:
+                    data_line = request.rfile.readline()
+                    if not data_line or data_line == b'.\r\n':
+                        break
+                    # undo dot stuffing
+                    data += data_line[1:] if data_line.startswith(b'..') else data_line
+                with self.lock:
+                    # temporary failure so the sender retries
+                    if self.fail_next:
+                        self.fail_next -= 1
+                        reply('451 Try again later')
+                        continue
+                    self.messages.append(message_from_bytes(data))
+                reply('250 OK queued')
+            elif command == 'QUIT':
+                reply('221 Bye')
+                return
+            else:
+                reply('502 Command not implemented')
+
+    def received(self) -> list:
+        """
+        Purpose - Gets (subject, body) of every received message
+        """
+        with self.lock:
+            return [(message['Subject'], message.get_payload()) for message in self.messages]
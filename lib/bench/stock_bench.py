@@ -0,0 +1,47 @@
+# local imports
+from lib.bench.fixture_server import FixtureServer, load_fixture
+from lib.web_funcs.stock_manager import StockManager
+# other imports
+import argparse, resource, statistics, time
+
+
+def run(polls:int=200) -> dict:
+    """
+    Purpose - Polls the recorded product page through the http stock poller and returns timing stats
+
+    Param - polls: Number of polls to make
+    """
+    # serve recorded out of stock page
+    server = FixtureServer({'/product/4295': load_fixture('product_page.html')}).start()
+    try:
+        stock_manager = StockManager(f'{server.url}/product/4295', ['2gb','4gb','8gb'])
+        # time out of stock polls
+        cpu_start = time.process_time()
+        times = []
+        for _ in range(polls):
+            assert not stock_manager.poll()
+            times.append(stock_manager.last_poll_time)
+        cpu_time = time.process_time() - cpu_start
+        # flip a variant to in stock and make sure the poller sees it
+        server.set_route('/product/4295', load_fixture('product_page_in_stock.html'))
+        in_stock = stock_manager.poll()
+    finally:
+        server.stop()
+    # stats
+    times.sort()
+    return {
+        'polls' : polls,
+        'mean_ms' : statistics.mean(times) * 1000,
+        'p50_ms' : times[len(times) // 2] * 1000,
+        'p95_ms' : times[int(len(times) * .95)] * 1000,
+        'cpu_ms_per_poll' : cpu_time / polls * 1000,
+        'max_rss_kb' : resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'detected' : in_stock,
+    }
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Benchmark the http stock poller against a local fixture server')
+    arg_parser.add_argument('--polls', type=int, default=200)
+    for key, value in run(arg_parser.parse_args().polls).items():
+        print(f'{key}: {value}')
@@ -0,0 +1,62 @@
+# local imports
+from lib.bench.fixture_server import FixtureServer, load_fixture
+from lib.web_funcs.watch_manager import WatchManager
+# other imports
+import argparse, statistics, time
+
+
+def run_rounds(urls:int, rounds:int, conditional:bool, latency:float, concurrency:int) -> dict:
+    """
+    Purpose - Polls a watch list of recorded product pages in rounds and returns timing stats
+
+    Param - urls: Number of product pages to watch
+
+    Param - rounds: Number of poll rounds
+
+    Param - conditional: If the server answers conditional requests
+
+    Param - latency: Simulated server latency in seconds
+
+    Param - concurrency: Max polls in flight
+    """
+    # serve the recorded out of stock page on every product path
+    page = load_fixture('product_page.html')
+    server = FixtureServer({f'/product/{i}': page for i in range(urls)}, conditional=conditional, latency=latency).start()
+    try:
+        watch_manager = WatchManager([{'url':f'{server.url}/product/{i}', 'variants':['2gb','4gb','8gb']} for i in range(urls)], concurrency=concurrency)
+        # time rounds
+        cpu_start = time.process_time()
+        times = []
+        for _ in range(rounds):
+            assert not watch_manager.poll()
+            times.append(watch_manager.last_round_time)
+        cpu_time = time.process_time() - cpu_start
+        # flip the last product to in stock and make sure the next round sees it
+        server.set_route(f'/product/{urls - 1}', load_fixture('product_page_in_stock.html'))
+        found = watch_manager.poll()
+    finally:
+        server.stop()
+        watch_manager.executor.shutdown()
+    # stats
+    times.sort()
+    return {
+        'urls' : urls,
+        'conditional' : conditional,
+        'round_mean_ms' : statistics.mean(times) * 1000,
+        'round_p95_ms' : times[int(len(times) * .95)] * 1000,
+        'cpu_ms_per_round' : cpu_time / rounds * 1000,
+        'not_modified' : sum(server.not_modified.values()),
+        'detected' : [(entry.url, in_stock) for entry, in_stock in found],
+    }
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Benchmark concurrent watch list polling against a local fixture server')
+    arg_parser.add_argument('--urls', type=int, default=50)
+    arg_parser.add_argument('--rounds', type=int, default=20)
+    arg_parser.add_argument('--latency', type=float, default=.05, help='simulated server latency in seconds')
+    arg_parser.add_argument('--concurrency', type=int, default=16)
+    args = arg_parser.parse_args()
+    # compare plain and conditional polling
+    for conditional in [False, True]:
+        print(run_rounds(args.urls, args.rounds, conditional, args.latency, args.concurrency))
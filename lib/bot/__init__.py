@@ -2,8 +2,18 @@
 from lib.funcs import *
 from lib.web_funcs.ada_fruit_manager import AdaFruitManager
 from lib.web_funcs.gmail_manager import GmailManager
+from lib.web_funcs.race_manager import RaceManager
+from lib.web_funcs.login_manager import LoginError
+from lib.bot_funcs.metrics_manager import METRICS
+from lib.bot_funcs.notification_manager import NotificationManager
+from lib.bot_funcs.timeline_manager import TimelineManager
+from lib.bot_funcs.supervisor_manager import SupervisorManager, load_checkpoint
+from lib.bot_funcs.event_log_manager import EVENTS
+from lib.bot_funcs.config_manager import ConfigManager
+from lib.config import config
 # other imports
 import datetime, time, logging, traceback, platform
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 
@@ -20,16 +30,76 @@ class Bot():
 	Purpose - Webscappering bot object that parsers for ada fruit stock
 	"""
 	def __init__(self) -> None:
+		# event log levels and the config secrets it redacts
+		EVENTS.configure(config.get('event_log', {}), config)
+		# validated accounts, product urls and checkout preferences (an invalid config stops the bot here, not mid checkout)
+		self.config_manager = ConfigManager(config)
+		# startup timeline (imports ran from script start until now)
+		self.timeline = TimelineManager()
+		self.timeline.mark('imports', self.timeline.start)
 		# name of bot
 		self.name = 'Ada Fruit Bot'
 		# testing state
 		self.testing_state = False
 		# alerts
 		self.alerts = False if self.testing_state else True
-		# html finder 
-		self.ada_fruit_manager = AdaFruitManager(OS_TYPE, self.testing_state)
-		# gmail manager
-		self.email_manager = GmailManager(self)
+		# watch mode (poll stock over http and only use the browser to checkout), off polls with the browser
+		self.watch_mode = config['selenium'].get('watch_mode', False)
+		# race mode (every account gets its own browser process and they all race to checkout)
+		self.race_mode = config['selenium'].get('race_mode', False)
+		# notification sinks and retries
+		notification_config = self.config_manager.notifications.as_dict()
+		# gmail manager (only when the gmail sink is used, signs in on a startup thread)
+		self.email_manager = GmailManager(self) if 'gmail' in (notification_config['sinks'] if notification_config['sinks'] is not None else ['gmail']) else None
+		# launch the browser and sign in while gmail auth and the notification sinks start
+		with ThreadPoolExecutor(max_workers=3, thread_name_prefix='startup') as executor:
+			browser = executor.submit(self.start_browser)
+			auth = executor.submit(self.timeline.timed, 'gmail_auth', self.email_manager.auth) if self.email_manager else None
+			notifications = executor.submit(self.timeline.timed, 'notifications', NotificationManager.from_config, notification_config, self.name, self.email_manager)
+			# html finder and account workers
+			self.ada_fruit_manager, self.race_manager = browser.result()
+			# sends notifications in the background so the bot never waits on them
+			self.notification_manager = notifications.result()
+			# raise auth errors
+			if auth:
+				auth.result()
+		# recovers from browser failures and checkpoints the bot state after every attempt
+		self.supervisor = SupervisorManager(self.ada_fruit_manager.recover, self.ada_fruit_manager.get_state) if self.ada_fruit_manager else None
+		if self.supervisor:
+			self.ada_fruit_manager.supervisor = self.supervisor
+		# reload accounts, product urls and checkout preferences when config.py is saved
+		if self.ada_fruit_manager and config.get('hot_reload', {}).get('interval', 2.0):
+			self.config_manager.watch(self.ada_fruit_manager.reload_config, config.get('hot_reload', {}).get('interval', 2.0))
+		# serve metrics if a port is configured
+		if config.get('metrics', {}).get('port'):
+			self.timeline.timed('metrics', METRICS.serve, config['metrics']['port'])
+		# startup prompt
+		print(self.timeline.report())
+
+
+	def start_browser(self) -> tuple:
+		"""
+		Purpose - Launches the browser on the product page and signs in ahead of the first poll (or starts the race workers), returns (ada fruit manager, race manager)
+		"""
+		# account workers launch their own browsers
+		if self.race_mode:
+			return None, self.timeline.timed('race_workers', RaceManager, OS_TYPE, self.testing_state)
+		# html finder
+		ada_fruit_manager = self.timeline.timed('browser', AdaFruitManager, OS_TYPE, self.testing_state, self.watch_mode, config_manager=self.config_manager)
+		# resume the account, cart and purchase counts from before a restart
+		ada_fruit_manager.restore_state(load_checkpoint())
+		# sign in now so the first purchase attempt starts signed in
+		try:
+			self.timeline.timed('sign_in', ada_fruit_manager.sign_in)
+		# sign in already retried in the same browser, the first purchase attempt signs in again
+		except LoginError as e:
+			print(f'\nSign in during startup failed, retrying on the first purchase attempt: {e}')
+		# the first purchase attempt signs in again
+		except Exception as e:
+			print(f'\nSign in during startup failed, retrying on the first purchase attempt: {e}')
+			ada_fruit_manager.parser.hard_reset()
+			ada_fruit_manager.logged_in = False
+		return ada_fruit_manager, None
 		
 		
 
@@ -40,7 +110,7 @@ class Bot():
 
 		Param - message: String to send
 		"""
-		self.email_manager.send_message(f'Ada Fruit Bot went offline due to the following error:\n{message}')
+		self.notification_manager.notify(f'Ada Fruit Bot went offline due to the following error:\n{message}', coalesce=True)
 
 
 	""" ------------------------------------------ Update Methods ------------------------------------------------ """
@@ -58,18 +128,32 @@ class Bot():
 		while True:
 			# attempt to scrape ada fruit
 			try:
-				# attempt to purchase product
-				if self.ada_fruit_manager.ada_fruit_purchase():
+				# if racing accounts
+				if self.race_mode:
+					# race every account to checkout once stock appears
+					for account_name in self.race_manager.race():
+						# if alerts
+						if self.alerts:
+							# send email about purchase
+							self.notification_manager.notify(f'Ada Fruit Bot Purchased a {product} on {account_name}')
+				# attempt to purchase product (browser failures are recovered from)
+				elif self.supervisor.run(self.ada_fruit_manager.ada_fruit_purchase):
 					# if alerts
 					if self.alerts:
 						# send email about purchase
-						self.email_manager.send_message(f'Ada Fruit Bot Purchased a {product}')
+						self.notification_manager.notify(f'Ada Fruit Bot Purchased a {product}')
 			# except errors and print
 			except Exception as e:
+				# write the last events for the post mortem and everything still queued
+				EVENTS.error('crash', '\nBot stopped: {error_type} {error}', error_type=type(e).__name__, error=str(e))
+				print(f'Last events written to {EVENTS.dump()}')
+				EVENTS.flush()
 				# if alerts
 				if self.alerts:
 					# send stopped prompt
 					self.send_embed_error(f'{str(type(e))}\n{e}')
+					# send it before the bot goes down
+					self.notification_manager.flush()
 				# raise error
 				raise(e)
 
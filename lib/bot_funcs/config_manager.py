@@ -0,0 +1,586 @@
+# local imports
+from lib.funcs import *
+from lib.bot_funcs.event_log_manager import EVENTS, find_secrets
+from lib.bot_funcs.scheduler_manager import WEEKDAYS
+from lib.bot_funcs.coordination_manager import COORDINATION_PATH
+# other imports
+import base64, datetime, runpy, threading, time
+
+
+# local config file that is watched for changes (untracked, created from config_sample.py next to it)
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.py')
+# sections that are reloaded into the running bot (everything else is read at start)
+RELOADED = ['product_url', 'accounts', 'watch_list', 'checkout']
+# fields of each account section
+LOGIN_FIELDS = ['username', 'password', 'otp']
+ADDRESS_FIELDS = ['name', 'address', 'city', 'state', 'postal_code', 'phone_number']
+# notification sinks and the settings of the ones that take any
+NOTIFICATION_SINKS = ['gmail', 'smtp', 'file', 'webhook']
+SINK_FIELDS = {
+    'smtp' : {'host':('text', None), 'port':('count', None), 'sender':('text', None), 'to':('text', None), 'username':('text', None), 'password':('text', None), 'starttls':('bool', None), 'timeout':('number', None)},
+    'file' : {'path':('text', None)},
+    'webhook' : {'url':('text', None), 'field':('text', None), 'timeout':('number', None)},
+}
+# kinds of setting -> (check, what the problem says it must be)
+KINDS = {
+    'number' : (lambda value: isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0, 'a number above 0'),
+    'amount' : (lambda value: isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0, 'a number of 0 or more'),
+    'count' : (lambda value: isinstance(value, int) and not isinstance(value, bool) and value >= 1, 'a whole number of 1 or more'),
+    'whole' : (lambda value: isinstance(value, int) and not isinstance(value, bool) and value >= 0, 'a whole number of 0 or more'),
+    'bool' : (lambda value: isinstance(value, bool), 'True or False'),
+    'text' : (lambda value: isinstance(value, str), 'text'),
+    'list' : (lambda value: isinstance(value, list), 'a list'),
+    'dict' : (lambda value: isinstance(value, dict), 'a dict'),
+}
+
+
+class ConfigError(ValueError):
+    """
+    Purpose - Raised when the config is invalid, lists every problem found
+    """
+    def __init__(self, problems:list) -> None:
+        # where and what (never the value, it may be a secret)
+        self.problems = problems
+        super().__init__('Invalid config:\n' + '\n'.join(f'  - {problem}' for problem in problems))
+
+
+class Record:
+    """
+    Purpose - Base of the config records, compared by value with secret fields left out of repr
+    """
+    __slots__ = ()
+    # fields that are never shown
+    secret_fields = ()
+
+    def as_dict(self) -> dict:
+        """
+        Purpose - Gets the fields as a dict (what the form fill helpers take)
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other:object) -> bool:
+        return type(other) is type(self) and all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{name}=***' if name in self.secret_fields else f'{name}={getattr(self, name)!r}' for name in self.__slots__)})"
+
+
+class LoginRecord(Record):
+    """
+    Purpose - Sign in details of an account
+    """
+    __slots__ = ('username', 'password', 'otp')
+    secret_fields = ('password', 'otp')
+
+    def __init__(self, username:str, password:str, otp:str) -> None:
+        self.username = username
+        self.password = password
+        # base32 secret of the one time passwords
+        self.otp = otp
+
+
+class AddressRecord(Record):
+    """
+    Purpose - Delivery address entered at checkout (keys match the delivery form)
+    """
+    __slots__ = ('name', 'address', 'additional_address', 'city', 'state', 'postal_code', 'phone_number')
+    secret_fields = ('address', 'additional_address', 'phone_number')
+
+    def __init__(self, name:str, address:str, city:str, state:str, postal_code:str, phone_number:str, additional_address:str='') -> None:
+        self.name = name
+        self.address = address
+        # apartment, suite or unit (empty clears the field)
+        self.additional_address = additional_address
+        self.city = city
+        self.state = state
+        self.postal_code = postal_code
+        self.phone_number = phone_number
+
+
+class AccountRecord(Record):
+    """
+    Purpose - An Ada Fruit account with its sign in details and delivery address
+    """
+    __slots__ = ('name', 'login', 'address')
+
+    def __init__(self, name:str, login:LoginRecord, address:AddressRecord) -> None:
+        self.name = name
+        self.login = login
+        self.address = address
+
+
+class WatchRecord(Record):
+    """
+    Purpose - A product page to watch
+    """
+    __slots__ = ('url', 'variants', 'purchase_limit')
+
+    def __init__(self, url:str, variants:list, purchase_limit:int=None) -> None:
+        self.url = url
+        self.variants = variants
+        # None is unlimited
+        self.purchase_limit = purchase_limit
+
+
+class CheckoutRecord(Record):
+    """
+    Purpose - Checkout and shipping preferences
+    """
+    __slots__ = ('prestage', 'url', 'shipping_type')
+
+    def __init__(self, prestage:bool=False, url:str=None, shipping_type:str='cheapest') -> None:
+        # enter the address while waiting for stock
+        self.prestage = prestage
+        # checkout page (None is /checkout on the product site)
+        self.url = url
+        # 'cheapest', 'expensive' or part of a shipping label id
+        self.shipping_type = shipping_type
+
+
+class SchedulerRecord(Record):
+    """
+    Purpose - Poll pacing, throttle backoff and hot windows (keys match SchedulerManager)
+    """
+    __slots__ = ('interval', 'min_interval', 'max_interval', 'jitter', 'backoff', 'hot_windows', 'hot_factor', 'learn_threshold')
+
+    def __init__(self, interval:float=1.0, min_interval:float=.25, max_interval:float=300.0, jitter:float=.2, backoff:float=2.0, hot_windows:list=None, hot_factor:float=.25, learn_threshold:int=2) -> None:
+        # base seconds between polls (selenium.poll_interval unless the section sets one)
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.backoff = backoff
+        # list of dicts with days, start and end
+        self.hot_windows = hot_windows if hot_windows else []
+        self.hot_factor = hot_factor
+        self.learn_threshold = learn_threshold
+
+
+class SignInRecord(Record):
+    """
+    Purpose - Sign in attempts and backoff (keys match LoginManager)
+    """
+    __slots__ = ('max_attempts', 'backoff', 'backoff_factor', 'max_backoff', 'otp_margin')
+
+    def __init__(self, max_attempts:int=3, backoff:float=2.0, backoff_factor:float=2.0, max_backoff:float=30.0, otp_margin:float=3.0) -> None:
+        self.max_attempts = max_attempts
+        # seconds before the second attempt, multiplied by the factor after every failure up to the max
+        self.backoff = backoff
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        # seconds left on a one time password before the next one is used
+        self.otp_margin = otp_margin
+
+
+class WatchdogRecord(Record):
+    """
+    Purpose - Browser recycle limits (keys match WatchdogManager, None turns a limit off)
+    """
+    __slots__ = ('max_rss_mb', 'min_available_mb', 'max_cpu_percent', 'cpu_samples', 'max_age_hours', 'interval')
+
+    def __init__(self, max_rss_mb:float=None, min_available_mb:float=None, max_cpu_percent:float=None, cpu_samples:int=3, max_age_hours:float=None, interval:float=30.0) -> None:
+        self.max_rss_mb = max_rss_mb
+        self.min_available_mb = min_available_mb
+        self.max_cpu_percent = max_cpu_percent
+        # samples in a row over the cpu limit before recycling
+        self.cpu_samples = cpu_samples
+        self.max_age_hours = max_age_hours
+        # seconds between samples
+        self.interval = interval
+
+
+class CoordinationRecord(Record):
+    """
+    Purpose - Account leases, purchase limits and stock signal shared by bot nodes (keys match CoordinationManager)
+    """
+    __slots__ = ('path', 'node', 'lease_seconds', 'account_limit', 'global_limit', 'reserve_timeout', 'signal')
+
+    def __init__(self, path:str=COORDINATION_PATH, node:str=None, lease_seconds:float=60.0, account_limit:int=1, global_limit:int=None, reserve_timeout:float=300.0, signal:dict=None) -> None:
+        # shared database (every node has to see the same file)
+        self.path = path
+        # None is the host name and process id
+        self.node = node
+        self.lease_seconds = lease_seconds
+        # None is unlimited
+        self.account_limit = account_limit
+        self.global_limit = global_limit
+        self.reserve_timeout = reserve_timeout
+        # dict with port, peers and socket_dir (None turns the signal off)
+        self.signal = signal
+
+
+class NotificationRecord(Record):
+    """
+    Purpose - Notification sinks and retries (keys match NotificationManager)
+    """
+    __slots__ = ('sinks', 'max_retries', 'retry_delay', 'backoff', 'coalesce_window', 'smtp', 'file', 'webhook')
+    secret_fields = ('smtp', 'webhook')
+
+    def __init__(self, sinks:list=None, max_retries:int=3, retry_delay:float=2.0, backoff:float=2.0, coalesce_window:float=300.0, smtp:dict=None, file:dict=None, webhook:dict=None) -> None:
+        # None is gmail (or file without a gmail manager)
+        self.sinks = sinks
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.backoff = backoff
+        self.coalesce_window = coalesce_window
+        # settings of each sink (None uses the sink defaults)
+        self.smtp = smtp
+        self.file = file
+        self.webhook = webhook
+
+
+""" ------------------------------------------ Validate Funcs ------------------------------------------------ """
+def check_fields(problems:list, section:dict, where:str, fields:dict) -> dict:
+    """
+    Purpose - Checks the settings of a section, returns them with the defaults filled in and records unknown keys and values of the wrong kind
+
+    Param - problems: List the problems are added to
+
+    Param - section: The config section
+
+    Param - where: Where the section is in the config
+
+    Param - fields: Key -> (kind from KINDS, default), a None default makes the setting optional
+    """
+    for key in section:
+        if key not in fields:
+            problems.append(f'{where}.{key} is not a known setting')
+    values = {}
+    for key, (kind, default) in fields.items():
+        values[key] = value = section.get(key, default)
+        check, expected = KINDS[kind]
+        if value is not None and not check(value):
+            problems.append(f'{where}.{key} must be {expected}')
+            values[key] = default
+    return values
+
+
+def get_text(problems:list, section:dict, key:str, where:str, default:str=None) -> str:
+    """
+    Purpose - Gets a required (or defaulted) text field, records a problem if it is missing, not text or still a placeholder
+
+    Param - problems: List the problems are added to
+
+    Param - section: The config section
+
+    Param - key: Key of the field
+
+    Param - where: Where the section is in the config (for the problem)
+
+    Param - default: Value if the field is missing (None makes it required)
+    """
+    value = section.get(key, default)
+    if value is None:
+        problems.append(f'{where}.{key} is missing')
+    elif not isinstance(value, str):
+        problems.append(f'{where}.{key} must be text')
+    # unfilled sample value like <Product URL>
+    elif value.startswith('<') and value.endswith('>'):
+        problems.append(f'{where}.{key} still has its placeholder')
+    else:
+        return value
+    return default or ''
+
+
+def get_url(problems:list, section:dict, key:str, where:str) -> str:
+    """
+    Purpose - Gets a required http(s) url, records a problem if it is not one
+
+    Param - problems: List the problems are added to
+
+    Param - section: The config section
+
+    Param - key: Key of the field
+
+    Param - where: Where the section is in the config
+    """
+    count = len(problems)
+    url = get_text(problems, section, key, where)
+    if len(problems) == count and not url.startswith(('http://', 'https://')):
+        problems.append(f'{where}.{key} must be an http or https url')
+    return url
+
+
+def get_section(problems:list, settings:dict, key:str, where:str, kind:type=dict, required:bool=True) -> object:
+    """
+    Purpose - Gets a dict or list section, records a problem if it is missing or of the wrong kind
+
+    Param - problems: List the problems are added to
+
+    Param - settings: The config (or the section that holds this one)
+
+    Param - key: Key of the section
+
+    Param - where: Where the section is in the config
+
+    Param - kind: dict or list
+
+    Param - required: If a missing section is a problem
+    """
+    section = settings.get(key)
+    if section is None:
+        if required:
+            problems.append(f'{where}{key} is missing')
+        return kind()
+    if not isinstance(section, kind):
+        problems.append(f'{where}{key} must be a {kind.__name__}')
+        return kind()
+    return section
+
+
+def parse_account(problems:list, name:str, account:dict) -> AccountRecord:
+    """
+    Purpose - Builds an account record, records every problem with it
+
+    Param - problems: List the problems are added to
+
+    Param - name: Name of the account
+
+    Param - account: The account section
+    """
+    where = f"ada_fruit_accounts['{name}']"
+    if not isinstance(account, dict):
+        problems.append(f'{where} must be a dict')
+        return None
+    login_info = get_section(problems, account, 'login_info', f'{where}.')
+    checkout_info = get_section(problems, account, 'checkout_info', f'{where}.')
+    login = LoginRecord(*[get_text(problems, login_info, key, f'{where}.login_info') for key in LOGIN_FIELDS])
+    # the otp secret has to be base32 or every code fails at sign in
+    if login.otp:
+        try:
+            base64.b32decode(login.otp + '=' * (-len(login.otp) % 8), casefold=True)
+        except ValueError:
+            problems.append(f'{where}.login_info.otp must be the base32 secret of the authenticator')
+    address = AddressRecord(*[get_text(problems, checkout_info, key, f'{where}.checkout_info') for key in ADDRESS_FIELDS], get_text(problems, checkout_info, 'additional_address', f'{where}.checkout_info', ''))
+    return AccountRecord(name, login, address)
+
+
+def parse_scheduler(problems:list, settings:dict, poll_interval:float) -> SchedulerRecord:
+    """
+    Purpose - Builds the scheduler record, records every problem with the section
+
+    Param - problems: List the problems are added to
+
+    Param - settings: The config dict
+
+    Param - poll_interval: Base interval of the selenium section
+    """
+    section = get_section(problems, settings, 'scheduler', '', dict, False)
+    values = check_fields(problems, section, 'scheduler', {'interval':('number', poll_interval), 'min_interval':('number', .25), 'max_interval':('number', 300.0), 'jitter':('amount', .2), 'backoff':('number', 2.0), 'hot_windows':('list', []), 'hot_factor':('number', .25), 'learn_threshold':('count', 2)})
+    if values['min_interval'] > values['max_interval']:
+        problems.append('scheduler.min_interval must not be above scheduler.max_interval')
+    # every hot window needs a start and end time of day and known days
+    for index, window in enumerate(values['hot_windows']):
+        where = f'scheduler.hot_windows[{index}]'
+        if not isinstance(window, dict):
+            problems.append(f'{where} must be a dict')
+            continue
+        window = check_fields(problems, window, where, {'days':('list', WEEKDAYS), 'start':('text', None), 'end':('text', None)})
+        for key in ['start', 'end']:
+            try:
+                datetime.time.fromisoformat(window[key])
+            except (TypeError, ValueError):
+                problems.append(f'{where}.{key} must be a time of day like 11:00')
+        if not all(isinstance(day, str) and day.lower()[:3] in WEEKDAYS for day in window['days']):
+            problems.append(f'{where}.days must be a list of day names (mon - sun)')
+    return SchedulerRecord(**values)
+
+
+def parse_coordination(problems:list, settings:dict) -> CoordinationRecord:
+    """
+    Purpose - Builds the coordination record (None if the section is not set), records every problem with the section
+
+    Param - problems: List the problems are added to
+
+    Param - settings: The config dict
+    """
+    section = get_section(problems, settings, 'coordination', '', dict, False)
+    if not section:
+        return None
+    values = check_fields(problems, section, 'coordination', {'path':('text', COORDINATION_PATH), 'node':('text', None), 'lease_seconds':('number', 60.0), 'account_limit':('count', 1), 'global_limit':('count', None), 'reserve_timeout':('number', 300.0), 'signal':('dict', None)})
+    if values['signal']:
+        signal = check_fields(problems, values['signal'], 'coordination.signal', {'port':('count', None), 'peers':('list', []), 'socket_dir':('text', None)})
+        if signal['port'] and signal['port'] > 65535:
+            problems.append('coordination.signal.port must be a port number (1 - 65535)')
+        # peers are host or host:port
+        if not all(isinstance(peer, str) and (':' not in peer or peer.rsplit(':', 1)[1].isdigit()) for peer in signal['peers']):
+            problems.append('coordination.signal.peers must be a list of host:port addresses')
+    return CoordinationRecord(**values)
+
+
+def parse_notifications(problems:list, settings:dict) -> NotificationRecord:
+    """
+    Purpose - Builds the notification record, records every problem with the section and with the settings of the sinks it uses
+
+    Param - problems: List the problems are added to
+
+    Param - settings: The config dict
+    """
+    section = get_section(problems, settings, 'notifications', '', dict, False)
+    values = check_fields(problems, section, 'notifications', {'sinks':('list', None), 'max_retries':('whole', 3), 'retry_delay':('amount', 2.0), 'backoff':('number', 2.0), 'coalesce_window':('amount', 300.0), 'smtp':('dict', None), 'file':('dict', None), 'webhook':('dict', None)})
+    sinks = values['sinks'] if values['sinks'] is not None else []
+    for sink_name in sinks:
+        if sink_name not in NOTIFICATION_SINKS:
+            problems.append(f"notifications.sinks must only have {', '.join(NOTIFICATION_SINKS)}")
+            break
+    for sink_name, fields in SINK_FIELDS.items():
+        where = f'notifications.{sink_name}'
+        sink = values[sink_name] or {}
+        check_fields(problems, sink, where, fields)
+        # placeholders and urls only matter on the sinks that are used
+        if sink_name in sinks:
+            for key in fields:
+                if isinstance(sink.get(key), str):
+                    get_url(problems, sink, key, where) if key == 'url' else get_text(problems, sink, key, where)
+    # the webhook has no default url
+    if 'webhook' in sinks and 'url' not in (values['webhook'] or {}):
+        problems.append('notifications.webhook.url is missing')
+    return NotificationRecord(**values)
+
+
+def parse_config(settings:dict) -> dict:
+    """
+    Purpose - Validates the config and builds the records of its sections, raises ConfigError listing every problem
+
+    Param - settings: The config dict
+    """
+    problems = []
+    if not isinstance(settings, dict):
+        raise ConfigError(['config must be a dict'])
+    # selenium
+    selenium = get_section(problems, settings, 'selenium', '')
+    product_url = get_url(problems, selenium, 'url', 'selenium')
+    if not isinstance(selenium.get('driver_path', ''), str):
+        problems.append('selenium.driver_path must be text')
+    poll_interval = selenium.get('poll_interval', 1.0)
+    if isinstance(poll_interval, bool) or not isinstance(poll_interval, (int, float)) or poll_interval <= 0:
+        problems.append('selenium.poll_interval must be a number above 0')
+        poll_interval = 1.0
+    # accounts
+    accounts = {}
+    for name, account in get_section(problems, settings, 'ada_fruit_accounts', '').items():
+        accounts[name] = parse_account(problems, name, account)
+    if 'ada_fruit_accounts' in settings and not accounts:
+        problems.append('ada_fruit_accounts needs at least one account')
+    # watch list
+    watch_list = []
+    for index, entry in enumerate(get_section(problems, settings, 'watch_list', '', list, False)):
+        where = f'watch_list[{index}]'
+        if not isinstance(entry, dict):
+            problems.append(f'{where} must be a dict')
+            continue
+        url = get_url(problems, entry, 'url', where)
+        variants = entry.get('variants')
+        if not isinstance(variants, list) or not variants or not all(isinstance(variant, str) for variant in variants):
+            problems.append(f'{where}.variants must be a list of variant names')
+        purchase_limit = entry.get('purchase_limit')
+        if purchase_limit is not None and (isinstance(purchase_limit, bool) or not isinstance(purchase_limit, int) or purchase_limit < 0):
+            problems.append(f'{where}.purchase_limit must be a whole number of 0 or more')
+        watch_list.append(WatchRecord(url, variants, purchase_limit))
+    # checkout
+    checkout_config = get_section(problems, settings, 'checkout', '', dict, False)
+    if not isinstance(checkout_config.get('prestage', False), bool):
+        problems.append('checkout.prestage must be True or False')
+    checkout = CheckoutRecord(checkout_config.get('prestage', False), get_url(problems, checkout_config, 'url', 'checkout') if checkout_config.get('url') else None, get_text(problems, checkout_config, 'shipping_type', 'checkout', 'cheapest'))
+    # scheduler
+    scheduler = parse_scheduler(problems, settings, poll_interval)
+    # sign in, watchdog, coordination and notifications
+    login = SignInRecord(**check_fields(problems, get_section(problems, settings, 'login', '', dict, False), 'login', {'max_attempts':('count', 3), 'backoff':('amount', 2.0), 'backoff_factor':('number', 2.0), 'max_backoff':('amount', 30.0), 'otp_margin':('amount', 3.0)}))
+    watchdog = WatchdogRecord(**check_fields(problems, get_section(problems, settings, 'watchdog', '', dict, False), 'watchdog', {'max_rss_mb':('number', None), 'min_available_mb':('number', None), 'max_cpu_percent':('number', None), 'cpu_samples':('count', 3), 'max_age_hours':('number', None), 'interval':('number', 30.0)}))
+    coordination = parse_coordination(problems, settings)
+    notifications = parse_notifications(problems, settings)
+    if problems:
+        raise ConfigError(problems)
+    return {'product_url':product_url, 'accounts':accounts, 'watch_list':watch_list, 'checkout':checkout, 'scheduler':scheduler, 'login':login, 'watchdog':watchdog, 'coordination':coordination, 'notifications':notifications}
+
+
+class ConfigManager:
+    """
+    Purpose - Validated, typed view of the config that watches config.py and reloads accounts, product urls and checkout preferences while the bot runs
+    """
+    def __init__(self, settings:dict, path:str=CONFIG_PATH) -> None:
+        # raises ConfigError before anything starts
+        parsed = parse_config(settings)
+        self.settings = settings
+        # product url of the selenium section, account name -> AccountRecord, list of WatchRecord and the CheckoutRecord
+        self.product_url = parsed['product_url']
+        self.accounts = parsed['accounts']
+        self.watch_list = parsed['watch_list']
+        self.checkout = parsed['checkout']
+        # settings read at start (the coordination record is None if the section is not set)
+        self.scheduler = parsed['scheduler']
+        self.login = parsed['login']
+        self.watchdog = parsed['watchdog']
+        self.coordination = parsed['coordination']
+        self.notifications = parsed['notifications']
+        # watched file and its last seen (mtime, size)
+        self.path = path
+        self.stamp = self.get_stamp()
+        # called with the changed sections after a reload (runs on the watcher thread)
+        self.callback = None
+        self.interval = None
+        self.watcher = None
+
+    def get_stamp(self) -> tuple:
+        """
+        Purpose - Gets (mtime, size) of the config file, None if it does not exist
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def check(self) -> set:
+        """
+        Purpose - Reloads the config file if it changed, returns the names of the reloaded sections that changed (an invalid file is rejected and the running config kept)
+        """
+        stamp = self.get_stamp()
+        if stamp is None or stamp == self.stamp:
+            return set()
+        self.stamp = stamp
+        try:
+            settings = runpy.run_path(self.path)['config']
+            parsed = parse_config(settings)
+        # half saved file, syntax error or invalid values (tried again on the next save)
+        except Exception as e:
+            EVENTS.warning('config_rejected', '\nConfig change rejected, the running config is kept:\n{error}', error=str(e))
+            return set()
+        # new secrets are redacted before anything logs them
+        EVENTS.add_secrets(find_secrets(settings))
+        changes = {name for name in RELOADED if getattr(self, name) != parsed[name]}
+        # swap whole sections so readers never see half a reload
+        for name in changes:
+            setattr(self, name, parsed[name])
+        self.settings = settings
+        if changes:
+            EVENTS.info('config_reloaded', '\nConfig reloaded ({sections})', sections=', '.join(sorted(changes)))
+        return changes
+
+    def watch(self, callback:object, interval:float=2.0) -> None:
+        """
+        Purpose - Checks the config file in the background and calls back with the changed sections
+
+        Param - callback: Called with the set of changed section names
+
+        Param - interval: Seconds between checks
+        """
+        self.callback = callback
+        self.interval = interval
+        if self.watcher is None:
+            self.watcher = threading.Thread(target=self.run, name='config-watch', daemon=True)
+            self.watcher.start()
+
+    def run(self) -> None:
+        """
+        Purpose - Checks the config file every interval (runs on the watcher thread)
+        """
+        while True:
+            time.sleep(self.interval)
+            changes = self.check()
+            if not changes:
+                continue
+            try:
+                self.callback(changes)
+            except Exception as e:
+                EVENTS.error('config_reload_failed', '\nCould not apply the reloaded config: {error}', error=str(e))
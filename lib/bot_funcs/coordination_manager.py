@@ -0,0 +1,367 @@
+# local imports
+from lib.funcs import *
+# other imports
+import atexit, glob, json, socket, sqlite3, threading, time
+
+
+# coordination database (point it at a path every node can reach to coordinate several hosts)
+COORDINATION_PATH = convert_path_os('data/coordination/coordination.db')
+# account ownership and purchase ledger
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    account TEXT PRIMARY KEY,
+    node TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ledger (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    node TEXT NOT NULL,
+    account TEXT NOT NULL,
+    url TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ledger_account_status ON ledger (account, status);
+"""
+
+
+class StockSignal:
+    """
+    Purpose - Broadcasts and receives stock sightings between nodes over udp and/or unix datagram sockets
+    """
+    def __init__(self, node_id:str, port:int=None, peers:list=[], socket_dir:str=None, max_age:float=10.0) -> None:
+        # name of this node (its own signals are ignored)
+        self.node_id = node_id
+        # udp port to listen on and host:port peers to send to
+        self.port = port
+        self.peers = [(peer.rsplit(':', 1)[0], int(peer.rsplit(':', 1)[1])) if ':' in peer else (peer, port) for peer in peers]
+        # directory of unix sockets (one per node on this host)
+        self.socket_dir = socket_dir
+        # signals older than this are stale
+        self.max_age = max_age
+        # latest signal received and the event set when one arrives
+        self.latest = None
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        # sequence number of signals sent
+        self.sequence = 0
+        # sockets
+        self.sockets = []
+        if self.port:
+            udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            udp_socket.bind(('', self.port))
+            self.sockets.append(udp_socket)
+        if self.socket_dir:
+            os.makedirs(self.socket_dir, exist_ok=True)
+            self.socket_path = os.path.join(self.socket_dir, f'{self.node_id}.sock')
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            unix_socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            unix_socket.bind(self.socket_path)
+            self.sockets.append(unix_socket)
+        # one listener thread per socket
+        for listen_socket in self.sockets:
+            threading.Thread(target=self.listen, args=(listen_socket,), name='stock-signal', daemon=True).start()
+
+    def send(self, url:str, variants:list) -> int:
+        """
+        Purpose - Tells every peer that stock was seen, returns the number of peers it was sent to
+
+        Param - url: The product page with stock
+
+        Param - variants: The variants in stock
+        """
+        self.sequence += 1
+        payload = json.dumps({'node':self.node_id, 'sequence':self.sequence, 'ts':time.time(), 'url':url, 'variants':variants}).encode()
+        sent = 0
+        # udp peers
+        if self.peers:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp_socket:
+                udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+                for peer in self.peers:
+                    try:
+                        udp_socket.sendto(payload, peer)
+                        sent += 1
+                    except OSError as e:
+                        print(f'Could not signal {peer[0]}:{peer[1]}: {e}')
+        # unix socket peers on this host
+        if self.socket_dir:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as unix_socket:
+                for path in glob.glob(os.path.join(self.socket_dir, '*.sock')):
+                    if path == self.socket_path:
+                        continue
+                    try:
+                        unix_socket.sendto(payload, path)
+                        sent += 1
+                    # node that is gone
+                    except OSError:
+                        pass
+        return sent
+
+    def listen(self, listen_socket:socket.socket) -> None:
+        """
+        Purpose - Receives signals from peers (runs on a listener thread)
+
+        Param - listen_socket: The bound socket
+        """
+        while True:
+            try:
+                data = listen_socket.recv(65536)
+            # socket closed
+            except OSError:
+                return
+            try:
+                signal = json.loads(data)
+            except ValueError:
+                continue
+            # own or malformed signal
+            if signal.get('node') == self.node_id or 'url' not in signal:
+                continue
+            signal['received'] = time.monotonic()
+            with self.lock:
+                self.latest = signal
+            self.event.set()
+
+    def wait(self, timeout:float) -> dict:
+        """
+        Purpose - Waits for a signal from a peer, returns it (url, variants, node) or None on timeout
+
+        Param - timeout: Seconds to wait
+        """
+        if not self.event.wait(max(0.0, timeout)):
+            return None
+        return self.take()
+
+    def take(self) -> dict:
+        """
+        Purpose - Takes the latest signal if there is a fresh one, None otherwise
+        """
+        with self.lock:
+            signal, self.latest = self.latest, None
+            self.event.clear()
+        if signal and time.monotonic() - signal['received'] <= self.max_age:
+            return signal
+        return None
+
+    def close(self) -> None:
+        """
+        Purpose - Closes the sockets
+        """
+        for listen_socket in self.sockets:
+            listen_socket.close()
+        if self.socket_dir and os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+class CoordinationManager:
+    """
+    Purpose - Lets several bot nodes share one watch without double buying through account leases and a purchase ledger in sqlite
+    """
+    def __init__(self, path:str=COORDINATION_PATH, node_id:str=None, lease_seconds:float=60.0, account_limit:int=1, global_limit:int=None, reserve_timeout:float=300.0, signal:StockSignal=None) -> None:
+        # database path
+        self.path = path
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # name of this node
+        self.node_id = node_id if node_id else f'{socket.gethostname()}-{os.getpid()}'
+        # seconds a lease lasts without renewal
+        self.lease_seconds = lease_seconds
+        # purchase limits (None is unlimited)
+        self.account_limit = account_limit
+        self.global_limit = global_limit
+        # seconds a reservation blocks others before it is treated as abandoned (the node died while submitting)
+        self.reserve_timeout = reserve_timeout
+        # stock signal between nodes
+        self.signal = signal
+        # connection of each thread (kept open between calls, a sqlite connection can not move between threads)
+        self.local = threading.local()
+        # create tables (rollback journal since wal does not work over network filesystems)
+        with self.connect() as connection:
+            connection.executescript(SCHEMA)
+        # renew held leases in the background
+        self.renew_thread = threading.Thread(target=self.renew_forever, name='lease-renew', daemon=True)
+        self.renew_thread.start()
+        # give the leases back on a clean exit so other nodes do not wait for them to expire
+        atexit.register(self.release_all)
+
+    @classmethod
+    def from_config(cls, coordination_config:dict) -> 'CoordinationManager':
+        """
+        Purpose - Builds a coordination manager from the coordination section of the config
+
+        Param - coordination_config: The coordination config section
+        """
+        # a configured node name is used as is, the host name gets the process id so nodes on one host differ
+        node_id = coordination_config.get('node') or f'{socket.gethostname()}-{os.getpid()}'
+        signal_config = coordination_config.get('signal', {})
+        signal = StockSignal(node_id, signal_config.get('port'), signal_config.get('peers', []), signal_config.get('socket_dir')) if signal_config else None
+        return cls(coordination_config.get('path', COORDINATION_PATH), node_id, coordination_config.get('lease_seconds', 60.0), coordination_config.get('account_limit', 1), coordination_config.get('global_limit'), coordination_config.get('reserve_timeout', 300.0), signal)
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Purpose - Gets the connection of the calling thread (opened on first use), it waits on locks held by other nodes instead of failing
+        """
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=DELETE')
+        return connection
+
+    """ ------------------------------------------ Lease Methods ------------------------------------------------ """
+    def acquire(self, account:str) -> bool:
+        """
+        Purpose - Takes or renews the lease on an account, returns false if another node holds it
+
+        Param - account: Name of the account
+        """
+        now = time.time()
+        with self.connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute('SELECT node, expires FROM leases WHERE account = ?', (account,)).fetchone()
+            # held by a live node
+            if row and row[0] != self.node_id and row[1] > now:
+                connection.execute('ROLLBACK')
+                return False
+            connection.execute('INSERT OR REPLACE INTO leases VALUES (?, ?, ?)', (account, self.node_id, now + self.lease_seconds))
+            connection.execute('COMMIT')
+        return True
+
+    def holds(self, account:str) -> bool:
+        """
+        Purpose - Returns true if this node holds a live lease on the account
+
+        Param - account: Name of the account
+        """
+        with self.connect() as connection:
+            row = connection.execute('SELECT node, expires FROM leases WHERE account = ?', (account,)).fetchone()
+        return bool(row) and row[0] == self.node_id and row[1] > time.time()
+
+    def release(self, account:str) -> None:
+        """
+        Purpose - Gives up the lease on an account
+
+        Param - account: Name of the account
+        """
+        with self.connect() as connection:
+            connection.execute('DELETE FROM leases WHERE account = ? AND node = ?', (account, self.node_id))
+
+    def release_all(self) -> None:
+        """
+        Purpose - Gives up every lease this node holds (runs at exit)
+        """
+        try:
+            with self.connect() as connection:
+                connection.execute('DELETE FROM leases WHERE node = ?', (self.node_id,))
+        # shared path unreachable, the leases expire on their own
+        except sqlite3.Error as e:
+            print(f'Could not release leases: {e}')
+
+    def renew_forever(self) -> None:
+        """
+        Purpose - Renews every lease this node holds a few times per lease (runs on the renew thread)
+        """
+        while True:
+            time.sleep(self.lease_seconds / 3)
+            try:
+                with self.connect() as connection:
+                    connection.execute('UPDATE leases SET expires = ? WHERE node = ? AND expires > ?', (time.time() + self.lease_seconds, self.node_id, time.time()))
+            # shared path briefly unreachable, the next renewal retries
+            except sqlite3.Error as e:
+                print(f'Could not renew leases: {e}')
+
+    def next_account(self, accounts:list, current:str=None) -> str:
+        """
+        Purpose - Leases the first account after the current one that no other node holds and that can still purchase, None if there is none
+
+        Param - accounts: Account names in order
+
+        Param - current: Account to start after (from the start if None)
+        """
+        start = accounts.index(current) + 1 if current in accounts else 0
+        for account in accounts[start:] + accounts[:start]:
+            if self.can_purchase(account) and self.acquire(account):
+                return account
+        return None
+
+    """ ------------------------------------------ Ledger Methods ------------------------------------------------ """
+    def count(self, connection:sqlite3.Connection, account:str=None) -> int:
+        """
+        Purpose - Counts purchases and live reservations of an account (all accounts if None)
+
+        Param - connection: Open connection
+
+        Param - account: Name of the account
+        """
+        query = "SELECT COUNT(*) FROM ledger WHERE (status = 'committed' OR (status = 'reserved' AND ts > ?))" + (' AND account = ?' if account else '')
+        return connection.execute(query, (time.time() - self.reserve_timeout, account) if account else (time.time() - self.reserve_timeout,)).fetchone()[0]
+
+    def under_limits(self, connection:sqlite3.Connection, account:str) -> bool:
+        """
+        Purpose - Returns true if one more order on the account stays within both limits
+
+        Param - connection: Open connection
+
+        Param - account: Name of the account
+        """
+        return (self.account_limit is None or self.count(connection, account) < self.account_limit) and (self.global_limit is None or self.count(connection) < self.global_limit)
+
+    def can_purchase(self, account:str) -> bool:
+        """
+        Purpose - Returns true if the account could still make a purchase
+
+        Param - account: Name of the account
+        """
+        with self.connect() as connection:
+            return self.under_limits(connection, account)
+
+    def reserve(self, account:str, url:str='', variant:str='') -> int:
+        """
+        Purpose - Reserves an order right before submitting, returns the ledger id or None if the lease is lost or a limit would be exceeded
+
+        Param - account: Name of the account
+
+        Param - url: Product page being bought
+
+        Param - variant: Variant being bought
+        """
+        now = time.time()
+        with self.connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            lease = connection.execute('SELECT node, expires FROM leases WHERE account = ?', (account,)).fetchone()
+            # another node owns the account or a limit is reached
+            if not lease or lease[0] != self.node_id or lease[1] <= now or not self.under_limits(connection, account):
+                connection.execute('ROLLBACK')
+                return None
+            ledger_id = connection.execute("INSERT INTO ledger (ts, node, account, url, variant, status) VALUES (?, ?, ?, ?, ?, 'reserved')", (now, self.node_id, account, url, variant)).lastrowid
+            connection.execute('COMMIT')
+        return ledger_id
+
+    def commit(self, ledger_id:int) -> None:
+        """
+        Purpose - Turns a reservation into a purchase
+
+        Param - ledger_id: Id returned by reserve
+        """
+        with self.connect() as connection:
+            connection.execute("UPDATE ledger SET status = 'committed', ts = ? WHERE id = ?", (time.time(), ledger_id))
+
+    def cancel(self, ledger_id:int) -> None:
+        """
+        Purpose - Gives back a reservation after a failed submit
+
+        Param - ledger_id: Id returned by reserve
+        """
+        with self.connect() as connection:
+            connection.execute("UPDATE ledger SET status = 'released', ts = ? WHERE id = ?", (time.time(), ledger_id))
+
+    def purchases(self, account:str=None) -> list:
+        """
+        Purpose - Gets committed purchases as a list of (time, node, account, url, variant)
+
+        Param - account: Only this account (all if None)
+        """
+        with self.connect() as connection:
+            return connection.execute("SELECT ts, node, account, url, variant FROM ledger WHERE status = 'committed'" + (' AND account = ?' if account else '') + ' ORDER BY ts', (account,) if account else ()).fetchall()
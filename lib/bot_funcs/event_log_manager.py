@@ -0,0 +1,248 @@
+# local imports
+from lib.funcs import *
+# other imports
+import atexit, collections, json, queue, re, threading, time
+
+
+# event log and crash dumps
+EVENT_LOG_PATH = convert_path_os('data/logs/events.jsonl')
+# levels
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {'debug':DEBUG, 'info':INFO, 'warning':WARNING, 'error':ERROR, 'off':100}
+# config keys whose values are secrets or personal (everything under login_info and checkout_info)
+SECRET_KEY_PATTERN = re.compile(r'pass|otp|secret|token|api_key|client_id|cvv|card|login_info|checkout_info|username|address|phone', re.IGNORECASE)
+# secret values shorter than this are only redacted by key (short values would match everywhere)
+MIN_SECRET_LENGTH = 4
+
+
+def find_secrets(settings:object, secret:bool=False) -> set:
+    """
+    Purpose - Gets every string value in a config that is stored under a secret looking key
+
+    Param - settings: The config (or part of it)
+
+    Param - secret: If the value is under a secret key
+    """
+    if isinstance(settings, dict):
+        return set().union(*[find_secrets(value, secret or bool(SECRET_KEY_PATTERN.search(str(key)))) for key, value in settings.items()])
+    if isinstance(settings, (list, tuple)):
+        return set().union(*[find_secrets(value, secret) for value in settings])
+    if secret and isinstance(settings, (str, int)) and len(str(settings)) >= MIN_SECRET_LENGTH:
+        return {str(settings)}
+    return set()
+
+
+class EventLogManager:
+    """
+    Purpose - Structured event log that writes json lines and console lines from a background writer, keeps the last events in memory for crash dumps and redacts secrets
+    """
+    def __init__(self, path:str=EVENT_LOG_PATH, file_level:str='info', console_level:str='info', ring_size:int=500, max_bytes:int=10 * 1024 * 1024) -> None:
+        # json lines file (rotated to .1 once it passes max_bytes)
+        self.path = path
+        self.max_bytes = max_bytes
+        # levels of the file and the console, events below both are dropped on the first line of log
+        self.file_level = LEVELS[file_level]
+        self.console_level = LEVELS[console_level]
+        self.level = min(self.file_level, self.console_level)
+        # last events for crash dumps
+        self.ring = collections.deque(maxlen=ring_size)
+        # secret values and a pattern that finds them
+        self.secrets = set()
+        self.secret_pattern = None
+        # events waiting to be written
+        self.queue = queue.SimpleQueue()
+        self.file = None
+        # writer
+        self.writer = threading.Thread(target=self.run, name='event-log', daemon=True)
+        self.writer.start()
+        atexit.register(self.flush)
+
+    def configure(self, event_log_config:dict={}, settings:dict=None) -> None:
+        """
+        Purpose - Applies the event_log section of the config and learns the secrets to redact
+
+        Param - event_log_config: The event_log config section
+
+        Param - settings: The whole config (string values under secret keys are redacted)
+        """
+        self.path = event_log_config.get('path', self.path)
+        self.max_bytes = event_log_config.get('max_bytes', self.max_bytes)
+        self.file_level = LEVELS[event_log_config.get('file_level', 'info')]
+        self.console_level = LEVELS[event_log_config.get('console_level', 'info')]
+        self.level = min(self.file_level, self.console_level)
+        self.ring = collections.deque(self.ring, maxlen=event_log_config.get('ring_size', self.ring.maxlen))
+        if settings:
+            self.add_secrets(find_secrets(settings))
+
+    def add_secrets(self, secrets:set) -> None:
+        """
+        Purpose - Adds values that are always redacted
+
+        Param - secrets: The secret values
+        """
+        self.secrets |= {secret for secret in secrets if len(secret) >= MIN_SECRET_LENGTH}
+        # longest first so a secret that contains another is redacted whole
+        self.secret_pattern = re.compile('|'.join(re.escape(secret) for secret in sorted(self.secrets, key=len, reverse=True))) if self.secrets else None
+
+    def enabled(self, level:int) -> bool:
+        """
+        Purpose - Returns true if events of a level are logged (check it before building an expensive event)
+
+        Param - level: The level number
+        """
+        return level >= self.level
+
+    """ ------------------------------------------ Log Methods ------------------------------------------------ """
+    def log(self, level:int, event:str, message:str=None, **fields) -> None:
+        """
+        Purpose - Logs an event without blocking on any output
+
+        Param - level: The level number
+
+        Param - event: Name of the event
+
+        Param - message: Console text, formatted with the fields only if the event is logged
+
+        Param - fields: Event fields (not changed after they are logged)
+        """
+        # disabled levels cost one comparison
+        if level < self.level:
+            return
+        # formatting and redaction happen on the writer (or when dumped) so the caller only pays for an append
+        entry = (time.time(), level, event, message, fields)
+        self.ring.append(entry)
+        self.queue.put(entry)
+
+    def render(self, entry:tuple) -> dict:
+        """
+        Purpose - Builds the redacted event record of a log entry
+
+        Param - entry: The (time, level, event, message, fields) entry
+        """
+        timestamp, level, event, message, fields = entry
+        record = {'ts':timestamp, 'level':level, 'event':event, **self.redact(fields)}
+        if message is not None:
+            record['message'] = self.redact_text(message.format(**fields) if fields else message)
+        return record
+
+    def debug(self, event:str, message:str=None, **fields) -> None:
+        """
+        Purpose - Logs a debug event (per poll details)
+        """
+        if DEBUG >= self.level:
+            self.log(DEBUG, event, message, **fields)
+
+    def info(self, event:str, message:str=None, **fields) -> None:
+        """
+        Purpose - Logs an info event
+        """
+        if INFO >= self.level:
+            self.log(INFO, event, message, **fields)
+
+    def warning(self, event:str, message:str=None, **fields) -> None:
+        """
+        Purpose - Logs a warning event
+        """
+        self.log(WARNING, event, message, **fields)
+
+    def error(self, event:str, message:str=None, **fields) -> None:
+        """
+        Purpose - Logs an error event
+        """
+        self.log(ERROR, event, message, **fields)
+
+    """ ------------------------------------------ Redact Methods ------------------------------------------------ """
+    def redact(self, fields:dict) -> dict:
+        """
+        Purpose - Redacts fields under secret keys and secret values inside any field
+
+        Param - fields: The event fields
+        """
+        return {key: '***' if SECRET_KEY_PATTERN.search(key) else self.redact_value(value) for key, value in fields.items()}
+
+    def redact_value(self, value:object) -> object:
+        """
+        Purpose - Redacts secrets in a field value (dicts and lists are walked)
+
+        Param - value: The value
+        """
+        if isinstance(value, str):
+            return self.redact_text(value)
+        if isinstance(value, dict):
+            return self.redact({str(key):item for key, item in value.items()})
+        if isinstance(value, (list, tuple)):
+            return [self.redact_value(item) for item in value]
+        return value
+
+    def redact_text(self, text:str) -> str:
+        """
+        Purpose - Replaces every known secret in a string
+
+        Param - text: The text
+        """
+        return self.secret_pattern.sub('***', text) if self.secret_pattern else text
+
+    """ ------------------------------------------ Writer Methods ------------------------------------------------ """
+    def run(self) -> None:
+        """
+        Purpose - Writes queued events to the console and the file (runs on the writer thread)
+        """
+        while True:
+            entry = self.queue.get()
+            # flush marker
+            if isinstance(entry, threading.Event):
+                if self.file:
+                    self.file.flush()
+                entry.set()
+                continue
+            try:
+                self.write(self.render(entry))
+            except Exception as e:
+                print(f'Could not write event: {e}')
+
+    def write(self, record:dict) -> None:
+        """
+        Purpose - Writes one event
+
+        Param - record: The event
+        """
+        if record['level'] >= self.console_level and 'message' in record:
+            print(record['message'])
+        if record['level'] >= self.file_level:
+            if self.file is None:
+                if os.path.dirname(self.path):
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self.file = open(self.path, 'a')
+            self.file.write(json.dumps({**record, 'message':record.get('message', '').strip()} if 'message' in record else record, default=str) + '\n')
+            # rotate
+            if self.file.tell() > self.max_bytes:
+                self.file.close()
+                os.replace(self.path, f'{self.path}.1')
+                self.file = None
+
+    def flush(self, timeout:float=5.0) -> bool:
+        """
+        Purpose - Waits until every queued event is written, returns false on timeout
+
+        Param - timeout: Seconds to wait
+        """
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def dump(self, reason:str='crash') -> str:
+        """
+        Purpose - Writes the events in the ring buffer to a file next to the event log, returns its path
+
+        Param - reason: Why the events are dumped (part of the file name)
+        """
+        path = os.path.join(os.path.dirname(self.path), f'{reason}_{time.strftime("%Y%m%d_%H%M%S")}.jsonl')
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            for entry in list(self.ring):
+                f.write(json.dumps(self.render(entry), default=str) + '\n')
+        return path
+
+
+# process wide event log
+EVENTS = EventLogManager()
@@ -0,0 +1,161 @@
+# local imports
+from lib.funcs import *
+# other imports
+import argparse, atexit, sqlite3, threading, time
+
+
+# stock history database
+HISTORY_PATH = convert_path_os('data/history/stock_history.db')
+# table of observations
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    ts REAL NOT NULL,
+    url TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    in_stock INTEGER NOT NULL,
+    latency_ms REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS observations_url_variant_ts ON observations (url, variant, ts);
+"""
+
+
+class HistoryManager:
+    """
+    Purpose - Append only sqlite store of every stock observation, buffered so recording on every poll stays cheap (safe to use from any thread, several processes may share the file)
+    """
+    def __init__(self, path:str=HISTORY_PATH, flush_every:int=200, flush_interval:float=10.0) -> None:
+        # database path
+        self.path = path
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # database connection (built on a startup thread and used from the poll thread and atexit, so every use holds the lock)
+        self.lock = threading.RLock()
+        # waits on writes of other processes (race workers share the file) instead of failing
+        self.connection = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        # wal so reports and other processes can read while the bot writes
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        # rows waiting to be written and when to write them
+        self.buffer = []
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.last_flush = time.monotonic()
+        # write what is left on exit
+        atexit.register(self.close)
+
+    """ ------------------------------------------ Write Methods ------------------------------------------------ """
+    def record(self, url:str, variants:list, latency:float) -> None:
+        """
+        Purpose - Records one poll of a product page
+
+        Param - url: The product page url
+
+        Param - variants: List of (variant name, in stock) tuples seen by the poll
+
+        Param - latency: Seconds the poll took
+        """
+        now, latency_ms = time.time(), latency * 1000
+        with self.lock:
+            self.buffer.extend((now, url, name, int(in_stock), latency_ms) for name, in_stock in variants)
+            # write in batches
+            if len(self.buffer) >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_interval:
+                self.flush()
+
+    def flush(self) -> None:
+        """
+        Purpose - Writes buffered observations to the database
+        """
+        with self.lock:
+            self.last_flush = time.monotonic()
+            if not self.buffer or not self.connection:
+                return
+            with self.connection:
+                self.connection.executemany('INSERT INTO observations VALUES (?, ?, ?, ?, ?)', self.buffer)
+            self.buffer = []
+
+    def close(self) -> None:
+        """
+        Purpose - Flushes and closes the database
+        """
+        with self.lock:
+            if self.connection:
+                self.flush()
+                self.connection.close()
+                self.connection = None
+
+    """ ------------------------------------------ Query Methods ------------------------------------------------ """
+    def stock_windows(self, url:str=None, since:float=0.0) -> list:
+        """
+        Purpose - Gets every in stock window as a list of (url, variant, restock time, sold out time or None if still in stock, seconds in stock)
+
+        Param - url: Only windows of this product url (all urls if None)
+
+        Param - since: Only observations after this unix time
+        """
+        self.flush()
+        query = 'SELECT ts, url, variant, in_stock FROM observations WHERE ts >= ?' + (' AND url = ?' if url else '') + ' ORDER BY url, variant, ts'
+        with self.lock:
+            rows = self.connection.execute(query, (since, url) if url else (since,)).fetchall()
+        windows, open_windows, last_seen = [], {}, {}
+        for ts, row_url, variant, in_stock in rows:
+            key = (row_url, variant)
+            # restock
+            if in_stock and key not in open_windows:
+                open_windows[key] = ts
+            # sold out
+            elif not in_stock and key in open_windows:
+                restock = open_windows.pop(key)
+                windows.append((row_url, variant, restock, ts, ts - restock))
+            last_seen[key] = ts
+        # windows that are still open last until the latest observation
+        for key, restock in open_windows.items():
+            windows.append((key[0], key[1], restock, None, last_seen[key] - restock))
+        return sorted(windows, key=lambda window: window[2])
+
+    def latency_percentiles(self, url:str=None, since:float=0.0, percentiles:list=[50, 90, 99, 100]) -> dict:
+        """
+        Purpose - Gets poll latency percentiles in ms per url as {url: {percentile: latency}}
+
+        Param - url: Only this product url (all urls if None)
+
+        Param - since: Only observations after this unix time
+
+        Param - percentiles: Percentiles to compute
+        """
+        self.flush()
+        # one latency per poll (every variant of a poll shares the timestamp)
+        query = 'SELECT url, latency_ms FROM observations WHERE ts >= ?' + (' AND url = ?' if url else '') + ' GROUP BY url, ts ORDER BY url, latency_ms'
+        with self.lock:
+            rows = self.connection.execute(query, (since, url) if url else (since,)).fetchall()
+        latencies = {}
+        for row_url, latency_ms in rows:
+            latencies.setdefault(row_url, []).append(latency_ms)
+        return {row_url: {percentile: values[min(len(values) - 1, int(len(values) * percentile / 100))] for percentile in percentiles} for row_url, values in latencies.items()}
+
+    def report(self, url:str=None, since:float=0.0) -> str:
+        """
+        Purpose - Builds a text report of restock times, in stock window lengths and poll latency
+
+        Param - url: Only this product url (all urls if None)
+
+        Param - since: Only observations after this unix time
+        """
+        lines = ['Restocks:']
+        for window_url, variant, restock, sold_out, duration in self.stock_windows(url, since):
+            state = f'sold out after {duration:.1f}s' if sold_out else f'still in stock after {duration:.1f}s'
+            lines.append(f'  {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(restock))}  {variant:<20} {state}  {window_url}')
+        lines.append('Poll latency (ms):')
+        for latency_url, values in self.latency_percentiles(url, since).items():
+            lines.append(f'  {latency_url}  ' + '  '.join(f'p{percentile}={latency:.1f}' for percentile, latency in values.items()))
+        return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Report restock times, in stock windows and poll latency from the stock history')
+    arg_parser.add_argument('--db', default=HISTORY_PATH, help='path of the history database')
+    arg_parser.add_argument('--url', default=None, help='only report this product url')
+    arg_parser.add_argument('--hours', type=float, default=None, help='only report the last N hours')
+    args = arg_parser.parse_args()
+    history_manager = HistoryManager(args.db)
+    print(history_manager.report(args.url, time.time() - args.hours * 3600 if args.hours else 0.0))
@@ -0,0 +1,269 @@
+# other imports
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from bisect import bisect_left
+import threading, time
+
+
+# default histogram buckets in seconds
+BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def format_labels(labels:tuple) -> str:
+    """
+    Purpose - Formats a tuple of (name, value) label pairs in prometheus text format
+
+    Param - labels: The label pairs
+    """
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}' if labels else ''
+
+
+class Counter:
+    """
+    Purpose - A monotonically increasing counter
+    """
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount:float=1) -> None:
+        """
+        Purpose - Increments the counter
+
+        Param - amount: Amount to increment by
+        """
+        self.value += amount
+
+    def samples(self, name:str, labels:tuple) -> list:
+        """
+        Purpose - Gets the prometheus text lines of the metric
+
+        Param - name: Metric name
+
+        Param - labels: Label pairs of the metric
+        """
+        return [f'{name}{format_labels(labels)} {self.value}']
+
+
+class Gauge:
+    """
+    Purpose - A value that can go up and down
+    """
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def set(self, value:float) -> None:
+        """
+        Purpose - Sets the gauge
+
+        Param - value: The new value
+        """
+        self.value = value
+
+    def samples(self, name:str, labels:tuple) -> list:
+        """
+        Purpose - Gets the prometheus text lines of the metric
+
+        Param - name: Metric name
+
+        Param - labels: Label pairs of the metric
+        """
+        return [f'{name}{format_labels(labels)} {self.value}']
+
+
+class Histogram:
+    """
+    Purpose - A fixed bucket histogram (observing is one bisect and two additions)
+    """
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets:tuple=BUCKETS) -> None:
+        self.buckets = buckets
+        # per bucket counts (last one is +Inf), cumulated when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value:float) -> None:
+        """
+        Purpose - Records a value
+
+        Param - value: The value to record
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @property
+    def mean(self) -> float:
+        """
+        Purpose - Gets the mean of the observed values
+        """
+        return self.sum / self.count if self.count else 0.0
+
+    def samples(self, name:str, labels:tuple) -> list:
+        """
+        Purpose - Gets the prometheus text lines of the metric
+
+        Param - name: Metric name
+
+        Param - labels: Label pairs of the metric
+        """
+        lines, cumulative = [], 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{format_labels(labels + (("le", bound),))} {cumulative}')
+        lines.append(f'{name}_sum{format_labels(labels)} {self.sum}')
+        lines.append(f'{name}_count{format_labels(labels)} {self.count}')
+        return lines
+
+
+class PhaseTimer:
+    """
+    Purpose - Context manager that observes the time spent in a block into a histogram
+    """
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram:Histogram) -> None:
+        self.histogram = histogram
+
+    def __enter__(self) -> 'PhaseTimer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class MetricsManager:
+    """
+    Purpose - In memory registry of counters, gauges and histograms rendered in prometheus text format
+    """
+    def __init__(self) -> None:
+        # name -> (type, help, {labels: metric})
+        self.families = {}
+        self.lock = threading.Lock()
+        # phase name -> phase latency histogram
+        self.phase_histograms = {}
+        # metrics http server
+        self.httpd = None
+
+    """ ------------------------------------------ Registry Methods ------------------------------------------------ """
+    def get_metric(self, metric_type:type, name:str, help_text:str, labels:dict) -> object:
+        """
+        Purpose - Gets or creates a metric (look ups should be done once and the metric kept in hot loops)
+
+        Param - metric_type: Counter, Gauge or Histogram
+
+        Param - name: Metric name
+
+        Param - help_text: Metric description
+
+        Param - labels: Label names and values
+        """
+        label_key = tuple(sorted(labels.items())) if labels else ()
+        with self.lock:
+            family = self.families.setdefault(name, (metric_type, help_text, {}))
+            if label_key not in family[2]:
+                family[2][label_key] = metric_type()
+            return family[2][label_key]
+
+    def counter(self, name:str, help_text:str='', **labels) -> Counter:
+        """
+        Purpose - Gets or creates a counter
+
+        Param - name: Metric name
+
+        Param - help_text: Metric description
+
+        Param - labels: Label names and values
+        """
+        return self.get_metric(Counter, name, help_text, labels)
+
+    def gauge(self, name:str, help_text:str='', **labels) -> Gauge:
+        """
+        Purpose - Gets or creates a gauge
+
+        Param - name: Metric name
+
+        Param - help_text: Metric description
+
+        Param - labels: Label names and values
+        """
+        return self.get_metric(Gauge, name, help_text, labels)
+
+    def histogram(self, name:str, help_text:str='', **labels) -> Histogram:
+        """
+        Purpose - Gets or creates a histogram
+
+        Param - name: Metric name
+
+        Param - help_text: Metric description
+
+        Param - labels: Label names and values
+        """
+        return self.get_metric(Histogram, name, help_text, labels)
+
+    def phase(self, phase:str) -> PhaseTimer:
+        """
+        Purpose - Times a purchase phase into the phase latency histogram
+
+        Param - phase: Name of the phase
+        """
+        # cached so the hot loop skips the registry lock
+        histogram = self.phase_histograms.get(phase)
+        if histogram is None:
+            histogram = self.phase_histograms[phase] = self.histogram('adafruit_phase_seconds', 'Time spent in each purchase phase', phase=phase)
+        return PhaseTimer(histogram)
+
+    """ ------------------------------------------ Export Methods ------------------------------------------------ """
+    def render(self) -> str:
+        """
+        Purpose - Renders every metric in prometheus text format
+        """
+        lines = []
+        with self.lock:
+            families = [(name, family[0], family[1], list(family[2].items())) for name, family in self.families.items()]
+        for name, metric_type, help_text, metrics in families:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type.__name__.lower()}')
+            for labels, metric in metrics:
+                lines.extend(metric.samples(name, labels))
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port:int=9108, host:str='127.0.0.1') -> None:
+        """
+        Purpose - Serves /metrics on a background thread
+
+        Param - port: Port to listen on
+
+        Param - host: Address to listen on (local only by default)
+        """
+        metrics_manager = self
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                # only the metrics path
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = metrics_manager.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format:str, *args) -> None:
+                pass
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        # metrics prompt
+        print(f'Metrics at http://{host}:{self.httpd.server_address[1]}/metrics')
+
+
+# process wide metrics
+METRICS = MetricsManager()
@@ -0,0 +1,262 @@
+# local imports
+from lib.funcs import *
+# other imports
+from email.mime.text import MIMEText
+import atexit, json, queue, smtplib, threading, time, urllib3
+
+
+# default file sink
+NOTIFICATION_PATH = convert_path_os('data/notifications.log')
+
+
+""" ------------------------------------------ Sinks ------------------------------------------------ """
+class GmailSink:
+    """
+    Purpose - Sends notifications through the Gmail api
+    """
+    name = 'gmail'
+
+    def __init__(self, gmail_manager:object) -> None:
+        self.gmail_manager = gmail_manager
+
+    def send(self, subject:str, body:str) -> None:
+        """
+        Purpose - Sends a notification, raises if it was not sent
+
+        Param - subject: Subject line
+
+        Param - body: Message text
+        """
+        self.gmail_manager.deliver(body, subject)
+
+
+class SmtpSink:
+    """
+    Purpose - Sends notifications to an smtp server
+    """
+    name = 'smtp'
+
+    def __init__(self, host:str='127.0.0.1', port:int=25, sender:str='adafruit-bot@localhost', to:str=None, username:str=None, password:str=None, starttls:bool=False, timeout:float=10.0) -> None:
+        # server
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.starttls = starttls
+        # login (skipped if no username)
+        self.username = username
+        self.password = password
+        # addresses
+        self.sender = sender
+        self.to = to or sender
+
+    def send(self, subject:str, body:str) -> None:
+        """
+        Purpose - Sends a notification, raises if it was not sent
+
+        Param - subject: Subject line
+
+        Param - body: Message text
+        """
+        message = MIMEText(body)
+        message['To'] = self.to
+        message['From'] = self.sender
+        message['Subject'] = subject
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+
+class FileSink:
+    """
+    Purpose - Appends notifications to a local file
+    """
+    name = 'file'
+
+    def __init__(self, path:str=NOTIFICATION_PATH) -> None:
+        self.path = path
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def send(self, subject:str, body:str) -> None:
+        """
+        Purpose - Writes a notification, raises if it was not written
+
+        Param - subject: Subject line
+
+        Param - body: Message text
+        """
+        with open(self.path, 'a') as f:
+            f.write(f'{time.strftime("%Y-%m-%d %H:%M:%S")}  {subject}\n{body}\n\n')
+
+
+class WebhookSink:
+    """
+    Purpose - Posts notifications as json to a webhook (slack, discord or any endpoint that takes a text field)
+    """
+    name = 'webhook'
+
+    def __init__(self, url:str, field:str='text', timeout:float=10.0, http:urllib3.PoolManager=None) -> None:
+        self.url = url
+        # json field the message goes in ('text' for slack, 'content' for discord)
+        self.field = field
+        self.timeout = timeout
+        self.http = http if http else urllib3.PoolManager(retries=False)
+
+    def send(self, subject:str, body:str) -> None:
+        """
+        Purpose - Posts a notification, raises if the webhook did not accept it
+
+        Param - subject: Subject line
+
+        Param - body: Message text
+        """
+        response = self.http.request('POST', self.url, body=json.dumps({self.field:f'{subject}\n{body}'}).encode(), headers={'Content-Type':'application/json'}, timeout=self.timeout)
+        if response.status >= 400:
+            raise RuntimeError(f'Webhook answered {response.status}')
+
+
+class NotificationManager:
+    """
+    Purpose - Sends notifications from a background worker so the bot never waits on them, with retries, backoff and coalescing of repeated messages
+    """
+    def __init__(self, sinks:list, name:str='Ada Fruit Bot', max_retries:int=3, retry_delay:float=2.0, backoff:float=2.0, coalesce_window:float=300.0) -> None:
+        # where notifications go
+        self.sinks = sinks
+        # subject of every notification
+        self.subject = f'Automated From {name}'
+        # tries per sink and the delay before each retry (delay * backoff ** attempt)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.backoff = backoff
+        # seconds a repeated message is held back and counted instead of sent
+        self.coalesce_window = coalesce_window
+        # message -> [window start, repeats held back]
+        self.coalesced = {}
+        self.lock = threading.Lock()
+        # (subject, body) waiting to be sent
+        self.queue = queue.Queue()
+        # sent and failed counts per sink
+        self.sent = {sink.name:0 for sink in self.sinks}
+        self.failed = {sink.name:0 for sink in self.sinks}
+        # worker
+        self.worker = threading.Thread(target=self.run, name='notifications', daemon=True)
+        self.worker.start()
+        # send what is queued before exit
+        atexit.register(self.flush)
+
+    @classmethod
+    def from_config(cls, notification_config:dict, name:str='Ada Fruit Bot', gmail_manager:object=None) -> 'NotificationManager':
+        """
+        Purpose - Builds a notification manager from the notifications section of the config
+
+        Param - notification_config: The notifications config section
+
+        Param - name: Name of the bot for the subject line
+
+        Param - gmail_manager: Gmail manager used by the gmail sink
+        """
+        sinks = []
+        # no sinks set is gmail (or file without a gmail manager)
+        sink_names = notification_config.get('sinks')
+        for sink_name in sink_names if sink_names is not None else (['gmail'] if gmail_manager else ['file']):
+            if sink_name == 'gmail' and gmail_manager:
+                sinks.append(GmailSink(gmail_manager))
+            elif sink_name == 'smtp':
+                sinks.append(SmtpSink(**(notification_config.get('smtp') or {})))
+            elif sink_name == 'file':
+                sinks.append(FileSink(**(notification_config.get('file') or {})))
+            elif sink_name == 'webhook':
+                sinks.append(WebhookSink(**notification_config['webhook']))
+            else:
+                print(f'Unknown notification sink {sink_name}, skipping it.')
+        return cls(sinks, name, notification_config.get('max_retries', 3), notification_config.get('retry_delay', 2.0), notification_config.get('backoff', 2.0), notification_config.get('coalesce_window', 300.0))
+
+    """ ------------------------------------------ Queue Methods ------------------------------------------------ """
+    def notify(self, message:str, coalesce:bool=False) -> None:
+        """
+        Purpose - Queues a notification and returns right away
+
+        Param - message: Message text
+
+        Param - coalesce: Hold back repeats of the same message inside the coalesce window and send one summary of them
+        """
+        if coalesce:
+            with self.lock:
+                window = self.coalesced.get(message)
+                # repeat inside the window, count it
+                if window and time.monotonic() - window[0] < self.coalesce_window:
+                    window[1] += 1
+                    return
+                self.coalesced[message] = [time.monotonic(), 0]
+        self.queue.put((self.subject, message))
+
+    def release_coalesced(self, force:bool=False) -> None:
+        """
+        Purpose - Queues a summary of every repeated message whose window has closed
+
+        Param - force: Release every window even if it is still open
+        """
+        now = time.monotonic()
+        with self.lock:
+            for message, (start, repeats) in list(self.coalesced.items()):
+                if force or now - start >= self.coalesce_window:
+                    del self.coalesced[message]
+                    if repeats:
+                        self.queue.put((self.subject, f'Repeated {repeats} more times in the last {now - start:.0f}s:\n{message}'))
+
+    def flush(self, timeout:float=30.0) -> bool:
+        """
+        Purpose - Waits until every queued notification has been handled, returns false on timeout
+
+        Param - timeout: Seconds to wait
+        """
+        self.release_coalesced(force=True)
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                print(f'{self.queue.unfinished_tasks} notifications were not sent.')
+                return False
+            time.sleep(.05)
+        return True
+
+    """ ------------------------------------------ Worker Methods ------------------------------------------------ """
+    def run(self) -> None:
+        """
+        Purpose - Sends queued notifications (runs on the worker thread)
+        """
+        while True:
+            try:
+                subject, body = self.queue.get(timeout=1.0)
+            # idle, send summaries of closed coalesce windows
+            except queue.Empty:
+                self.release_coalesced()
+                continue
+            try:
+                [self.deliver(sink, subject, body) for sink in self.sinks]
+            finally:
+                self.queue.task_done()
+
+    def deliver(self, sink:object, subject:str, body:str) -> bool:
+        """
+        Purpose - Sends a notification to one sink with retries and backoff, returns true if it was sent
+
+        Param - sink: The sink
+
+        Param - subject: Subject line
+
+        Param - body: Message text
+        """
+        for attempt in range(self.max_retries):
+            try:
+                sink.send(subject, body)
+                self.sent[sink.name] += 1
+                return True
+            except Exception as e:
+                print(f'Notification through {sink.name} failed ({attempt + 1}/{self.max_retries}): {e}')
+                if attempt + 1 < self.max_retries:
+                    time.sleep(self.retry_delay * self.backoff ** attempt)
+        self.failed[sink.name] += 1
+        return False
@@ -0,0 +1,201 @@
+# local imports
+from lib.bot_funcs.event_log_manager import EVENTS
+from lib.bot_funcs.metrics_manager import METRICS
+# other imports
+from collections import deque
+import datetime, random, time
+
+
+# weekday names in datetime.weekday() order
+WEEKDAYS = ['mon','tue','wed','thu','fri','sat','sun']
+# http statuses that mean the site is throttling
+THROTTLE_STATUSES = [429, 503]
+# page text shown when the site is throttling
+THROTTLE_TEXT = 'Retry later'.lower()
+
+
+def is_throttle_response(status:int, text:str) -> bool:
+    """
+    Purpose - Returns true if a response looks like the site is throttling (throttle status, "Retry later" or a black screen)
+
+    Param - status: The http status (None if unknown)
+
+    Param - text: The body text of the page
+    """
+    if status in THROTTLE_STATUSES:
+        return True
+    text = text.lower().strip()
+    return text == THROTTLE_TEXT or (status is None and not text)
+
+
+class HotWindow:
+    """
+    Purpose - A weekly time window where stock is likely and polling should speed up
+    """
+    def __init__(self, start:str, end:str, days:list=WEEKDAYS) -> None:
+        # days of the week the window applies to
+        self.days = [WEEKDAYS.index(day.lower()[:3]) for day in days]
+        # start and end time of day
+        self.start = datetime.time.fromisoformat(start)
+        self.end = datetime.time.fromisoformat(end)
+
+    def contains(self, now:datetime.datetime) -> bool:
+        """
+        Purpose - Returns true if a time is inside the window
+
+        Param - now: The time to check
+        """
+        return now.weekday() in self.days and self.start <= now.time() < self.end
+
+
+class SchedulerManager:
+    """
+    Purpose - Paces polls with jitter, backs off exponentially while throttled and speeds up in configured or learned hot windows
+    """
+    def __init__(self, interval:float=1.0, min_interval:float=.25, max_interval:float=300.0, jitter:float=.2, backoff:float=2.0, hot_windows:list=None, hot_factor:float=.25, learn_threshold:int=2) -> None:
+        # base seconds between polls
+        self.interval = interval
+        # bounds on the seconds between polls
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        # random +/- fraction applied to every interval
+        self.jitter = jitter
+        # interval multiplier per throttle level
+        self.backoff = backoff
+        # configured hot windows and the interval multiplier inside them
+        self.hot_windows = [HotWindow(**window) for window in hot_windows or []]
+        self.hot_factor = hot_factor
+        # restocks seen per (weekday, hour), an hour becomes hot once it has this many
+        self.restock_slots = {}
+        self.learn_threshold = learn_threshold
+        # current throttle level and polls since the last throttle
+        self.throttle_level = 0
+        self.clean_streak = 0
+        # if the last clean poll found stock (only the transition to in stock counts as a restock)
+        self.last_in_stock = False
+        # poll times of the last minute and totals
+        self.poll_times = deque()
+        self.poll_count = 0
+        self.throttle_count = 0
+        # last time the rate was printed
+        self.last_report = time.monotonic()
+        # exported rate and throttle level
+        self.polls_gauge = METRICS.gauge('adafruit_polls_per_minute', 'Polls in the last minute')
+        self.throttle_gauge = METRICS.gauge('adafruit_throttle_level', 'Current throttle level (the interval is multiplied by backoff per level)')
+
+    @classmethod
+    def from_config(cls, scheduler_config:dict, interval:float=1.0) -> 'SchedulerManager':
+        """
+        Purpose - Builds a scheduler from the scheduler section of the config
+
+        Param - scheduler_config: The scheduler section as validated by parse_config (SchedulerRecord.as_dict(), unknown keys raise TypeError)
+
+        Param - interval: Base interval used if the section does not set one
+        """
+        return cls(**{'interval':interval, **scheduler_config})
+
+    """ ------------------------------------------ Window Methods ------------------------------------------------ """
+    def is_hot(self, now:datetime.datetime=None) -> bool:
+        """
+        Purpose - Returns true if a time is in a configured or learned hot window
+
+        Param - now: The time to check (defaults to now)
+        """
+        now = now if now else datetime.datetime.now()
+        if any(window.contains(now) for window in self.hot_windows):
+            return True
+        return self.restock_slots.get((now.weekday(), now.hour), 0) >= self.learn_threshold
+
+    def record_restock(self, now:datetime.datetime=None) -> None:
+        """
+        Purpose - Learns that stock appeared at a time so the same hour of the week is polled faster
+
+        Param - now: The time stock appeared (defaults to now)
+        """
+        now = now if now else datetime.datetime.now()
+        slot = (now.weekday(), now.hour)
+        self.restock_slots[slot] = self.restock_slots.get(slot, 0) + 1
+
+    """ ------------------------------------------ Poll Methods ------------------------------------------------ """
+    def record_poll(self, throttled:bool=False, in_stock:bool=False) -> None:
+        """
+        Purpose - Records a poll and adjusts the throttle level
+
+        Param - throttled: If the poll was throttled
+
+        Param - in_stock: If the poll found stock
+        """
+        now = time.monotonic()
+        # rate window
+        self.poll_times.append(now)
+        while self.poll_times and now - self.poll_times[0] > 60:
+            self.poll_times.popleft()
+        self.poll_count += 1
+        # back off while throttled
+        if throttled:
+            self.record_throttle()
+        # step back down after a run of clean polls
+        else:
+            self.clean_streak += 1
+            if self.throttle_level and self.clean_streak >= 5:
+                self.throttle_level -= 1
+                self.clean_streak = 0
+            # learn hot windows from out of stock -> in stock transitions (a throttled poll says nothing about stock)
+            if in_stock and not self.last_in_stock:
+                self.record_restock()
+            self.last_in_stock = in_stock
+        # export the rate and the throttle level
+        self.polls_gauge.set(len(self.poll_times))
+        self.throttle_gauge.set(self.throttle_level)
+        # print rate once a minute
+        if now - self.last_report >= 60:
+            self.last_report = now
+            EVENTS.info('poll_rate', '\nPolls per minute: {polls_per_minute} (interval {interval:.2f}s, throttle level {throttle_level})', polls_per_minute=self.polls_per_minute, interval=self.next_interval(jitter=False), throttle_level=self.throttle_level)
+
+    def record_throttle(self) -> None:
+        """
+        Purpose - Records a throttle response (raises the throttle level)
+        """
+        self.throttle_count += 1
+        # stop raising the level once the backed off interval reaches the max interval (it is clamped there anyway and backoff ** level would overflow)
+        if not self.throttle_level or (self.interval > 0 and self.backoff > 1 and self.interval * self.backoff ** self.throttle_level < self.max_interval):
+            self.throttle_level += 1
+        self.clean_streak = 0
+        self.throttle_gauge.set(self.throttle_level)
+        # throttle prompt
+        EVENTS.warning('throttled', '\nThrottled - backing off to {interval:.2f}s between polls', interval=self.next_interval(jitter=False), throttle_level=self.throttle_level)
+
+    def next_interval(self, jitter:bool=True) -> float:
+        """
+        Purpose - Gets the seconds to wait before the next poll
+
+        Param - jitter: If the interval should be jittered
+        """
+        # throttled intervals grow from the base interval
+        if self.throttle_level:
+            interval = self.interval * self.backoff ** self.throttle_level
+        # faster in hot windows
+        elif self.is_hot():
+            interval = self.interval * self.hot_factor
+        else:
+            interval = self.interval
+        # jitter so polls do not land on a fixed beat
+        if jitter and self.jitter:
+            interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def sleep(self, elapsed:float=0.0) -> None:
+        """
+        Purpose - Sleeps until the next poll
+
+        Param - elapsed: Seconds already spent since the last poll started
+        """
+        time.sleep(max(0.0, self.next_interval() - elapsed))
+
+    @property
+    def polls_per_minute(self) -> int:
+        """
+        Purpose - Gets the number of polls in the last minute
+        """
+        now = time.monotonic()
+        return sum(1 for poll_time in self.poll_times if now - poll_time <= 60)
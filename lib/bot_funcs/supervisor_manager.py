@@ -0,0 +1,158 @@
+# local imports
+from lib.funcs import *
+from lib.bot_funcs.metrics_manager import METRICS
+# selenium imports
+from selenium.common.exceptions import WebDriverException, StaleElementReferenceException, ElementNotInteractableException, ElementClickInterceptedException, NoSuchElementException, InvalidElementStateException, MoveTargetOutOfBoundsException, InvalidSessionIdException, NoSuchWindowException, SessionNotCreatedException
+# other imports
+from urllib3.exceptions import HTTPError
+import json, time
+
+
+# bot state that survives a restart
+CHECKPOINT_PATH = convert_path_os('data/checkpoint.json')
+# recovery ladder from cheapest to most expensive
+LEVELS = ['retry', 'refresh', 'soft_reset', 'hard_reset']
+# rung each failure class starts on
+START_LEVEL = {'element':0, 'page':1, 'driver':3}
+# exceptions of a single element (the page is fine, the element moved or is covered)
+ELEMENT_ERRORS = (StaleElementReferenceException, ElementNotInteractableException, ElementClickInterceptedException, NoSuchElementException, InvalidElementStateException, MoveTargetOutOfBoundsException)
+# exceptions of the driver itself (the browser is gone or unreachable)
+DRIVER_ERRORS = (InvalidSessionIdException, NoSuchWindowException, SessionNotCreatedException, HTTPError, ConnectionError)
+# messages of generic webdriver exceptions that mean the browser is gone
+DRIVER_MESSAGES = ('chrome not reachable', 'disconnected', 'session deleted', 'target window already closed', 'tab crashed', 'no such session')
+
+
+def classify(error:Exception) -> str:
+    """
+    Purpose - Classifies a failure as 'element', 'page' or 'driver' level, None if it is not a browser failure and should not be recovered from
+
+    Param - error: The exception
+    """
+    # errors that name their own class (LoginError, CheckoutError and WaitTimeout of a required wait that ran out)
+    if getattr(error, 'failure', None) in START_LEVEL:
+        return error.failure
+    if isinstance(error, ELEMENT_ERRORS):
+        return 'element'
+    if isinstance(error, DRIVER_ERRORS) or (isinstance(error, WebDriverException) and any(message in str(error).lower() for message in DRIVER_MESSAGES)):
+        return 'driver'
+    # timeouts, script errors and other webdriver errors leave the browser usable
+    if isinstance(error, WebDriverException):
+        return 'page'
+    return None
+
+
+def load_checkpoint(path:str=CHECKPOINT_PATH) -> dict:
+    """
+    Purpose - Loads the last checkpoint, empty dict if there is none
+
+    Param - path: Path of the checkpoint file
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class SupervisorManager:
+    """
+    Purpose - Runs purchase attempts, recovers from browser failures at the cheapest level that works and checkpoints the bot state after every attempt
+    """
+    def __init__(self, recover:object, state:object, path:str=CHECKPOINT_PATH) -> None:
+        # callable that takes a level of the ladder and recovers the browser
+        self.recover = recover
+        # callable that returns the bot state to checkpoint
+        self.state = state
+        # checkpoint file and what was last written to it
+        self.path = path
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.checkpointed = None
+        # failure class and time of the first failure of the current incident and the rung reached
+        self.incident = None
+        self.level = 0
+        # failure class -> list of seconds to recover
+        self.recoveries = {}
+
+    def run(self, step:object) -> object:
+        """
+        Purpose - Runs a step and returns what it returns, or False after a recovered failure, raises if the failure can not be recovered from
+
+        Param - step: The step to run (a purchase attempt)
+        """
+        try:
+            result = step()
+        except Exception as e:
+            self.handle(e)
+            return False
+        # recovered
+        if self.incident:
+            self.recovered()
+        self.checkpoint()
+        return result
+
+    def handle(self, error:Exception) -> None:
+        """
+        Purpose - Recovers from a failure, climbing the ladder while the failures keep coming, raises the failure if it can not be recovered from
+
+        Param - error: The exception
+        """
+        failure = classify(error)
+        # not a browser failure
+        if failure is None:
+            raise error
+        METRICS.counter('adafruit_failures_total', 'Failed purchase attempts', failure=failure).inc()
+        # first failure of an incident starts on the rung of its class, a repeat climbs one rung
+        if self.incident is None:
+            self.incident = (failure, time.monotonic())
+            self.level = START_LEVEL[failure]
+        else:
+            self.level = max(self.level + 1, START_LEVEL[failure])
+        while True:
+            # out of rungs
+            if self.level >= len(LEVELS):
+                self.incident, self.level = None, 0
+                raise error
+            level = LEVELS[self.level]
+            # recovery prompt
+            print(f'\n{failure.capitalize()} failure ({type(error).__name__}), recovering with {level.replace("_", " ")}......')
+            try:
+                self.recover(level)
+                return
+            # the recovery itself failed, try the next rung
+            except Exception as recover_error:
+                if classify(recover_error) is None:
+                    raise recover_error
+                self.level += 1
+
+    def recovered(self) -> None:
+        """
+        Purpose - Records how long the incident took to recover from
+        """
+        failure, start = self.incident
+        seconds = time.monotonic() - start
+        self.recoveries.setdefault(failure, []).append(seconds)
+        METRICS.histogram('adafruit_recovery_seconds', 'Time from the first failure to the next successful attempt', failure=failure).observe(seconds)
+        # recovered prompt
+        print(f'\nRecovered from {failure} failure at {LEVELS[self.level].replace("_", " ")} in {seconds:.2f}s (mean {sum(self.recoveries[failure]) / len(self.recoveries[failure]):.2f}s over {len(self.recoveries[failure])}).')
+        self.incident, self.level = None, 0
+
+    def summary(self) -> dict:
+        """
+        Purpose - Gets {failure class: (recoveries, mean seconds to recover)}
+        """
+        return {failure: (len(seconds), sum(seconds) / len(seconds)) for failure, seconds in self.recoveries.items()}
+
+    """ ------------------------------------------ Checkpoint Methods ------------------------------------------------ """
+    def checkpoint(self) -> None:
+        """
+        Purpose - Writes the bot state if it changed (written to a temporary file and moved so a crash never leaves half a file)
+        """
+        state = self.state()
+        if state == self.checkpointed:
+            return
+        temporary_path = f'{self.path}.tmp'
+        with open(temporary_path, 'w') as f:
+            json.dump({**state, 'saved':time.time()}, f)
+        os.replace(temporary_path, self.path)
+        self.checkpointed = state
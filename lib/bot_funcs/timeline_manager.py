@@ -0,0 +1,65 @@
+# local imports
+from lib.funcs import *
+from lib.bot_funcs.metrics_manager import METRICS
+# other imports
+import threading, time
+
+
+class TimelineManager:
+    """
+    Purpose - Records when each startup step began and ended (steps may overlap on different threads) and prints them as a timeline
+    """
+    def __init__(self, start:float=None) -> None:
+        # timeline origin as unix time (defaults to when the script started)
+        self.start = start if start is not None else SCRIPT_START.timestamp()
+        # (name, thread name, start offset, end offset)
+        self.steps = []
+        self.lock = threading.Lock()
+
+    def mark(self, name:str, began:float, ended:float=None) -> None:
+        """
+        Purpose - Records a step
+
+        Param - name: Name of the step
+
+        Param - began: Unix time the step began
+
+        Param - ended: Unix time the step ended (now if None)
+        """
+        ended = time.time() if ended is None else ended
+        with self.lock:
+            self.steps.append((name, threading.current_thread().name, began - self.start, ended - self.start))
+        METRICS.gauge('adafruit_startup_seconds', 'Seconds from script start to the end of each startup step', step=name).set(ended - self.start)
+
+    def timed(self, name:str, function:object, *args, **kwargs) -> object:
+        """
+        Purpose - Runs a function as a step and returns what it returns
+
+        Param - name: Name of the step
+
+        Param - function: The function to run
+
+        Param - args: Positional arguments of the function
+
+        Param - kwargs: Keyword arguments of the function
+        """
+        began = time.time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.mark(name, began)
+
+    def report(self) -> str:
+        """
+        Purpose - Formats the steps in start order with a bar of when each one ran
+        """
+        with self.lock:
+            steps = sorted(self.steps, key=lambda step: step[2])
+        total = max([step[3] for step in steps] + [0.0])
+        lines = [f'Startup timeline ({total:.2f}s):']
+        for name, thread_name, began, ended in steps:
+            # 40 column bar scaled to the whole startup
+            bar_start = int(began / total * 40) if total else 0
+            bar_end = max(bar_start + 1, int(ended / total * 40)) if total else 1
+            lines.append(f'  {name:<16} {began:>6.2f}s -> {ended:>6.2f}s  {ended - began:>6.2f}s  |{" " * bar_start}{"#" * (bar_end - bar_start)}{" " * (40 - bar_end)}|  {thread_name}')
+        return '\n'.join(lines)
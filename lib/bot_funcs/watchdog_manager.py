@@ -0,0 +1,109 @@
+# local imports
+from lib.funcs import *
+from lib.bot_funcs.metrics_manager import METRICS
+# other imports
+import time
+
+
+class WatchdogManager:
+    """
+    Purpose - Tracks memory and cpu of the browser process tree (chromedriver and every chrome process) and says when the driver should be recycled
+    """
+    def __init__(self, max_rss_mb:int=None, min_available_mb:int=None, max_cpu_percent:float=None, cpu_samples:int=3, max_age_hours:float=None, interval:float=30.0) -> None:
+        # memory of the browser tree that triggers a recycle
+        self.max_rss = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+        # system memory left before swapping that triggers a recycle
+        self.min_available = min_available_mb * 1024 * 1024 if min_available_mb else None
+        # cpu use of the browser tree (100 is one core) that triggers a recycle once it is seen this many samples in a row
+        self.max_cpu_percent = max_cpu_percent
+        self.cpu_samples = cpu_samples
+        # driver age that triggers a recycle
+        self.max_age = max_age_hours * 3600 if max_age_hours else None
+        # seconds between samples (walking /proc is not free on a pi)
+        self.interval = interval
+        # when the driver started, the last sample and the cpu baseline
+        self.started = time.monotonic()
+        self.last_sample = None
+        self.cpu_baseline = None
+        # samples in a row over the cpu threshold
+        self.high_cpu = 0
+        # last sample as {rss, cpu_percent, processes, available}
+        self.stats = {}
+        # metrics kept here so the hot loop skips the registry
+        self.rss_gauge = METRICS.gauge('adafruit_browser_rss_bytes', 'Resident memory of chromedriver and its chrome processes')
+        self.cpu_gauge = METRICS.gauge('adafruit_browser_cpu_percent', 'Cpu use of chromedriver and its chrome processes since the last sample (100 is one core)')
+        self.process_gauge = METRICS.gauge('adafruit_browser_processes', 'Number of chromedriver and chrome processes')
+        self.age_gauge = METRICS.gauge('adafruit_browser_age_seconds', 'Seconds since the driver was launched or recycled')
+        self.available_gauge = METRICS.gauge('adafruit_available_memory_bytes', 'Memory the system can hand out without swapping')
+
+    @classmethod
+    def from_config(cls, watchdog_config:dict) -> 'WatchdogManager':
+        """
+        Purpose - Builds a watchdog from the watchdog section of the config
+
+        Param - watchdog_config: The watchdog config section
+        """
+        return cls(watchdog_config.get('max_rss_mb'), watchdog_config.get('min_available_mb'), watchdog_config.get('max_cpu_percent'), watchdog_config.get('cpu_samples', 3), watchdog_config.get('max_age_hours'), watchdog_config.get('interval', 30.0))
+
+    def sample(self, pid:int) -> dict:
+        """
+        Purpose - Reads memory and cpu of a process tree and exports them, returns {rss, cpu_percent, processes, available}
+
+        Param - pid: Process id of chromedriver
+        """
+        now = time.monotonic()
+        pids = [pid] + get_child_pids(pid)
+        rss = sum(get_process_rss(child) for child in pids)
+        cpu_seconds = sum(get_process_cpu_seconds(child) for child in pids)
+        # cpu percent since the last sample (processes that exited take their cpu time with them so it is clamped)
+        cpu_percent = None
+        if self.cpu_baseline:
+            cpu_percent = max(0.0, (cpu_seconds - self.cpu_baseline[1]) / max(now - self.cpu_baseline[0], 1e-6) * 100)
+            self.cpu_gauge.set(cpu_percent)
+        self.cpu_baseline = (now, cpu_seconds)
+        available = get_available_memory()
+        self.stats = {'rss':rss, 'cpu_percent':cpu_percent, 'processes':len(pids), 'available':available}
+        # export
+        self.rss_gauge.set(rss)
+        self.process_gauge.set(len(pids))
+        self.age_gauge.set(now - self.started)
+        if available is not None:
+            self.available_gauge.set(available)
+        self.last_sample = now
+        return self.stats
+
+    def check(self, pid:int) -> str:
+        """
+        Purpose - Samples the browser if the interval has passed, returns why it should be recycled (e.g. 'rss 950 MB') or None
+
+        Param - pid: Process id of chromedriver (None if unknown)
+        """
+        if pid is None or (self.last_sample is not None and time.monotonic() - self.last_sample < self.interval):
+            return None
+        stats = self.sample(pid)
+        # cpu has to stay high for several samples since page loads spike it
+        self.high_cpu = self.high_cpu + 1 if self.max_cpu_percent and stats['cpu_percent'] is not None and stats['cpu_percent'] > self.max_cpu_percent else 0
+        if self.max_rss and stats['rss'] > self.max_rss:
+            return f"rss {stats['rss'] // (1024 * 1024)} MB"
+        if self.min_available and stats['available'] is not None and stats['available'] < self.min_available:
+            return f"available {stats['available'] // (1024 * 1024)} MB"
+        if self.cpu_samples and self.high_cpu >= self.cpu_samples:
+            return f"cpu {stats['cpu_percent']:.0f}%"
+        if self.max_age and time.monotonic() - self.started > self.max_age:
+            return f'age {(time.monotonic() - self.started) / 3600:.1f}h'
+        return None
+
+    def recycled(self, reason:str, seconds:float) -> None:
+        """
+        Purpose - Records a recycle and starts watching the new driver
+
+        Param - reason: Why the driver was recycled (as returned by check)
+
+        Param - seconds: How long the recycle took
+        """
+        METRICS.counter('adafruit_browser_recycles_total', 'Proactive driver recycles', reason=reason.split(' ')[0]).inc()
+        METRICS.histogram('adafruit_browser_recycle_seconds', 'Time to recycle the driver and carry the session over').observe(seconds)
+        self.started = time.monotonic()
+        self.last_sample = None
+        self.cpu_baseline = None
+        self.high_cpu = 0
@@ -1,14 +1,120 @@
-creds = {
+config = {
 		'selenium' : 
 		{
 			"driver_path" : "<Chrome Driver Path>",
-			"url" : "<Product URL>"
+			"url" : "<Product URL>",
+			"poll_interval" : 1.0,
+			"watch_mode" : False,
+			"race_mode" : False,
+			"pool_size" : 0,
+			"pool_memory_mb" : 1024,
+			"lean_profile" : False,
+			"blocked_urls" : ["*.png", "*.jpg", "*.gif", "*.woff2", "*google-analytics.com*", "*googletagmanager.com*"],
+			"keystroke_fields" : [],
+			"wait_poll" : 0.05,
+			"change_detection" : True,
+			"wait_budgets" : 
+			{
+				"element" : 7.0,
+				"navigation" : 5.0,
+				"probe" : 1.0
+			}
+		},
+		'watch_list' : 
+		[
+			{
+				"url" : "<Product URL>",
+				"variants" : ["2GB", "4GB", "8GB"],
+				"purchase_limit" : 1
+			},
+		],
+		'scheduler' : 
+		{
+			"min_interval" : 0.25,
+			"max_interval" : 300,
+			"jitter" : 0.2,
+			"backoff" : 2.0,
+			"hot_factor" : 0.25,
+			"hot_windows" : 
+			[
+				{"days" : ["mon", "tue", "wed", "thu", "fri"], "start" : "11:00", "end" : "12:30"},
+			]
+		},
+		'race' : 
+		{
+			"account_limit" : 1,
+			"global_limit" : 1,
+			"round_timeout" : 120
+		},
+		'coordination' : 
+		{
+			"path" : "/mnt/shared/adafruit/coordination.db",
+			"node" : "pi-1",
+			"lease_seconds" : 60,
+			"account_limit" : 1,
+			"global_limit" : 1,
+			"reserve_timeout" : 300,
+			"signal" : {"port" : 47100, "peers" : ["192.168.1.12:47100", "192.168.1.13:47100"], "socket_dir" : "/tmp/adafruit_signal"}
+		},
+		'login' : 
+		{
+			"max_attempts" : 3,
+			"backoff" : 2.0,
+			"backoff_factor" : 2.0,
+			"max_backoff" : 30.0,
+			"otp_margin" : 3.0
+		},
+		'checkout' : 
+		{
+			"prestage" : False,
+			"url" : "https://www.adafruit.com/checkout",
+			"shipping_type" : "cheapest"
+		},
+		'hot_reload' : 
+		{
+			"interval" : 2.0
+		},
+		'watchdog' : 
+		{
+			"max_rss_mb" : 700,
+			"min_available_mb" : 100,
+			"max_cpu_percent" : 90,
+			"cpu_samples" : 3,
+			"max_age_hours" : 12,
+			"interval" : 30
+		},
+		'event_log' : 
+		{
+			"path" : "data/logs/events.jsonl",
+			"file_level" : "info",
+			"console_level" : "info",
+			"ring_size" : 500,
+			"max_bytes" : 10485760
+		},
+		'recording' : 
+		{
+			"path" : "data/recordings/"
+		},
+		'metrics' : 
+		{
+			"port" : 9108
+		},
+		'notifications' : 
+		{
+			"sinks" : ["gmail"],
+			"max_retries" : 3,
+			"retry_delay" : 2.0,
+			"backoff" : 2.0,
+			"coalesce_window" : 300,
+			"smtp" : {"host" : "<SMTP Host>", "port" : 587, "sender" : "<From Address>", "to" : "<To Address>", "username" : "<SMTP Username>", "password" : "<SMTP Password>", "starttls" : True},
+			"file" : {"path" : "data/notifications.log"},
+			"webhook" : {"url" : "<Webhook URL>", "field" : "text"}
 		},
 		'gmail' : 
 		{
 			"gmail_address" : "<Gmail Address>"
 		},
-		'accounts' : 
+		'ada_fruit_accounts' : 
 		{ 
 			'<Ada Fruit Account One Name>' : 
 			{
@@ -22,6 +128,7 @@ creds = {
 				{
 					"name" : "<Name>",
 					"address" : "<Address>",
+					"additional_address" : "",
 					"city" : "<City>",
 					"postal_code" : "<Postal Code>",
 					"state" : "<State>",
@@ -40,6 +147,7 @@ creds = {
 				{
 					"name" : "<Name>",
 					"address" : "<Address>",
+					"additional_address" : "",
 					"city" : "<City>",
 					"postal_code" : "<Postal Code>",
 					"state" : "<State>",
@@ -23,3 +23,78 @@ def convert_path_os(path: str) -> str:
 
 
 
+""" ------------------------------------------ Process Funcs ------------------------------------------------ """
+def get_child_pids(pid: int) -> list:
+	"""
+	Purpose - Get a list of every descendant process id of a process (linux only, empty list elsewhere)
+
+	Param - pid: Process id of the root process
+	"""
+	# map parent pid to child pids from /proc
+	children = {}
+	try:
+		for name in os.listdir('/proc'):
+			if name.isdigit():
+				try:
+					with open(f'/proc/{name}/stat') as f:
+						# parent pid is the second field after the process name
+						ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+					children.setdefault(ppid, []).append(int(name))
+				except (OSError, IndexError, ValueError):
+					pass
+	except OSError:
+		return []
+	# walk process tree
+	pids, stack = [], list(children.get(pid, []))
+	while stack:
+		child = stack.pop()
+		pids.append(child)
+		stack.extend(children.get(child, []))
+	return pids
+
+def get_process_rss(pid: int) -> int:
+	"""
+	Purpose - Get the resident memory of a process in bytes (linux only, 0 elsewhere)
+
+	Param - pid: Process id
+	"""
+	try:
+		with open(f'/proc/{pid}/statm') as f:
+			return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+	except (OSError, IndexError, ValueError, AttributeError):
+		return 0
+
+def get_process_tree_rss(pid: int) -> int:
+	"""
+	Purpose - Get the resident memory of a process and all of its descendants in bytes (linux only, 0 elsewhere)
+
+	Param - pid: Process id of the root process
+	"""
+	return sum(get_process_rss(child) for child in [pid] + get_child_pids(pid))
+
+def get_process_cpu_seconds(pid: int) -> float:
+	"""
+	Purpose - Get the cpu time (user and system) a process has used in seconds (linux only, 0 elsewhere)
+
+	Param - pid: Process id
+	"""
+	try:
+		with open(f'/proc/{pid}/stat') as f:
+			# utime and stime are the 12th and 13th fields after the process name
+			fields = f.read().rsplit(')', 1)[1].split()
+		return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+	except (OSError, IndexError, ValueError, AttributeError):
+		return 0.0
+
+def get_available_memory() -> int:
+	"""
+	Purpose - Get the memory the system can still hand out without swapping in bytes (linux only, None elsewhere)
+	"""
+	try:
+		with open('/proc/meminfo') as f:
+			for line in f:
+				if line.startswith('MemAvailable:'):
+					return int(line.split()[1]) * 1024
+	except (OSError, IndexError, ValueError):
+		pass
+	return None
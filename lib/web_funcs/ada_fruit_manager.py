@@ -1,43 +1,155 @@
 # local imports
 from lib.funcs import *
 from lib.config import config
-from lib.web_funcs.parser_manager import ParserManager
+from lib.web_funcs.parser_manager import ParserManager, ChangeDetector
+from lib.web_funcs.stock_manager import OTS_STRING
+from lib.web_funcs.watch_manager import WatchManager
+from lib.web_funcs.session_manager import SessionManager
+from lib.web_funcs.login_manager import LoginManager
+from lib.web_funcs.shipping_manager import ShippingManager
+from lib.bot_funcs.scheduler_manager import SchedulerManager, is_throttle_response
+from lib.bot_funcs.coordination_manager import CoordinationManager
+from lib.bot_funcs.watchdog_manager import WatchdogManager
+from lib.bot_funcs.config_manager import ConfigManager
+from lib.bot_funcs.history_manager import HistoryManager
+from lib.bot_funcs.metrics_manager import METRICS
+from lib.bot_funcs.event_log_manager import EVENTS
 # selenium imports
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote import webelement
 # other imports
-import time, pyotp
+from urllib.parse import urljoin
+import time
 
 
+# product types that are valid and need to filter
+VALID_PRODUCT_TYPES = ['2gb','4gb','8gb']
+# product types used in testing state
+TESTING_PRODUCT_TYPES = ['PCB Antenna - Stacking Headers'.lower()]
+# xpaths for shipping info
+DELIVERY_XPATHS = {
+'name':'//*[@id="delivery_name"]',
+'address':'//*[@id="delivery_address1"]',
+'additional_address':'//*[@id="delivery_address2"]',
+'city':'//*[@id="delivery_city"]', 
+'state':'//*[@id="delivery_state_dropdown"]',
+'postal_code':'//*[@id="delivery_postcode"]',
+'phone_number':'//*[@id="delivery_phone"]'}
+# class of the shipping option labels
+SHIPPING_LABEL_CLASS = 'checkboxLabel.sg-label.checkout-shipping-method-label'
+
+
+class CheckoutError(Exception):
+    """
+    Purpose - Raised when a checkout step could not be completed (the order must not go on to the next step)
+    """
+    # the supervisor recovers from it like a page failure
+    failure = 'page'
+
+
+def get_watch_list(testing_state:bool, config_manager:ConfigManager=None) -> list:
+    """
+    Purpose - Gets the product pages to watch from the config, defaults to the selenium url with the valid product types
+
+    Param - testing_state: If the program is in testing state
+
+    Param - config_manager (Optional): Validated config to read instead of the raw config
+    """
+    if config_manager:
+        return [record.as_dict() for record in config_manager.watch_list] or [{'url':config_manager.product_url, 'variants':TESTING_PRODUCT_TYPES if testing_state else VALID_PRODUCT_TYPES}]
+    return config.get('watch_list') or [{'url':config['selenium']['url'], 'variants':TESTING_PRODUCT_TYPES if testing_state else VALID_PRODUCT_TYPES}]
+
 
 class AdaFruitManager:
     """
     Purpose - Manages web element interactions on Ada Fruit site
     """
-    def __init__(self, os_type:str, testing_state:bool) -> None:
+    def __init__(self, os_type:str, testing_state:bool, watch_mode:bool=False, account_name:str=None, config_manager:ConfigManager=None) -> None:
+        # validated accounts, product urls and checkout preferences (an invalid config raises before the browser launches)
+        self.config_manager = config_manager or ConfigManager(config)
         # os type windows linux etc
         self.os_type = os_type
         # determines if program is in testing state
         self.testing_state = testing_state
+        # determines if stock is polled over http before waking the browser
+        self.watch_mode = watch_mode
+        # product type that is valid and needs to filter
+        self.valid_product_types = TESTING_PRODUCT_TYPES if self.testing_state else VALID_PRODUCT_TYPES
         # option list
         self.parser_options = ['--start-maximized','--window-size=1920,1080','--headless']
         # if windows is os type
         if self.os_type == 'windows':
             self.parser_options = ['--start-maximized']
         # web parser object
-        self.parser = ParserManager(self.os_type, config['selenium']['driver_path'],config['selenium']['url'], self.parser_options)
+        self.parser = ParserManager(self.os_type, config['selenium']['driver_path'],self.config_manager.product_url, self.parser_options, config['selenium'].get('pool_size', 0), config['selenium'].get('pool_memory_mb', 1024), config['selenium'].get('wait_budgets'), config['selenium'].get('wait_poll', .05), config['selenium'].get('lean_profile', False), config['selenium'].get('blocked_urls'))
+        # record the commands and pages of this session for offline replay
+        if config.get('recording', {}).get('path'):
+            self.parser.start_recording(os.path.join(config['recording']['path'], f"{time.strftime('%Y%m%d_%H%M%S')}_{account_name or 'bot'}_{os.getpid()}"))
+        # product pages to watch each with its own variant filters and purchase limit (defaults to the selenium url)
+        self.watch_list = get_watch_list(self.testing_state, self.config_manager)
+        # stock observation store
+        self.history = HistoryManager()
+        # http stock poller for every watched product
+        self.watch_manager = WatchManager(self.watch_list, history=self.history)
+        # watch entry that is being purchased
+        self.watch_entry = None
+        # paces polls and backs off while throttled
+        self.scheduler = SchedulerManager.from_config(self.config_manager.scheduler.as_dict())
+        # if the last browser poll was throttled
+        self.throttled = False
+        # if an account is given the bot stays on it instead of switching after a purchase
+        self.pinned_account = account_name is not None
         # current account
-        self.account_name = list(config['ada_fruit_accounts'].keys())[0]
-        self.account_info = config['ada_fruit_accounts'][self.account_name]
+        self.account_name = account_name if self.pinned_account else next(iter(self.config_manager.accounts))
+        self.account = self.config_manager.accounts[self.account_name]
+        # shared purchase coordinator (set when racing several accounts)
+        self.coordinator = None
+        # account leases, purchase ledger and stock signal shared with other bot nodes (race workers use the race coordinator instead)
+        self.coordination = CoordinationManager.from_config(self.config_manager.coordination.as_dict()) if self.config_manager.coordination and not self.pinned_account else None
+        # form fields that always get real keystrokes instead of being filled by script
+        self.keystroke_fields = config['selenium'].get('keystroke_fields', [])
         # type of shipping
-        self.shipping_type = 'cheapest'
+        self.shipping_type = self.config_manager.checkout.shipping_type
+        # picks shipping options, remembered per account and cart
+        self.shipping_manager = ShippingManager()
+        # in stock product types of the last poll (same order as the elements returned) and what was carted
+        self.in_stock_types = []
+        self.cart_contents = ()
+        # enter the address in a checkout tab while waiting so only the cart add, shipping and submit are left when stock appears
+        self.prestage = self.config_manager.checkout.prestage
+        # checkout page (defaults to /checkout on the product site)
+        self.checkout_url = self.config_manager.checkout.url or urljoin(self.config_manager.product_url, '/checkout')
+        # account name -> staged checkout info (checkout info that was entered and if the address was validated)
+        self.staged = {}
+        # when stock was last detected and how long it took from there to the submit click
+        self.detected_at = None
+        self.last_detection_to_submit = None
         # set if the bot is logged in to ada fruit
         self.logged_in = False
+        # saved browser sessions per account
+        self.session_manager = SessionManager()
+        # signs in with bounded retries and backoff
+        self.login_manager = LoginManager.from_config(self.config_manager.login.as_dict(), self.parser, self.session_manager, self.scheduler, self.keystroke_fields)
         # if cart is cleared
         self.cart_cleared = False
-        # switch account
-        self.switch_account('arwelsh')
-        print(self.account_info)
+        # webdriver commands used by the last product poll
+        self.poll_command_count = 0
+        # skips parsing polls whose product block has not changed
+        self.change_detector = ChangeDetector() if config['selenium'].get('change_detection', True) else None
+        # watches browser memory and cpu and says when to recycle the driver
+        self.watchdog = WatchdogManager.from_config(self.config_manager.watchdog.as_dict())
+        # purchases made since the first start (carried over restarts by the checkpoint)
+        self.purchases = 0
+        # supervisor that checkpoints the bot state (set by the bot)
+        self.supervisor = None
+        # reloaded config sections waiting for the next purchase attempt
+        self.pending_config = set()
+        # metrics kept here so the hot loop skips the registry
+        self.poll_counter = METRICS.counter('adafruit_polls_total', 'Product polls', source='browser')
+        self.purchase_counter = METRICS.counter('adafruit_purchases_total', 'Completed purchases')
+        # lease an account no other node is using
+        if self.coordination:
+            self.claim_account()
 
 
     """ ------------------------------------------ Account Methods ------------------------------------------------ """
@@ -51,146 +163,313 @@ class AdaFruitManager:
         if name_of_account:
             # new account name
             self.account_name = name_of_account
+            # warn if another node owns it
+            if self.coordination and not self.coordination.acquire(self.account_name):
+                print(f'\n{self.account_name} is leased by another node.')
+        # if other nodes share the accounts
+        elif self.coordination:
+            # lease the next account no other node is using
+            account_name = self.coordination.next_account(list(self.config_manager.accounts), self.account_name)
+            # if every account is taken
+            if account_name is None:
+                print('\nEvery account is leased by another node or has reached its purchase limit.')
+            # give up the old account
+            elif account_name != self.account_name:
+                self.coordination.release(self.account_name)
+                self.account_name = account_name
         # if a name of an account is not given
         else:
             # pick the next account in the dict
             try:
-                self.account_name = list(config['ada_fruit_accounts'].keys())[list(config['ada_fruit_accounts'].keys()).index(self.account_name)+1]
+                self.account_name = list(self.config_manager.accounts)[list(self.config_manager.accounts).index(self.account_name)+1]
             # if bot is using the last account
             except IndexError:
                 print("The bot is using {self.account_name} which is the last account in the dict!!!\nPlease choose a different account.\n")
         # set account info
-        self.account_info = config['ada_fruit_accounts'][self.account_name]
+        self.account = self.config_manager.accounts[self.account_name]
         # set cart cleared to false
         self.cart_cleared = False
 
+    def claim_account(self) -> bool:
+        """
+        Purpose - Makes sure this node holds the lease on the current account, moving to a free account if another node holds it, returns false if none is free
+        """
+        # if the current account is free
+        if self.coordination.can_purchase(self.account_name) and self.coordination.acquire(self.account_name):
+            return True
+        # sign out of the account another node owns
+        if self.logged_in:
+            self.sign_out()
+        # move to a free account
+        self.switch_account()
+        return self.coordination.holds(self.account_name) and self.coordination.can_purchase(self.account_name)
+
+
+    """ ------------------------------------------ Config Methods ------------------------------------------------ """
+    def reload_config(self, changes:set) -> None:
+        """
+        Purpose - Takes a reloaded config (runs on the config watcher thread), the watch list is swapped right away and the rest waits for the next purchase attempt
+
+        Param - changes: Names of the config sections that changed
+        """
+        # poll rounds read the entries once per round so they can be swapped from here
+        if 'watch_list' in changes or 'product_url' in changes:
+            self.watch_list = get_watch_list(self.testing_state, self.config_manager)
+            self.watch_manager.update(self.watch_list)
+        self.pending_config |= changes
+        # stop waiting for stock so accounts and checkout preferences apply before the next checkout
+        if self.pending_config - {'watch_list'}:
+            self.watch_manager.interrupt()
+
+    def apply_config(self) -> None:
+        """
+        Purpose - Applies reloaded accounts, product url and checkout preferences without dropping the driver (only call between purchase attempts)
+        """
+        changes, self.pending_config = self.pending_config, set()
+        # checkout and shipping preferences (a changed address is staged again since it no longer matches the staged one)
+        if 'checkout' in changes or 'product_url' in changes:
+            self.prestage = self.config_manager.checkout.prestage
+            self.checkout_url = self.config_manager.checkout.url or urljoin(self.config_manager.product_url, '/checkout')
+            self.shipping_type = self.config_manager.checkout.shipping_type
+        # product page the browser polls
+        if 'product_url' in changes and self.config_manager.product_url != self.parser.product_url:
+            self.parser.product_url = self.config_manager.product_url
+            self.parser.set_page(self.parser.product_url)
+        if 'accounts' not in changes:
+            return
+        account = self.config_manager.accounts.get(self.account_name)
+        # current account was removed, move to the first account
+        if account is None and not self.pinned_account:
+            # account prompt
+            print(f'\n{self.account_name} was removed from the config, switching accounts......')
+            if self.logged_in:
+                self.sign_out()
+            if self.coordination:
+                self.coordination.release(self.account_name)
+            self.switch_account(next(iter(self.config_manager.accounts)))
+        elif account is not None:
+            # a different user has to sign in again (a new password or otp secret keeps the session)
+            if account.login.username != self.account.login.username and self.logged_in:
+                self.sign_out()
+            self.account = account
+
 
     """ ------------------------------------------ Purchase Methods ------------------------------------------------ """
     def ada_fruit_purchase(self) -> bool:
         """
         Purpose - Attempts to complete a successful transaction returns true if transaction was successful
         """
+        # poll start time
+        start = time.perf_counter()
+        # reloaded config
+        if self.pending_config:
+            self.apply_config()
+        # if another node owns the account and no other account is free
+        if self.coordination and not self.claim_account():
+            self.scheduler.sleep()
+            return False
         # attempt to sign in
-        self.sign_in()
+        with METRICS.phase('sign_in'):
+            self.sign_in()
         # clear cart of any items
-        self.clear_cart()
+        with METRICS.phase('clear_cart'):
+            self.clear_cart()
+        # enter the address ahead of time
+        if self.prestage:
+            with METRICS.phase('prestage_checkout'):
+                self.prestage_checkout()
         # cart prompt 
-        print('\nWaiting for Item......\n')
+        EVENTS.info('waiting', '\nWaiting for Item......\n')
+        # if watch mode poll over http and only load the page in the browser once a variant is in stock
+        if self.watch_mode:
+            with METRICS.phase('wait_for_stock'):
+                self.watch_entry, in_stock = self.watch_manager.wait_for_stock(self.scheduler, self.coordination.signal if self.coordination else None)
+            # if every watched product reached its purchase limit
+            if not self.watch_entry:
+                return False
+            # filter on the variants of the product with stock and load its page
+            self.valid_product_types = self.watch_entry.variants
+            self.parser.set_page(self.watch_entry.url)
         # iterate through product variants and waits for add to cart element
-        if self.check_for_product_variants():
+        with METRICS.phase('check_for_product_variants'):
+            in_stock = self.check_for_product_variants()
+        # record every browser poll so throttling backs off and restocks teach the hot windows (the http poller records its own)
+        if not self.watch_mode:
+            self.scheduler.record_poll(self.throttled, bool(in_stock))
+        # alert the other nodes when the browser saw the stock first
+        if in_stock and not self.watch_mode and self.coordination and self.coordination.signal:
+            self.coordination.signal.send(self.parser.link, self.in_stock_types)
+        if in_stock:
             # checkout prompt 
-            print('\nChecking Out......')
+            EVENTS.info('checkout', '\nChecking Out......', variants=self.in_stock_types)
             # start checkout process
-            self.checkout()
+            with METRICS.phase('checkout'):
+                purchased = self.checkout()
             # refresh default page
-            print('\nRefreshing Page...')
-            self.parser.refresh_page()
+            EVENTS.debug('refresh', '\nRefreshing Page...')
+            with METRICS.phase('refresh_page'):
+                self.parser.refresh_page()
+            # if the coordinator did not allow the purchase
+            if not purchased:
+                self.cart_cleared = False
+                return False
             # purchase prompt 
-            print('\nPurchased Item!')
-            # sign out
-            self.sign_out()
-            # switch account 
-            self.switch_account('artic')
+            EVENTS.info('purchased', '\nPurchased Item!', account=self.account_name, url=self.parser.link)
+            self.purchase_counter.inc()
+            self.purchases += 1
+            # count purchase against the watched product
+            if self.watch_entry:
+                self.watch_manager.record_purchase(self.watch_entry)
+            # if the bot is not pinned to one account
+            if not self.pinned_account:
+                # sign out
+                self.sign_out()
+                # switch to the next account
+                self.switch_account()
             return True
         # if not product has stock
         else:
-            # refresh default page
-            print('\nRefreshing Page...')
-            self.parser.refresh_page()
+            # wait for the next poll unless the http poller already paced it
+            if not self.watch_mode:
+                # another node seeing stock ends the wait early
+                if self.coordination and self.coordination.signal:
+                    self.coordination.signal.wait(self.scheduler.next_interval() - (time.perf_counter() - start))
+                else:
+                    self.scheduler.sleep(time.perf_counter() - start)
+            # recycle the browser if it grew too big (it loads the page fresh) or refresh default page
+            if not self.recycle_if_due():
+                EVENTS.debug('refresh', '\nRefreshing Page...')
+                with METRICS.phase('refresh_page'):
+                    self.parser.refresh_page()
             return False
 
 
-    """ ------------------------------------------ Sign In Methods ------------------------------------------------ """
-    def otp_auth(self) -> None:
+    def race_purchase(self, product_url:str, variants:list) -> bool:
         """
-        Purpose - Authenticates through two factor
+        Purpose - Loads a product page that was seen in stock and races to checkout, returns true if the purchase went through
+
+        Param - product_url: The product page with stock
+
+        Param - variants: The valid variant names for the product
         """
-        try:
-            # 2fa prompt 
-            print('\nGet 2FA Token......')
-            # get the token from authenticator and change otp to current 2fa
-            totp = pyotp.TOTP(self.account_info['login_info']['otp'])
-            token = totp.now()
-            # get otp element
-            opt_field = self.parser.wait_for_element(By.XPATH,'//*[@id="user_otp_attempt"]')
-            # make sure element is clear of text before inputing
-            opt_field.clear()
-            # send info
-            opt_field.send_keys(token)
-            # get and click verify button element
-            self.parser.click_element(self.parser.wait_for_element(By.XPATH,'//*[@id="edit_user"]/p[2]/input'))
-            # check if verfication button press worked
-            if self.parser.wait_for_element(By.CLASS_NAME,'alert.alert-danger.alert-dismissable',timer=1):
-                # OTP prompt
-                print('\nOTP Error - Retrying......')
-                # hard reset page
-                self.parser.hard_reset()
-                # attempt to try again
-                self.sign_in()
-            # if black screen
-            elif self.parser.wait_for_element(By.XPATH,'/html/body',timer=1).text.lower().strip() == 'Retry later'.lower():
-                # OTP prompt
-                print('\nBlack Screen Error - Retrying......')
-                # hard reset page
-                self.parser.hard_reset()
-                # attempt to try again
-                self.sign_in()
-
-        # if black screen before OPT
-        except Exception as e:
-            # if black screen
-            if self.parser.wait_for_element(By.XPATH,'/html/body',timer=1).text.lower().strip() == 'Retry later'.lower():
-                # OTP prompt
-                print('\nBlack Screen Error - Retrying......')
-                # hard reset page
-                self.parser.hard_reset()
-                # attempt to try again
-                self.sign_in()
-            else:
-                raise(e)
+        # filter on the variants of the product with stock and load its page
+        self.valid_product_types = variants
+        self.parser.set_page(product_url)
+        # iterate through product variants and cart the first one in stock
+        if not self.check_for_product_variants():
+            return False
+        # checkout prompt
+        print(f'\nChecking Out on {self.account_name}......')
+        # start checkout process (the coordinator decides if it may submit)
+        purchased = self.checkout()
+        # back to the product page, the cart has to be cleared if the purchase did not go through
+        self.parser.set_page(self.parser.product_url)
+        self.cart_cleared = purchased
+        return purchased
+
 
+    def recycle_if_due(self) -> bool:
+        """
+        Purpose - Recycles the driver if the watchdog says the browser uses too much memory or cpu, returns true if it was recycled (only call between polls, never during checkout)
+        """
+        reason = self.watchdog.check(self.parser.get_driver_pid())
+        if not reason:
+            return False
+        # recycle prompt
+        print(f'\nRecycling Browser ({reason})......')
+        start = time.perf_counter()
+        with METRICS.phase('recycle'):
+            carried = self.parser.recycle()
+            # sign in again unless the session came along
+            if self.logged_in and not (carried and self.parser.wait_for_element(By.CLASS_NAME,'account-dropdown.dropdown',step='session')):
+                self.logged_in = False
+        self.watchdog.recycled(reason, time.perf_counter() - start)
+        return True
+
+
+    """ ------------------------------------------ Recovery Methods ------------------------------------------------ """
+    def recover(self, level:str) -> None:
+        """
+        Purpose - Recovers the browser after a failed purchase attempt
+
+        Param - level: Rung of the recovery ladder (retry, refresh, soft_reset or hard_reset)
+        """
+        # a failed attempt may have left an item in the cart
+        self.cart_cleared = False
+        # the next attempt runs the step again
+        if level == 'retry':
+            return
+        # reload the product page
+        if level == 'refresh':
+            self.parser.switch_tab('main')
+            self.parser.refresh_page()
+        # drop every other tab, reload the product page and check the sign in again (the saved session makes it cheap)
+        elif level == 'soft_reset':
+            self.parser.close_tabs()
+            self.parser.set_page(self.parser.product_url)
+            self.logged_in = False
+        # new driver
+        elif level == 'hard_reset':
+            self.parser.hard_reset()
+            self.logged_in = False
+
+    def get_state(self) -> dict:
+        """
+        Purpose - Gets the bot state to checkpoint
+        """
+        return {'account_name':self.account_name, 'logged_in':self.logged_in, 'cart_cleared':self.cart_cleared, 'purchases':self.purchases, 'watch_purchases':{entry.url:entry.purchases for entry in self.watch_manager.entries}}
 
+    def restore_state(self, state:dict) -> None:
+        """
+        Purpose - Resumes from a checkpoint (the sign in of a checkpointed account restores its saved session instead of signing in)
+
+        Param - state: The checkpointed state
+        """
+        if not state:
+            return
+        # same account as before the restart
+        if not self.pinned_account and state.get('account_name') in self.config_manager.accounts and state['account_name'] != self.account_name:
+            self.switch_account(state['account_name'])
+        # the cart is kept by the site between browsers
+        self.cart_cleared = state.get('cart_cleared', False)
+        # purchases count against the limits after a restart
+        self.purchases = state.get('purchases', 0)
+        for entry in self.watch_manager.entries:
+            entry.purchases = state.get('watch_purchases', {}).get(entry.url, entry.purchases)
+        # resume prompt
+        print(f"\nResuming on {self.account_name} ({self.purchases} purchases, {'signed in' if state.get('logged_in') else 'signed out'} before the restart).")
+
+
+    """ ------------------------------------------ Sign In Methods ------------------------------------------------ """
     def sign_in(self) -> None:
         """
-        Purpose - Attempts to sign in from default ada fruit page using config file
+        Purpose - Attempts to sign in from default ada fruit page using config file (raises LoginError once the attempts run out)
         """
         # check if acoount had been logged in or not
         if not self.logged_in:
-            # sign in prompt 
-            print('\nSigning In......')
-            # xpaths for username, password, and otp fields also xpath for sign in button
-            xpath_dict = {'sign_in_1':'//*[@id="nav_account"]/span',
-            'username':'//*[@id="user_login"]',
-            'password':'//*[@id="user_password"]'}
-            # if sign in button is present excute sign and 2fa
-            self.parser.xpath_dict_itr(xpath_dict,self.account_info['login_info'])
-            # handle captcha
-            # time.sleep(6)
-            # click second sign in button
-            self.parser.click_element(self.parser.wait_for_element(By.XPATH,'//*[@id="new_user"]/p[3]/input'))
-            # opt auth
-            self.otp_auth()
+            # restore a saved session or sign in with the form and 2fa
+            restored = self.login_manager.sign_in(self.account_name, self.account.login)
             # set to logged in
             self.logged_in = True
-            # sign in success prompt 
-            print('\nSign In Successful!')
+            # sign in success prompt
+            print(f'\nRestored Session for {self.account_name}!' if restored else f'\nSign In Successful! ({self.login_manager.report()})')
 
     def sign_out(self) -> None:
         """
         Purpose - Attempts to sign out of current account
         """
         # account dropdown element
-        account_dropdown = self.parser.wait_for_element(By.CLASS_NAME,'account-dropdown.dropdown')
+        account_dropdown = self.parser.wait_for_element(By.CLASS_NAME,'account-dropdown.dropdown',required=True)
         # click account dropdown
         self.parser.click_element(account_dropdown)
         # dropdown container element
-        dropdown_container = self.parser.wait_for_element(By.CLASS_NAME,'dropdown-container',element=account_dropdown)
+        dropdown_container = self.parser.wait_for_element(By.CLASS_NAME,'dropdown-container',element=account_dropdown,required=True)
         # href list
-        dropdown_elements = self.parser.wait_for_elements(By.TAG_NAME,'li',element=dropdown_container)
+        dropdown_elements = self.parser.wait_for_elements(By.TAG_NAME,'li',element=dropdown_container,required=True)
         # iterate through href list
         for href in dropdown_elements:
             # get tag 'a' element
-            a_tag_element = self.parser.wait_for_element(By.TAG_NAME,'a',element=href)
+            a_tag_element = self.parser.wait_for_element(By.TAG_NAME,'a',element=href,required=True)
             # if the tags a elements innerhtml is 'sign out'
             if a_tag_element.get_attribute('innerHTML').lower().strip() == 'Sign Out'.lower():
                 # click sign out button
@@ -199,6 +478,8 @@ class AdaFruitManager:
         self.parser.refresh_page()
         # set to logged out
         self.logged_in = False
+        # saved session is no longer valid
+        self.session_manager.delete(self.account_name)
         # sign out success prompt 
         print('\nSign Out Successful!')
 
@@ -209,58 +490,98 @@ class AdaFruitManager:
         Purpose - Checks if product is in stock if it is returns true
         """
         # iterate through variants
-        for product in self.get_products():
+        for index, product in enumerate(self.get_products()):
+            # detection time
+            self.detected_at = time.perf_counter()
+            # what is being carted (the shipping options depend on it)
+            self.cart_contents = ((self.parser.link, self.in_stock_types[index]),)
+            # the cart is no longer empty (checkpointed so a restart clears it)
+            self.cart_cleared = False
             # attempt to click product variant
             self.parser.click_element(product)
             # cart item
-            self.cart_item()
+            with METRICS.phase('cart_item'):
+                # the staged checkout tab takes over after the cart add
+                if self.is_staged():
+                    self.add_to_cart()
+                else:
+                    self.cart_item()
+            if self.supervisor:
+                self.supervisor.checkpoint()
             # item in cart
             return True
         # if cart item was not present
         return False
 
+    def scan_variants(self) -> list:
+        """
+        Purpose - Reads every product variant on the page in one webdriver round trip and returns a list of (element, name, stock) tuples
+        """
+        # all variants with their name and stock strings
+        variants = self.parser.scan_options('prod-right-side','top_10enabled','option_name','option_meta')
+        # if the product block has not loaded yet wait for it and scan again
+        if variants is None and self.parser.wait_for_element(By.ID,'prod-right-side'):
+            variants = self.parser.scan_options('prod-right-side','top_10enabled','option_name','option_meta')
+        # a missing product block may be a throttle page or black screen
+        self.throttled = variants is None and is_throttle_response(None, self.parser.get_body_text())
+        return variants or []
+
     def get_products(self) -> list:
         """
         Purpose - Gets all products on page and returns them in a list of web elements
         """
+        # count webdriver commands used by this poll
+        self.parser.reset_command_count()
+        self.poll_counter.inc()
+        # poll start time
+        start = time.perf_counter()
         # products elements to check for stock
         products = []
-        # product type that is valid and needs to filter
-        valid_product_type = ['2gb','4gb','8gb']
-        # if testing state is true
-        if self.testing_state:
-            valid_product_type = ['PCB Antenna - Stacking Headers'.lower()]
-        # out of stock indication
-        ots_string = 'Out of stock'.lower()
-        # meta options
-        product_right_side = self.parser.wait_for_element(By.ID,'prod-right-side')
-        # all meta options
-        all_products = self.parser.wait_for_elements(By.CLASS_NAME,'top_10enabled ',element=product_right_side)
+        self.in_stock_types = []
+        # fingerprint of the product block in one round trip
+        fingerprint = ChangeDetector.fingerprint(self.parser.get_outer_html('prod-right-side')) if self.change_detector else None
+        # if the block is the same as the last poll that had nothing in stock skip parsing and logging
+        observations = self.change_detector.check(self.parser.link, fingerprint) if self.change_detector else None
+        if observations is not None:
+            self.throttled = False
+            self.history.record(self.parser.link, observations, time.perf_counter() - start)
+            self.poll_command_count = self.parser.command_count
+            return products
+        # all variants on the page
+        variants = self.scan_variants()
+        # record observation
+        observations = [(product_type, OTS_STRING != product_stock) for product, product_type, product_stock in variants if product_type is not None and product_stock is not None]
+        self.history.record(self.parser.link, observations, time.perf_counter() - start)
         # iterate through all meta products
-        for product in all_products:
-            # inner meta option name and stock status
-            product_type = self.parser.wait_for_element(By.CLASS_NAME,'option_name',element=product)
-            product_stock = self.parser.wait_for_element(By.CLASS_NAME,'option_meta',element=product)
+        for product, product_type, product_stock in variants:
             # if element equals exists
-            if product_type and product_stock:
+            if product_type is not None and product_stock is not None:
                 # if testing state is true
                 if self.testing_state:
-                    print(product_type.get_attribute('innerHTML').lower().strip())
-                    print(product_stock.get_attribute('innerHTML').lower().strip())
+                    EVENTS.info('variant', '{variant}\n{stock}', variant=product_type, stock=product_stock)
                 # if text of element is a vaild product type 
-                if product_type.get_attribute('innerHTML').lower().strip() in valid_product_type:
+                if product_type in self.valid_product_types:
                     # if the product is in stock
-                    if ots_string != product_stock.get_attribute('innerHTML').lower().strip():
+                    if OTS_STRING != product_stock:
                         # add element to product list
                         products.append(product)
+                        self.in_stock_types.append(product_type)
                         # stock prompt 
-                        print(f"\nRaspi {product_type.get_attribute('innerHTML').lower().strip()} model is in stock :)")
+                        EVENTS.info('variant_stock', '\nRaspi {variant} model is in stock :)', variant=product_type, in_stock=True)
                     else:
-                        # prompt for out of stock
-                        print(f"Raspi {product_type.get_attribute('innerHTML').lower().strip()} model is out of stock :(")
+                        # prompt for out of stock (every poll, so only at debug)
+                        EVENTS.debug('variant_stock', 'Raspi {variant} model is out of stock :(', variant=product_type, in_stock=False)
             # if element equals false
             else:
-                print('Warning element was not used - False.')
+                EVENTS.warning('variant_missing', 'Warning element was not used - False.')
+        # remember the block so unchanged polls can be skipped
+        if self.change_detector:
+            self.change_detector.settle(self.parser.link, fingerprint, observations, bool(products))
+        # webdriver commands used by this poll
+        self.poll_command_count = self.parser.command_count
+        # if testing state is true
+        if self.testing_state:
+            EVENTS.info('poll_commands', 'WebDriver commands this poll: {commands}', commands=self.poll_command_count)
         # return products
         return products
 
@@ -274,17 +595,17 @@ class AdaFruitManager:
             # cart prompt
             print('\nClearing Cart.......')
             # get cart button
-            cart_button = self.parser.wait_for_element(By.CLASS_NAME,'cart')
+            cart_button = self.parser.wait_for_element(By.CLASS_NAME,'cart',required=True)
             # get cart count
-            cart_count = self.parser.wait_for_element(By.CLASS_NAME,'cart-count',element=cart_button).text
+            cart_count = self.parser.wait_for_element(By.CLASS_NAME,'cart-count',element=cart_button,required=True).text
             # if cart count is greater than 0
             if int(cart_count) > 0:
                 # click cart button
                 self.parser.click_element(cart_button)
                 # get and click delete from cart buttons
-                self.parser.click_elements(self.parser.wait_for_elements(By.CLASS_NAME,'cart-fake-button'))
-                # delay
-                time.sleep(1)
+                self.parser.click_elements(self.parser.wait_for_elements(By.CLASS_NAME,'cart-fake-button',required=True))
+                # wait for the items to be gone
+                self.parser.wait_for_absent(By.CLASS_NAME,'cart-fake-button',step='clear_cart')
                 # refresh default page
                 self.parser.refresh_page()
             # set cart cleared
@@ -292,87 +613,174 @@ class AdaFruitManager:
             # cart prompt
             print('\nCart Cleared!')
         
+    def add_to_cart(self) -> bool:
+        """
+        Purpose - Adds the selected variant to the cart and waits for the cart count to show it, returns false if it did not
+        """
+        # get product stock right side element
+        product_right_side = self.parser.wait_for_element(By.ID,'prod-right-side',required=True)
+        # get and click add to cart button
+        self.parser.click_element(self.parser.wait_for_element(By.XPATH,'//*[@id="prod-add-btn"]', element=product_right_side,required=True))
+        # the cart is server side so the checkout tab only sees the item once it is added
+        def item_in_cart(driver:object) -> bool:
+            try:
+                return int(driver.find_element(By.CLASS_NAME,'cart-count').text.strip() or 0) > 0
+            # page is reloading
+            except Exception:
+                return False
+        return self.parser.wait_policy.until(self.parser.driver, item_in_cart, 'cart_add', kind='navigation')
+
     def cart_item(self) -> None:
         """
         Purpose - Carts a specfic item on ada fruit
         """
         # get product stock right side element
-        product_right_side = self.parser.wait_for_element(By.ID,'prod-right-side')
+        product_right_side = self.parser.wait_for_element(By.ID,'prod-right-side',required=True)
         # get and click add to cart button
-        self.parser.click_element(self.parser.wait_for_element(By.XPATH,'//*[@id="prod-add-btn"]', element=product_right_side))
+        self.parser.click_element(self.parser.wait_for_element(By.XPATH,'//*[@id="prod-add-btn"]', element=product_right_side,required=True))
         # get and click my cart button
-        self.parser.click_element(self.parser.wait_for_element(By.XPATH,'//*[@id="nav_account"]/div'))
+        self.parser.click_element(self.parser.wait_for_element(By.XPATH,'//*[@id="nav_account"]/div',required=True))
         # get and click checkout button
-        self.parser.click_element(self.parser.wait_for_element(By.CLASS_NAME,'mobile-button-row'))
+        self.parser.click_element(self.parser.wait_for_element(By.CLASS_NAME,'mobile-button-row',required=True))
 
 
     """ ------------------------------------------ Shipping Methods ------------------------------------------------ """
     def determine_shipping(self) -> webelement:
         """
-        Purpose - Determines shipping type at checkout and returns the radio button web element of that shipping type
-        """
-        # get shipping types by label
-        shipping_label_elements = self.parser.wait_for_elements(By.CLASS_NAME,'checkboxLabel.sg-label.checkout-shipping-method-label')
-        print(shipping_label_elements)
-        # if shipping type is select for the cheapest or expensive option
-        if self.shipping_type in ['cheapest','expensive']:
-            # if shipping type is the cheapest option
-            if self.shipping_type == 'cheapest':
-                # get shipping type
-                return min(shipping_label_elements, key=lambda shipping_label_element: float(shipping_label_element.text.split(':')[-1].replace('$','')))
-            # if shipping type is the expensive option
-            elif self.shipping_type == 'expensive':
-                # get shipping type
-                return max(shipping_label_elements, key=lambda shipping_label_element: float(shipping_label_element.text.split(':')[-1].replace('$','')))
-        # if shipping type is by name or null
-        else:
-            # get shipping type
-            shipping_label_element = list(filter(lambda shipping_label_element: self.shipping_type.lower() in shipping_label_element.get_attribute('for').lower(), shipping_label_elements))
-            # if label is found
-            if shipping_label_element:
-                return shipping_label_element[0]
-            # if label is not found
-            else:
-                # prompt
-                print(f'The shipping type recorded: {self.shipping_type.lower()} was not found as a shipping option.\nShipping options are changed based on number of products at checkout.')
-                print(f'The cheapest shipping method will be selected instead.')
-                return min(shipping_label_elements, key=lambda shipping_label_element: float(shipping_label_element.text.split(':')[-1].replace('$','')))
+        Purpose - Determines shipping type at checkout and returns the label web element of that shipping type
+        """
+        # wait for the shipping options
+        self.parser.wait_for_elements(By.CLASS_NAME,SHIPPING_LABEL_CLASS,required=True)
+        # pick from the last checkout of this cart or scan every option in one call
+        return self.shipping_manager.choose(self.parser, self.account_name, self.cart_contents, self.shipping_type)
 
 
     """ ------------------------------------------ Checkout Methods ------------------------------------------------ """
-    def checkout(self) -> None:
-        """
-        Purpose - Interacts with a series of checkout element to complete an order 
-        """
-        # xpaths for shipping info
-        xpath_dict = {
-        'name':'//*[@id="delivery_name"]',
-        'address':'//*[@id="delivery_address1"]',
-        'additional_address':'//*[@id="delivery_address2"]',
-        'city':'//*[@id="delivery_city"]', 
-        'state':'//*[@id="delivery_state_dropdown"]',
-        'postal_code':'//*[@id="delivery_postcode"]',
-        'phone_number':'//*[@id="delivery_phone"]'}
+    def is_staged(self) -> bool:
+        """
+        Purpose - Returns true if the current account has its address staged in an open checkout tab
+        """
+        return self.prestage and bool(self.staged.get(self.account_name, {}).get('address')) and self.parser.has_tab('checkout')
+
+    def prestage_checkout(self) -> bool:
+        """
+        Purpose - Enters and validates the delivery address in a checkout tab while waiting for stock, returns true if the address is staged
+        """
+        staged = self.staged.get(self.account_name)
+        # already tried for this account and checkout info in the open tab
+        if staged and staged['checkout_info'] == self.account.address and self.parser.has_tab('checkout'):
+            return bool(staged['address'])
+        # staging prompt
+        print('\nStaging Checkout......')
+        self.staged[self.account_name] = staged = {'checkout_info':self.account.address, 'address':False}
+        # checkout tab
+        if self.parser.switch_tab('checkout'):
+            self.parser.refresh_page()
+        else:
+            self.parser.open_tab('checkout', self.checkout_url)
+        try:
+            # enter and validate the address if the site shows the delivery form
+            if self.parser.wait_for_element(By.XPATH,DELIVERY_XPATHS['name'],step='probe'):
+                staged['address'] = self.enter_address()
+            # staging prompt
+            print('\nCheckout Staged!' if staged['address'] else '\nNo delivery form to stage, checkout will enter the address.')
+        # product tab back in front
+        finally:
+            self.parser.switch_tab('main')
+        return staged['address']
+
+    def enter_address(self) -> bool:
+        """
+        Purpose - Fills and saves the delivery address and accepts the address as entered, returns false if the form could not be filled
+        """
         # start shipping process
-        self.parser.xpath_dict_itr(xpath_dict,self.account_info['checkout_info'])
-        # get and click save and contiune button
-        self.parser.click_element(self.parser.wait_for_element(By.CLASS_NAME,'blue-button.sg-button.savecontinueblue'))
+        if not self.parser.xpath_dict_itr(DELIVERY_XPATHS,self.account.address.as_dict(),batch=True,keystroke_fields=self.keystroke_fields):
+            return False
+        # get and click save and contiune button (waits for the next step so the same button class is not found on the old page)
+        self.parser.click_and_wait(self.parser.wait_for_element(By.CLASS_NAME,'blue-button.sg-button.savecontinueblue',required=True),step='checkout_delivery')
         # check if address is valid
-        next_continue_button = self.parser.wait_for_element(By.CLASS_NAME,'blue-button.sg-button.savecontinueblue')
+        next_continue_button = self.parser.wait_for_element(By.CLASS_NAME,'blue-button.sg-button.savecontinueblue',required=True)
         print(next_continue_button.text.lower().strip())
         # if the next continue button is for address click
         if next_continue_button.text.lower().strip() == 'Use Address as Entered'.lower():
-            self.parser.click_element(next_continue_button)
-        # get and click shipping option
-        self.parser.click_element(self.determine_shipping())
+            self.parser.click_and_wait(next_continue_button,step='checkout_address')
+        return True
+
+    def confirm_shipping(self) -> None:
+        """
+        Purpose - Picks the shipping option (the one picked last time for the account and cart if it is offered) and continues
+        """
+        # get shipping option
+        shipping_label = self.determine_shipping()
+        # click shipping option
+        self.parser.click_element(shipping_label)
         # get and click save and contiune button
-        self.parser.click_element(self.parser.wait_for_element(By.CLASS_NAME,'blue-button.sg-button.savecontinueblue'))
+        self.parser.click_and_wait(self.parser.wait_for_element(By.CLASS_NAME,'blue-button.sg-button.savecontinueblue',required=True),step='checkout_shipping')
+
+    def submit_order(self, mode:str) -> bool:
+        """
+        Purpose - Continues past payment and submits the order, returns false if the coordinator did not allow the purchase
+
+        Param - mode: Checkout mode the detection to submit time is recorded under (staged or full)
+        """
         # get and click save and contiune button
-        self.parser.click_element(self.parser.wait_for_element(By.CLASS_NAME,'blue-button.sg-button.savecontinueblue'))\
+        self.parser.click_and_wait(self.parser.wait_for_element(By.CLASS_NAME,'blue-button.sg-button.savecontinueblue',required=True),step='checkout_payment')
         # get and click save and submit button
-        submit_button = self.parser.wait_for_element(By.CLASS_NAME,'sg-button.green-button.bold.submitOrder')
-        if self.testing_state == False:
-            self.parser.click_element(submit_button)
-        # sleep for a sec
-        time.sleep(.5)
+        submit_button = self.parser.wait_for_element(By.CLASS_NAME,'sg-button.green-button.bold.submitOrder',required=True)
+        # reserve a purchase with the coordinator so racing accounts stay within their limits
+        if self.coordinator and not self.coordinator.reserve(self.account_name):
+            print(f'\nPurchase limit reached, {self.account_name} will not submit.')
+            return False
+        # reserve it in the ledger shared with other nodes so no two nodes buy on the same account
+        ledger_id = self.coordination.reserve(self.account_name, *(self.cart_contents[0] if self.cart_contents else (self.parser.link, ''))) if self.coordination else None
+        if self.coordination and ledger_id is None:
+            print(f'\n{self.account_name} is leased by another node or has reached its purchase limit, it will not submit.')
+            if self.coordinator:
+                self.coordinator.release(self.account_name)
+            return False
+        # detection to submit time
+        if self.detected_at:
+            self.last_detection_to_submit = time.perf_counter() - self.detected_at
+            METRICS.histogram('adafruit_detection_to_submit_seconds', 'Time from stock detection to the submit click', mode=mode).observe(self.last_detection_to_submit)
+            EVENTS.info('detection_to_submit', '\nDetection to submit ({mode}): {ms:.0f} ms', mode=mode, ms=self.last_detection_to_submit * 1000)
+        try:
+            if self.testing_state == False:
+                # submit and wait for the order to go through
+                self.parser.click_and_wait(submit_button,step='checkout_submit')
+        # give the reservation back if the submit failed
+        except Exception as e:
+            if self.coordinator:
+                self.coordinator.release(self.account_name)
+            if ledger_id is not None:
+                self.coordination.cancel(ledger_id)
+            raise(e)
+        # record the purchase
+        if self.coordinator:
+            self.coordinator.commit(self.account_name)
+        if ledger_id is not None:
+            self.coordination.commit(ledger_id)
+        return True
 
+    def checkout(self) -> bool:
+        """
+        Purpose - Interacts with a series of checkout element to complete an order, returns false if the coordinator did not allow the purchase
+        """
+        # staged checkout tab already has the address so loading it with the cart goes to shipping
+        staged = self.is_staged()
+        if staged:
+            self.parser.switch_tab('checkout')
+            self.parser.refresh_page()
+        try:
+            # the site skips the delivery form when the checkout already has an address
+            if self.parser.wait_for_any({'address':(By.XPATH,DELIVERY_XPATHS['name']), 'shipping':(By.CLASS_NAME,SHIPPING_LABEL_CLASS)},step='checkout_load') != 'shipping':
+                # never confirm shipping or submit without the delivery address
+                if not self.enter_address():
+                    raise CheckoutError(f'The delivery address of {self.account_name} could not be entered')
+            # get and click shipping option
+            self.confirm_shipping()
+            # submit
+            return self.submit_order('staged' if staged else 'full')
+        # product tab back in front
+        finally:
+            if staged:
+                self.parser.switch_tab('main')
@@ -1,22 +1,18 @@
 # local imports
 from lib.funcs import *
 from lib.config import config
-# google imports
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from google.auth.exceptions import RefreshError
 # other imports
-import os.path, base64, time
-from httplib2.error import ServerNotFoundError
+import os.path, base64, json, threading, time, urllib.request
 from email.mime.text import MIMEText
+# google imports are deferred to first use since they are slow and only needed once a notification goes out
 
 
 # if modifying these scopes, delete the file token.json.
 SCOPES = ['https://mail.google.com/']
 CREDS_PATH = convert_path_os('data/config/client_secret.apps.googleusercontent.com.json')
+# gmail discovery document (fetched once if the client library has no bundled copy)
+DISCOVERY_PATH = convert_path_os('data/cache/gmail_v1_discovery.json')
+DISCOVERY_URL = 'https://gmail.googleapis.com/$discovery/rest?version=v1'
 
 
 class GmailManager():
@@ -26,69 +22,115 @@ class GmailManager():
 	def __init__(self, bot:object) -> None:
 		# bot object
 		self.bot = bot
-		# init auth
-		self.auth()
+		# oauth credentials (set by auth, which can run on a startup thread)
+		self.creds = None
+		self.auth_lock = threading.Lock()
+		# gmail api client (built on the first message)
+		self.service = None
 		# default from email
 		self.my_email = config['gmail']['gmail_address']
 
 
 	def auth(self) -> None:
 		"""
-        Purpose - Gets service options for Google Gmail API
+        Purpose - Gets (or refreshes) the oauth credentials for Google Gmail API
         """
-		creds = None
-		# The file token.json stores the user's access and refresh tokens, and is
-		# created automatically when the authorization flow completes for the first time.
-		if os.path.exists('token.json'):
-			creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-		# If there are no (valid) credentials available, let the user log in.
-		if not creds or not creds.valid:
-			if creds and creds.expired and creds.refresh_token:
-				try:
-					creds.refresh(Request())
-				except RefreshError as e:
-					print(e)
+		from google.auth.transport.requests import Request
+		from google.oauth2.credentials import Credentials
+		from google_auth_oauthlib.flow import InstalledAppFlow
+		from google.auth.exceptions import RefreshError
+		with self.auth_lock:
+			# already signed in
+			if self.creds and self.creds.valid:
+				return
+			creds = None
+			# The file token.json stores the user's access and refresh tokens, and is
+			# created automatically when the authorization flow completes for the first time.
+			if os.path.exists('token.json'):
+				creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+			# If there are no (valid) credentials available, let the user log in.
+			if not creds or not creds.valid:
+				if creds and creds.expired and creds.refresh_token:
+					try:
+						creds.refresh(Request())
+					except RefreshError as e:
+						print(e)
+						flow = InstalledAppFlow.from_client_secrets_file(CREDS_PATH, SCOPES)
+						creds = flow.run_local_server(port=0)
+				else:
 					flow = InstalledAppFlow.from_client_secrets_file(CREDS_PATH, SCOPES)
 					creds = flow.run_local_server(port=0)
-			else:
-				flow = InstalledAppFlow.from_client_secrets_file(CREDS_PATH, SCOPES)
-				creds = flow.run_local_server(port=0)
-			# Save the credentials for the next run
-			with open('token.json', 'w') as token:
-				token.write(creds.to_json())
-		try:
-			# Call the Gmail API
-			self.service = build('gmail', 'v1', credentials=creds)
+				# Save the credentials for the next run
+				with open('token.json', 'w') as token:
+					token.write(creds.to_json())
+			self.creds = creds
 
-		except HttpError as error:
-			# TODO(developer) - Handle errors from gmail API.
-			print(f'An error occurred: {error}')
 
+	def get_discovery_document(self) -> dict:
+		"""
+        Purpose - Gets the gmail discovery document from the client library, the local cache or the network (then cached)
+        """
+		from googleapiclient import discovery_cache
+		# bundled with the client library
+		document = discovery_cache.get_static_doc('gmail', 'v1')
+		if document:
+			return json.loads(document)
+		# cached from an earlier fetch
+		if os.path.exists(DISCOVERY_PATH):
+			with open(DISCOVERY_PATH) as f:
+				return json.load(f)
+		# fetch and cache
+		with urllib.request.urlopen(DISCOVERY_URL, timeout=10) as response:
+			document = json.loads(response.read())
+		os.makedirs(os.path.dirname(DISCOVERY_PATH), exist_ok=True)
+		with open(DISCOVERY_PATH, 'w') as f:
+			json.dump(document, f)
+		return document
 
-	def send_message(self, msg: str) -> None:
+
+	def get_service(self) -> object:
 		"""
-        Purpose - Sends email using google gmail api
+        Purpose - Gets the Gmail API client, signing in and building it on first use
+        """
+		if self.service is None:
+			from googleapiclient.discovery import build_from_document
+			self.auth()
+			# Call the Gmail API
+			self.service = build_from_document(self.get_discovery_document(), credentials=self.creds)
+		return self.service
+
+
+	def deliver(self, msg:str, subject:str=None) -> None:
+		"""
+        Purpose - Sends email using google gmail api, raises if it was not sent
 
         Param - msg: The message to be sent
+
+        Param - subject: The subject line (defaults to automated from the bot name)
         """
 		# Create a message
 		temp_message = MIMEText(msg)
 		temp_message['To'] = self.my_email
 		temp_message['From'] = self.my_email
-		temp_message['Subject'] = f'Automated From {self.bot.name}'
+		temp_message['Subject'] = subject if subject else f'Automated From {self.bot.name}'
 		# encoded message
-		# Send the email
 		message = {'raw': base64.urlsafe_b64encode(temp_message.as_bytes()).decode()}
 		# Send the email
+		self.get_service().users().messages().send(userId="me", body=message).execute()
+
+
+	def send_message(self, msg: str) -> None:
+		"""
+        Purpose - Sends email using google gmail api
+
+        Param - msg: The message to be sent
+        """
+		from googleapiclient.errors import HttpError
+		from httplib2.error import ServerNotFoundError
+		# Send the email
 		try:
-		    message = (self.service.users().messages().send(userId="me", body=message).execute())
+			self.deliver(msg)
 		except HttpError as error:
-		    print(f'An error occurred: {error}')
+			print(f'An error occurred: {error}')
 		except ServerNotFoundError as error:
-			print(123)
 			print(f'An error occurred: {error}')
-
-
-
-
-
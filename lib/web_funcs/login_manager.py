@@ -0,0 +1,228 @@
+# local imports
+from lib.web_funcs.parser_manager import ParserManager
+from lib.web_funcs.session_manager import SessionManager
+from lib.bot_funcs.scheduler_manager import SchedulerManager, is_throttle_response
+from lib.bot_funcs.metrics_manager import METRICS
+from lib.bot_funcs.config_manager import LoginRecord
+# selenium imports
+from selenium.webdriver.common.by import By
+# other imports
+import time, pyotp
+
+
+# xpaths of the sign in form
+SIGN_IN_XPATHS = {'sign_in_1':'//*[@id="nav_account"]/span',
+'username':'//*[@id="user_login"]',
+'password':'//*[@id="user_password"]'}
+SIGN_IN_BUTTON_XPATH = '//*[@id="new_user"]/p[3]/input'
+OTP_FIELD_XPATH = '//*[@id="user_otp_attempt"]'
+OTP_BUTTON_XPATH = '//*[@id="edit_user"]/p[2]/input'
+# what the page shows after the one time password is submitted
+VERIFY_LOCATORS = {'signed_in':(By.CLASS_NAME,'account-dropdown.dropdown'), 'otp_error':(By.CLASS_NAME,'alert.alert-danger.alert-dismissable')}
+
+
+class LoginError(Exception):
+    """
+    Purpose - Raised when sign in did not succeed within its attempts
+    """
+    # the supervisor recovers from it like a page failure
+    failure = 'page'
+
+
+class LoginManager:
+    """
+    Purpose - Signs in as a state machine (restore, credentials, otp, verify) with bounded retries, backoff between attempts and one time passwords that are never about to expire
+    """
+    def __init__(self, parser:ParserManager, session_manager:SessionManager, scheduler:SchedulerManager=None, keystroke_fields:list=[], max_attempts:int=3, backoff:float=2.0, backoff_factor:float=2.0, max_backoff:float=30.0, otp_margin:float=3.0) -> None:
+        # browser, saved sessions and the poll scheduler (slowed down when sign in is throttled)
+        self.parser = parser
+        self.session_manager = session_manager
+        self.scheduler = scheduler
+        # form fields that always get real keystrokes
+        self.keystroke_fields = keystroke_fields
+        # attempts before giving up and the delay before each retry (backoff * backoff_factor ** retry, capped)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        # seconds a one time password must have left before it is submitted
+        self.otp_margin = otp_margin
+        # last one time password submitted (the site rejects a code twice)
+        self.last_token = None
+        # (state, seconds) of every transition of the last sign in
+        self.transitions = []
+        # state -> histogram (cached so transitions skip the registry)
+        self.histograms = {}
+        self.otp_retry_counter = METRICS.counter('adafruit_otp_retries_total', 'OTP and black screen sign in retries')
+
+    @classmethod
+    def from_config(cls, login_config:dict, parser:ParserManager, session_manager:SessionManager, scheduler:SchedulerManager=None, keystroke_fields:list=[]) -> 'LoginManager':
+        """
+        Purpose - Builds a login manager from the login section of the config
+
+        Param - login_config: The login config section
+
+        Param - parser: The parser to sign in with
+
+        Param - session_manager: Saved sessions
+
+        Param - scheduler: The poll scheduler
+
+        Param - keystroke_fields: Form fields that always get real keystrokes
+        """
+        return cls(parser, session_manager, scheduler, keystroke_fields, login_config.get('max_attempts', 3), login_config.get('backoff', 2.0), login_config.get('backoff_factor', 2.0), login_config.get('max_backoff', 30.0), login_config.get('otp_margin', 3.0))
+
+    def sign_in(self, account_name:str, login_info:LoginRecord) -> bool:
+        """
+        Purpose - Signs in, returns true if a saved session was restored and false if the form was used, raises LoginError once the attempts run out
+
+        Param - account_name: Name of the account
+
+        Param - login_info: The username, password and otp secret of the account
+        """
+        self.transitions = []
+        self.account_name = account_name
+        self.login_info = login_info
+        self.attempt = 0
+        restored = False
+        state = 'restore'
+        while state != 'done':
+            start = time.perf_counter()
+            # run the state and time the transition
+            next_state = getattr(self, f'on_{state}')()
+            self.record(state, time.perf_counter() - start)
+            restored = restored or (state == 'restore' and next_state == 'done')
+            state = next_state
+        return restored
+
+    def record(self, state:str, seconds:float) -> None:
+        """
+        Purpose - Records how long a state took
+
+        Param - state: Name of the state
+
+        Param - seconds: How long it took
+        """
+        self.transitions.append((state, seconds))
+        histogram = self.histograms.get(state)
+        if histogram is None:
+            histogram = self.histograms[state] = METRICS.histogram('adafruit_login_state_seconds', 'Time spent in each sign in state', state=state)
+        histogram.observe(seconds)
+
+    def report(self) -> str:
+        """
+        Purpose - Formats the transitions of the last sign in
+        """
+        return ', '.join(f'{state} {seconds:.2f}s' for state, seconds in self.transitions)
+
+    def is_throttled(self) -> bool:
+        """
+        Purpose - Returns true if the page is a "Retry later" or black screen
+        """
+        return is_throttle_response(None, self.parser.get_body_text())
+
+    """ ------------------------------------------ States ------------------------------------------------ """
+    def on_restore(self) -> str:
+        """
+        Purpose - Restores a saved session to skip sign in and 2fa
+        """
+        return 'done' if self.session_manager.restore(self.parser, self.account_name) else 'credentials'
+
+    def on_credentials(self) -> str:
+        """
+        Purpose - Fills the username and password and submits them
+        """
+        # sign in prompt
+        print('\nSigning In......')
+        if not self.parser.xpath_dict_itr(SIGN_IN_XPATHS,self.login_info.as_dict(),batch=True,keystroke_fields=self.keystroke_fields):
+            return 'throttled' if self.is_throttled() else 'retry'
+        sign_in_button = self.parser.wait_for_element(By.XPATH,SIGN_IN_BUTTON_XPATH)
+        if not sign_in_button:
+            return 'throttled' if self.is_throttled() else 'retry'
+        self.parser.click_element(sign_in_button)
+        return 'otp'
+
+    def on_otp(self) -> str:
+        """
+        Purpose - Enters a one time password with enough time left and submits it
+        """
+        # 2fa prompt
+        print('\nGet 2FA Token......')
+        otp_field = self.parser.wait_for_element(By.XPATH,OTP_FIELD_XPATH)
+        if not otp_field:
+            return 'throttled' if self.is_throttled() else 'retry'
+        token = self.get_token()
+        # make sure element is clear of text before inputing
+        otp_field.clear()
+        otp_field.send_keys(token)
+        self.parser.click_element(self.parser.wait_for_element(By.XPATH,OTP_BUTTON_XPATH))
+        self.last_token = token
+        return 'verify'
+
+    def on_verify(self) -> str:
+        """
+        Purpose - Checks what the page shows after the one time password, saves the session if signed in
+        """
+        shown = self.parser.wait_for_any(VERIFY_LOCATORS, step='verify')
+        if shown == 'signed_in':
+            # save session for the next driver
+            self.session_manager.save(self.parser, self.account_name)
+            return 'done'
+        # code was rejected
+        if shown == 'otp_error':
+            # OTP prompt
+            print('\nOTP Error - Retrying......')
+            self.otp_retry_counter.inc()
+            return 'otp_retry'
+        return 'throttled' if self.is_throttled() else 'retry'
+
+    def on_otp_retry(self) -> str:
+        """
+        Purpose - Enters the next one time password on the same page (the cheap retry), falls back to a full retry when the attempts run out
+        """
+        self.attempt += 1
+        if self.attempt >= self.max_attempts:
+            raise LoginError(f'Sign in for {self.account_name} failed after {self.attempt} attempts ({self.report()})')
+        # a fresh code on the same page if the field is still there
+        return 'otp' if self.parser.wait_for_element(By.XPATH,OTP_FIELD_XPATH,step='probe') else 'retry'
+
+    def on_throttled(self) -> str:
+        """
+        Purpose - Slows down polling after a "Retry later" or black screen
+        """
+        # throttle prompt
+        print('\nBlack Screen Error - Retrying......')
+        self.otp_retry_counter.inc()
+        if self.scheduler:
+            self.scheduler.record_throttle()
+        return 'retry'
+
+    def on_retry(self) -> str:
+        """
+        Purpose - Waits out the backoff and starts over from the product page in the same browser, raises LoginError once the attempts run out
+        """
+        self.attempt += 1
+        if self.attempt >= self.max_attempts:
+            raise LoginError(f'Sign in for {self.account_name} failed after {self.attempt} attempts ({self.report()})')
+        delay = min(self.max_backoff, self.backoff * self.backoff_factor ** (self.attempt - 1))
+        # retry prompt
+        print(f'\nSign in attempt {self.attempt}/{self.max_attempts} failed, retrying in {delay:.1f}s......')
+        time.sleep(delay)
+        self.parser.set_page(self.parser.product_url)
+        return 'credentials'
+
+    """ ------------------------------------------ Token Methods ------------------------------------------------ """
+    def get_token(self) -> str:
+        """
+        Purpose - Gets a one time password that has at least otp_margin seconds left and was not submitted before, waiting for the next 30 second window if needed
+        """
+        totp = pyotp.TOTP(self.login_info.otp)
+        now = time.time()
+        remaining = totp.interval - now % totp.interval
+        # about to expire or already used, wait for the next window
+        if remaining < self.otp_margin or totp.at(now) == self.last_token:
+            # token prompt
+            print(f'\nWaiting {remaining:.1f}s for a fresh 2FA token......')
+            time.sleep(remaining + .05)
+            now = time.time()
+        return totp.at(now)
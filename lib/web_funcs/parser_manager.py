@@ -1,24 +1,262 @@
 # local imports
 from lib.funcs import *
+from lib.bot_funcs.metrics_manager import METRICS
+from lib.web_funcs.snapshot_manager import SnapshotManager, SNAPSHOT_SCRIPT
 # selenium imports
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, ElementNotInteractableException
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, ElementNotInteractableException, WebDriverException
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.remote import webelement
 # other imports
-import time
+import hashlib, time, threading
 
 # set options
 OPTIONS = webdriver.ChromeOptions()
+# reads every option element with its name and meta inner html in one round trip
+SCAN_OPTIONS_SCRIPT = """
+var block = document.getElementById(arguments[0]);
+if (!block) { return null; }
+var options = block.getElementsByClassName(arguments[1]);
+var result = [];
+for (var i = 0; i < options.length; i++) {
+    var name = options[i].getElementsByClassName(arguments[2])[0];
+    var meta = options[i].getElementsByClassName(arguments[3])[0];
+    result.push([options[i], name ? name.innerHTML : null, meta ? meta.innerHTML : null]);
+}
+return result;
+"""
+# sets the value of every [key, xpath, value] field and fires input and change events in one round trip, returns the keys that did not take
+FILL_FIELDS_SCRIPT = """
+var failed = [];
+for (var i = 0; i < arguments[0].length; i++) {
+    var key = arguments[0][i][0], value = arguments[0][i][2];
+    var field = document.evaluate(arguments[0][i][1], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    var tag = field ? field.tagName.toLowerCase() : '';
+    if (tag === 'select') {
+        // match an option by value or text the way typing into the dropdown would
+        var match = null;
+        for (var j = 0; j < field.options.length; j++) {
+            var option = field.options[j];
+            if (option.value.toLowerCase() === value.toLowerCase() || option.text.trim().toLowerCase() === value.toLowerCase()) { match = option; break; }
+        }
+        if (!match) { failed.push(key); continue; }
+        value = match.value;
+        field.value = value;
+    } else if (tag === 'input' || tag === 'textarea') {
+        // native setter so frameworks that track the value see the change
+        var prototype = tag === 'input' ? HTMLInputElement.prototype : HTMLTextAreaElement.prototype;
+        Object.getOwnPropertyDescriptor(prototype, 'value').set.call(field, value);
+    } else {
+        failed.push(key);
+        continue;
+    }
+    field.dispatchEvent(new Event('input', {bubbles: true}));
+    field.dispatchEvent(new Event('change', {bubbles: true}));
+    if (field.value !== value) { failed.push(key); }
+}
+return failed;
+"""
+# seconds each step or kind of wait may take before giving up (steps not listed use their kind then 'default')
+WAIT_BUDGETS = {
+    'default' : 7.0,
+    # page elements that should already be there after a navigation
+    'element' : 7.0,
+    # form fields becoming interactable
+    'field' : 2.0,
+    # page going stale after a click that navigates
+    'navigation' : 5.0,
+    # optional elements (alerts, black screens) that are usually absent
+    'probe' : 1.0,
+    # signed in check after restoring a saved session
+    'session' : 2.0,
+    # page shown after submitting the one time password (a slow sign in must not read as a rejected code)
+    'verify' : 7.0,
+}
+# seconds between condition checks
+WAIT_POLL = .05
+# url patterns the lean profile blocks (only the prod-right-side block is read so images, fonts, video and trackers are dead weight)
+LEAN_BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.mp4', '*.webm',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*facebook.net*', '*facebook.com/tr*',
+    '*hotjar.com*', '*clarity.ms*', '*bing.com*', '*youtube.com*', '*ytimg.com*', '*twitter.com*', '*pinterest.com*',
+]
+# chrome arguments of the lean profile
+LEAN_ARGUMENTS = [
+    '--blink-settings=imagesEnabled=false',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-features=Translate,MediaRouter,OptimizationHints',
+    '--no-first-run',
+    '--mute-audio',
+]
+# chrome preferences of the lean profile (2 is block)
+LEAN_PREFS = {
+    'profile.managed_default_content_settings.images' : 2,
+    'profile.default_content_setting_values.notifications' : 2,
+    'profile.default_content_setting_values.geolocation' : 2,
+    'profile.default_content_setting_values.media_stream' : 2,
+}
+
+
+class WaitTimeout(TimeoutException):
+    """
+    Purpose - Raised when a required wait ran out of budget (the page is not what was expected)
+    """
+    # the supervisor recovers from it like a page failure
+    failure = 'page'
+
+
+class WaitPolicy:
+    """
+    Purpose - Condition based waits that poll quickly, give up after a per step budget and record how long every wait took
+    """
+    def __init__(self, budgets:dict=None, poll_frequency:float=WAIT_POLL) -> None:
+        # step -> timeout budget in seconds
+        self.budgets = {**WAIT_BUDGETS, **(budgets or {})}
+        # seconds between condition checks
+        self.poll_frequency = poll_frequency
+        # step -> wait latency histogram (cached so waits skip the registry lock)
+        self.histograms = {}
+        # step -> number of waits that ran out of budget
+        self.timeouts = {}
+
+    def budget(self, step:str, kind:str='default') -> float:
+        """
+        Purpose - Gets the timeout budget of a step
+
+        Param - step: Name of the wait step
+
+        Param - kind: Kind of wait whose budget is used if the step has none
+        """
+        return self.budgets.get(step, self.budgets.get(kind, self.budgets['default']))
+
+    def until(self, driver:object, condition:object, step:str='default', timer:float=None, kind:str='default', required:bool=False) -> object:
+        """
+        Purpose - Waits until a condition returns a truthy value, returns that value or False if the budget ran out (raises WaitTimeout instead if the wait is required)
+
+        Param - driver: The web driver or web element the condition is checked against
+
+        Param - condition: Callable that takes the driver and returns a truthy value when the wait is over
+
+        Param - step: Name of the wait step (picks the budget and the histogram)
+
+        Param - timer: Timeout that overrides the step budget
+
+        Param - kind: Kind of wait whose budget is used if the step has none
+
+        Param - required: Raise WaitTimeout if the budget runs out (the caller can not go on without the result)
+        """
+        start = time.perf_counter()
+        timeout = self.budget(step, kind) if timer is None else timer
+        try:
+            return WebDriverWait(driver, timeout, poll_frequency=self.poll_frequency).until(condition)
+        # handle timeout
+        except TimeoutException:
+            self.timeouts[step] = self.timeouts.get(step, 0) + 1
+            if required:
+                raise WaitTimeout(f'Wait for {step} ran out after {timeout:.2f}s')
+            return False
+        # record how long the wait actually took
+        finally:
+            self.record(step, time.perf_counter() - start)
+
+    def record(self, step:str, seconds:float) -> None:
+        """
+        Purpose - Records the duration of a wait
+
+        Param - step: Name of the wait step
+
+        Param - seconds: How long the wait took
+        """
+        histogram = self.histograms.get(step)
+        if histogram is None:
+            histogram = self.histograms[step] = METRICS.histogram('adafruit_wait_seconds', 'Time spent in condition waits', step=step)
+        histogram.observe(seconds)
+
+    def summary(self) -> dict:
+        """
+        Purpose - Gets {step: (waits, mean ms, timeouts)} of every step waited on
+        """
+        return {step: (histogram.count, histogram.mean * 1000, self.timeouts.get(step, 0)) for step, histogram in self.histograms.items()}
+
+
+class ChangeDetector:
+    """
+    Purpose - Fingerprints a block of markup per page so polls of a page that has not changed since it last showed nothing in stock can skip parsing
+    """
+    def __init__(self) -> None:
+        # page -> (fingerprint, observations) of the last poll that had nothing in stock
+        self.settled = {}
+        # polls checked and polls that were unchanged
+        self.checks = 0
+        self.hits = 0
+        # metrics kept here so the hot loop skips the registry
+        self.hit_counter = METRICS.counter('adafruit_unchanged_polls_total', 'Polls skipped because the product block was unchanged')
+        self.hit_rate_gauge = METRICS.gauge('adafruit_unchanged_poll_ratio', 'Share of polls skipped because the product block was unchanged')
+
+    @staticmethod
+    def fingerprint(html:str) -> str:
+        """
+        Purpose - Hashes serialized markup, None if there is none
+
+        Param - html: The serialized markup
+        """
+        return hashlib.blake2b(html.encode(), digest_size=16).hexdigest() if html is not None else None
+
+    def check(self, page:str, fingerprint:str) -> list:
+        """
+        Purpose - Returns the observations of the last poll of the page if its markup is unchanged and nothing was in stock, None if it has to be parsed
+
+        Param - page: The page url
+
+        Param - fingerprint: Fingerprint of the block this poll
+        """
+        self.checks += 1
+        settled = self.settled.get(page)
+        hit = fingerprint is not None and settled is not None and settled[0] == fingerprint
+        if hit:
+            self.hits += 1
+            self.hit_counter.inc()
+        self.hit_rate_gauge.set(self.hit_rate)
+        return settled[1] if hit else None
+
+    def settle(self, page:str, fingerprint:str, observations:list, in_stock:bool) -> None:
+        """
+        Purpose - Remembers a parsed poll, only polls with nothing in stock can be skipped later
+
+        Param - page: The page url
+
+        Param - fingerprint: Fingerprint of the block this poll
+
+        Param - observations: What the poll saw as (variant, in stock) pairs
+
+        Param - in_stock: If a valid variant was in stock
+        """
+        if fingerprint is None or in_stock:
+            self.settled.pop(page, None)
+        else:
+            self.settled[page] = (fingerprint, observations)
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Purpose - Gets the share of checked polls that were unchanged
+        """
+        return self.hits / self.checks if self.checks else 0.0
+
 
 class ParserManager:
     """
     Purpose - A web parser object that uses selenium to guide certain web element behaviors
     """
-    def __init__(self, os_type:str, driver_path:str, product_url:str, options=[]) -> None:
+    def __init__(self, os_type:str, driver_path:str, product_url:str, options=[], pool_size:int=0, pool_memory_mb:int=None, wait_budgets:dict=None, wait_poll:float=WAIT_POLL, lean:bool=False, blocked_urls:list=None) -> None:
         # os type windows linux etc
         self.os_type = os_type
         # driver path
@@ -27,10 +265,205 @@ class ParserManager:
         self.product_url = product_url
         # add options
         [self.add_option(option) for option in options]
+        # lean profile that skips everything but the page itself
+        self.lean = lean
+        self.blocked_urls = LEAN_BLOCKED_URLS if blocked_urls is None else blocked_urls
+        if self.lean:
+            self.apply_lean_profile()
+        # number of webdriver commands sent since the last reset
+        self.command_count = 0
+        # records commands and page snapshots of the driver in front when set
+        self.recorder = None
+        # timeout budgets and polling of every wait
+        self.wait_policy = WaitPolicy(wait_budgets, wait_poll)
+        # number of warm spare drivers to keep and the memory cap (MB) of all drivers together
+        self.pool_size = pool_size
+        self.pool_memory_mb = pool_memory_mb
+        # warm spare drivers already on the product page
+        self.spare_drivers = []
+        self.pool_lock = threading.Lock()
+        self.pool_thread = None
+        # tab name -> (window handle, link) of tabs that are not in front and the name of the tab in front
+        self.tabs = {}
+        self.tab = 'main'
         # web driver
-        self.driver = webdriver.Chrome(convert_path_os('/usr/lib/chromium-browser/chromedriver'),options=OPTIONS) if self.os_type == 'linux' else webdriver.Chrome(convert_path_os(self.driver_path),options=OPTIONS)
+        self.driver = self.create_driver()
         # set web driver to product link
         self.set_page(self.product_url)
+        # start warming spare drivers
+        self.fill_pool()
+
+
+    """ ------------------------------------------ Driver Methods ------------------------------------------------ """
+    def create_driver(self) -> webdriver.Chrome:
+        """
+        Purpose - Launches a new chrome web driver that counts the commands it sends
+        """
+        # launch driver
+        driver = webdriver.Chrome(convert_path_os('/usr/lib/chromium-browser/chromedriver'),options=OPTIONS) if self.os_type == 'linux' else webdriver.Chrome(convert_path_os(self.driver_path),options=OPTIONS)
+        # block unneeded requests before the first page load
+        if self.lean and self.blocked_urls:
+            self.block_urls(driver, self.blocked_urls)
+        # every command (including web element commands) goes through driver.execute
+        execute = driver.execute
+        def counted_execute(driver_command:str, params:dict=None) -> dict:
+            # spare drivers warming up are not part of the poll or the recorded session
+            if driver is not self.driver:
+                return execute(driver_command, params)
+            self.command_count += 1
+            if self.recorder is None:
+                return execute(driver_command, params)
+            return self.record_command(execute, driver_command, params)
+        driver.execute = counted_execute
+        return driver
+
+    def apply_lean_profile(self) -> None:
+        """
+        Purpose - Sets the options of the lean profile (eager page loads, no images and no background features)
+        """
+        # return once the dom is parsed instead of waiting for every subresource
+        OPTIONS.page_load_strategy = 'eager'
+        [self.add_option(argument) for argument in LEAN_ARGUMENTS if argument not in OPTIONS.arguments]
+        OPTIONS.add_experimental_option('prefs', {**OPTIONS.experimental_options.get('prefs', {}), **LEAN_PREFS})
+
+    def block_urls(self, driver:webdriver.Chrome, url_patterns:list) -> None:
+        """
+        Purpose - Blocks requests matching url patterns through devtools (wildcards are allowed)
+
+        Param - driver: The web driver
+
+        Param - url_patterns: Url patterns to block
+        """
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls':url_patterns})
+
+    def get_driver_rss(self, driver:webdriver.Chrome) -> int:
+        """
+        Purpose - Gets the memory of a driver (chromedriver and every chrome process it started) in bytes, 0 if unknown
+
+        Param - driver: The web driver
+        """
+        try:
+            return get_process_tree_rss(driver.service.process.pid)
+        except AttributeError:
+            return 0
+
+    def get_pool_rss(self) -> int:
+        """
+        Purpose - Gets the memory of the active driver and every spare driver in bytes
+        """
+        with self.pool_lock:
+            drivers = [self.driver] + self.spare_drivers
+        return sum(self.get_driver_rss(driver) for driver in drivers)
+
+    def fill_pool(self) -> None:
+        """
+        Purpose - Starts warming spare drivers on a background thread until the pool is full or the memory cap is hit
+        """
+        # pool disabled or already filling
+        if not self.pool_size or (self.pool_thread and self.pool_thread.is_alive()):
+            return
+        self.pool_thread = threading.Thread(target=self.warm_spares, daemon=True)
+        self.pool_thread.start()
+
+    def warm_spares(self) -> None:
+        """
+        Purpose - Launches spare drivers and loads the product page in them (runs on the pool thread)
+        """
+        while len(self.spare_drivers) < self.pool_size:
+            # stop if another driver would go over the memory cap (estimated from the active driver)
+            if self.pool_memory_mb:
+                pool_rss = self.get_pool_rss()
+                if pool_rss + self.get_driver_rss(self.driver) > self.pool_memory_mb * 1024 * 1024:
+                    print(f'\nDriver pool memory cap reached ({pool_rss // (1024 * 1024)} MB), not warming more spares.')
+                    return
+            # launch and pre navigate spare
+            try:
+                driver = self.create_driver()
+                driver.get(self.product_url)
+            # a failed spare is not fatal, the next reset will launch synchronously
+            except Exception as e:
+                print(f'\nCould not warm spare driver: {e}')
+                return
+            with self.pool_lock:
+                self.spare_drivers.append(driver)
+
+    def take_spare(self) -> webdriver.Chrome:
+        """
+        Purpose - Takes a warm spare driver from the pool, returns None if the pool is empty
+        """
+        with self.pool_lock:
+            return self.spare_drivers.pop(0) if self.spare_drivers else None
+
+    def quit(self) -> None:
+        """
+        Purpose - Quits the active driver and every spare driver
+        """
+        # stop warming
+        self.pool_size = 0
+        # finish the recorded session
+        self.stop_recording()
+        with self.pool_lock:
+            drivers, self.spare_drivers = [self.driver] + self.spare_drivers, []
+        for driver in drivers:
+            driver.quit()
+
+    def start_recording(self, path:str) -> SnapshotManager:
+        """
+        Purpose - Starts recording every command of the driver in front and a snapshot of every page they lead to
+
+        Param - path: Directory of the recording
+        """
+        recorder = SnapshotManager(path)
+        # page the driver is on now
+        url, ready_state, html = self.driver.execute_script(SNAPSHOT_SCRIPT)
+        entry = recorder.record('start', {}, 0.0)
+        recorder.snapshot(entry, 'start', url, ready_state, html)
+        recorder.write(entry)
+        self.recorder = recorder
+        return recorder
+
+    def stop_recording(self) -> None:
+        """
+        Purpose - Stops recording and closes the command log
+        """
+        recorder, self.recorder = self.recorder, None
+        if recorder:
+            recorder.close()
+
+    def record_command(self, execute:object, driver_command:str, params:dict) -> dict:
+        """
+        Purpose - Runs and records a command, snapshots the page if the command changed it (the snapshot is read with the raw execute so it is not counted or timed)
+
+        Param - execute: The execute of the driver before it was wrapped
+
+        Param - driver_command: Name of the webdriver command
+
+        Param - params: Parameters of the command
+        """
+        recorder = self.recorder
+        start = time.perf_counter()
+        try:
+            response = execute(driver_command, params)
+        except Exception as e:
+            recorder.write(recorder.record(driver_command, params, time.perf_counter() - start, e))
+            raise
+        entry = recorder.record(driver_command, params, time.perf_counter() - start)
+        if recorder.needs_snapshot(driver_command):
+            try:
+                url, ready_state, html = execute('w3cExecuteScript', {'script':SNAPSHOT_SCRIPT, 'args':[]})['value']
+                recorder.snapshot(entry, driver_command, url, ready_state, html)
+            # closed window or a page in the middle of navigating
+            except Exception as e:
+                entry['snapshot_error'] = type(e).__name__
+        recorder.write(entry)
+        return response
+
+    def reset_command_count(self) -> None:
+        """
+        Purpose - Resets the webdriver command counter
+        """
+        self.command_count = 0
 
 
     """ ------------------------------------------ General Methods ------------------------------------------------ """
@@ -49,12 +482,62 @@ class ParserManager:
         """
         # hard reset prompt
         print('\nReseting......')
-        # dispose driver
-        self.driver.quit()
-        # reassign driver
-        self.driver = webdriver.Chrome(convert_path_os('/usr/lib/chromium-browser/chromedriver'),options=OPTIONS) if self.os_type == 'linux' else webdriver.Chrome(convert_path_os(self.driver_path),options=OPTIONS)
-        # set web driver to product link
-        self.set_page(self.product_url)
+        METRICS.counter('adafruit_resets_total', 'Driver hard resets').inc()
+        self.swap_driver()
+
+    def swap_driver(self) -> None:
+        """
+        Purpose - Replaces the driver with a warm spare (or a new driver) on the product page and disposes the old one
+        """
+        # dispose driver in the background
+        threading.Thread(target=self.driver.quit, daemon=True).start()
+        # the new driver only has the product tab
+        self.tabs, self.tab = {}, 'main'
+        # swap in a warm spare that is already on the product page
+        spare = self.take_spare()
+        if spare:
+            self.driver = spare
+            self.link = self.product_url
+        # if no spare is ready launch a driver now
+        else:
+            # reassign driver
+            self.driver = self.create_driver()
+            # set web driver to product link
+            self.set_page(self.product_url)
+        # replace the spare in the background
+        self.fill_pool()
+
+    def recycle(self) -> bool:
+        """
+        Purpose - Replaces the driver with a fresh one and carries every cookie over so the session survives, returns true if the cookies were carried over
+        """
+        # cookies of every domain and the page the old driver was on
+        try:
+            cookies = self.driver.execute_cdp_cmd('Network.getAllCookies', {})['cookies']
+        except WebDriverException as e:
+            print(f'Could not read cookies before recycling: {e}')
+            cookies = []
+        link = self.link
+        self.swap_driver()
+        # set every cookie at once and reload the page with them
+        carried = False
+        if cookies:
+            try:
+                self.driver.execute_cdp_cmd('Network.setCookies', {'cookies':cookies})
+                carried = True
+            except WebDriverException as e:
+                print(f'Could not carry cookies over: {e}')
+        self.set_page(link)
+        return carried
+
+    def get_driver_pid(self) -> int:
+        """
+        Purpose - Gets the process id of chromedriver, None if unknown
+        """
+        try:
+            return self.driver.service.process.pid
+        except AttributeError:
+            return None
 
 
     def refresh_page(self) -> None:
@@ -63,6 +546,57 @@ class ParserManager:
         """
         self.driver.get(self.link)
 
+    def open_tab(self, name:str, new_link:str) -> None:
+        """
+        Purpose - Opens a new tab in front and sets its html site
+
+        Param - name: Name the tab is switched to by
+
+        Param - new_link: The link the tab will be set to
+        """
+        # keep the tab that was in front
+        self.tabs[self.tab] = (self.driver.current_window_handle, self.link)
+        self.driver.switch_to.new_window('tab')
+        self.tab = name
+        self.set_page(new_link)
+
+    def switch_tab(self, name:str) -> bool:
+        """
+        Purpose - Brings a tab to the front, returns false if there is no tab with that name
+
+        Param - name: Name of the tab
+        """
+        if name == self.tab:
+            return True
+        if name not in self.tabs:
+            return False
+        # keep the tab that was in front
+        self.tabs[self.tab] = (self.driver.current_window_handle, self.link)
+        handle, self.link = self.tabs.pop(name)
+        self.driver.switch_to.window(handle)
+        self.tab = name
+        return True
+
+    def close_tabs(self) -> None:
+        """
+        Purpose - Closes every tab but the main tab and brings the main tab to the front
+        """
+        self.switch_tab('main')
+        main_handle = self.driver.current_window_handle
+        for handle, link in self.tabs.values():
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+        self.tabs = {}
+        self.driver.switch_to.window(main_handle)
+
+    def has_tab(self, name:str) -> bool:
+        """
+        Purpose - Returns true if a tab with that name is open
+
+        Param - name: Name of the tab
+        """
+        return name == self.tab or name in self.tabs
+
     def add_option(self,option=str) -> None:
         """
         Purpose - Adds an arguement to the option object
@@ -131,7 +665,7 @@ class ParserManager:
 
 
     """ ------------------------------------------ Wait Methods ------------------------------------------------ """
-    def wait_for_element(self, search_type:str, search_str:str, element=None, timer:int=7) -> webelement:
+    def wait_for_element(self, search_type:str, search_str:str, element=None, timer:float=None, step:str='element', required:bool=False) -> webelement:
         """
         Purpose - Waits until an element is available
 
@@ -141,21 +675,17 @@ class ParserManager:
 
         Param - element: The element that is used to search for another element (acts as driver)
 
-        Param - timer: The amount of time the driver will wait for an element
+        Param - timer: The amount of time the driver will wait for an element (defaults to the step budget)
+
+        Param - step: Name of the wait step used for its budget and timing
+
+        Param - required: Raise WaitTimeout instead of returning False if the element does not show up
         """
-        try:
-            # if search locator is an element and not the driver
-            if element:
-                return WebDriverWait(element, timer).until(EC.presence_of_element_located((search_type, search_str)))
-            # if search locator is the driver and not an element
-            else:
-                return WebDriverWait(self.driver, timer).until(EC.presence_of_element_located((search_type, search_str)))
-        # handle timeout 
-        except TimeoutException as e:
-            return False
+        # search from the element if one is given otherwise from the driver
+        return self.wait_policy.until(element if element else self.driver, EC.presence_of_element_located((search_type, search_str)), step, timer, 'element', required)
 
 
-    def wait_for_elements(self, search_type:str, search_str:str, element=None, timer:int=7) -> webelement:
+    def wait_for_elements(self, search_type:str, search_str:str, element=None, timer:float=None, step:str='element', required:bool=False) -> webelement:
         """
         Purpose - Waits until an element is available
 
@@ -165,18 +695,70 @@ class ParserManager:
 
         Param - element: The element that is used to search for another element (acts as driver)
 
-        Param - timer: The amount of time the driver will wait for an element
+        Param - timer: The amount of time the driver will wait for an element (defaults to the step budget)
+
+        Param - step: Name of the wait step used for its budget and timing
+
+        Param - required: Raise WaitTimeout instead of returning False if no element shows up
         """
-        try:
-            # if search locator is an element and not the driver
-            if element:
-                return WebDriverWait(element, timer).until(EC.presence_of_all_elements_located((search_type, search_str)))
-            # if search locator is the driver and not an element
-            else:
-                return WebDriverWait(self.driver, timer).until(EC.presence_of_all_elements_located((search_type, search_str)))
-        # handle timeout and "The custom error module does not recognize this error."
-        except TimeoutException as e:
+        # search from the element if one is given otherwise from the driver
+        return self.wait_policy.until(element if element else self.driver, EC.presence_of_all_elements_located((search_type, search_str)), step, timer, 'element', required)
+
+    def wait_for_interactable(self, element:webelement, timer:float=None, step:str='field') -> webelement:
+        """
+        Purpose - Waits until an element is visible and enabled
+
+        Param - element: The web element
+
+        Param - timer: The amount of time the driver will wait (defaults to the step budget)
+
+        Param - step: Name of the wait step used for its budget and timing
+        """
+        return self.wait_policy.until(self.driver, EC.element_to_be_clickable(element), step, timer, 'field')
+
+    def wait_for_stale(self, element:webelement, timer:float=None, step:str='navigation') -> bool:
+        """
+        Purpose - Waits until an element is detached from the page (the page it was on has been left)
+
+        Param - element: The web element
+
+        Param - timer: The amount of time the driver will wait (defaults to the step budget)
+
+        Param - step: Name of the wait step used for its budget and timing
+        """
+        return self.wait_policy.until(self.driver, EC.staleness_of(element), step, timer, 'navigation')
+
+    def wait_for_absent(self, search_type:str, search_str:str, timer:float=None, step:str='navigation') -> bool:
+        """
+        Purpose - Waits until no element matches a locator
+
+        Param - search_type: The locator that is used to search for element
+
+        Param - search_str: The string that is used to search for element
+
+        Param - timer: The amount of time the driver will wait (defaults to the step budget)
+
+        Param - step: Name of the wait step used for its budget and timing
+        """
+        return self.wait_policy.until(self.driver, lambda driver: not driver.find_elements(search_type, search_str), step, timer, 'navigation')
+
+
+    def wait_for_any(self, locators:dict, timer:float=None, step:str='navigation') -> str:
+        """
+        Purpose - Waits until any of several elements is present and returns the name of the first one found, False if none showed up
+
+        Param - locators: A dict of name -> (locator, search string)
+
+        Param - timer: The amount of time the driver will wait (defaults to the step budget)
+
+        Param - step: Name of the wait step used for its budget and timing
+        """
+        def find_any(driver:webdriver.Chrome) -> str:
+            for name, (search_type, search_str) in locators.items():
+                if driver.find_elements(search_type, search_str):
+                    return name
             return False
+        return self.wait_policy.until(self.driver, find_any, step, timer, 'navigation')
 
 
     """ ------------------------------------------ Click Methods ------------------------------------------------ """
@@ -189,8 +771,6 @@ class ParserManager:
         try:
             # click element
             element.click()
-            # wait
-            self.driver.implicitly_wait(5)
             # return true
             return True
         except ElementNotInteractableException as e:
@@ -214,8 +794,6 @@ class ParserManager:
             for element in element_list:
                 # click element
                 element.click()
-                # wait
-                self.driver.implicitly_wait(5)
             # return true
             return True
         except ElementNotInteractableException as e:
@@ -230,53 +808,139 @@ class ParserManager:
             return False
 
 
+    def click_and_wait(self, element:webelement, step:str='navigation') -> bool:
+        """
+        Purpose - Clicks an element that leaves the page and waits for the page to go stale, returns false if the click failed
+
+        Param - element: The web element to be clicked
+
+        Param - step: Name of the wait step used for its budget and timing
+        """
+        if not self.click_element(element):
+            return False
+        # the next lookup would otherwise find the same element on the old page
+        self.wait_for_stale(element, step=step)
+        return True
+
+
+    """ ------------------------------------------ Script Methods ------------------------------------------------ """
+    def scan_options(self, block_id:str, option_class:str, name_class:str, meta_class:str) -> list:
+        """
+        Purpose - Reads every option in a block with a single script call, returns a list of (element, name, meta) tuples or None if the block is not on the page
+
+        Param - block_id: The id of the element that holds the options
+
+        Param - option_class: The class name of each option element
+
+        Param - name_class: The class name of the option name element
+
+        Param - meta_class: The class name of the option meta element
+        """
+        options = self.driver.execute_script(SCAN_OPTIONS_SCRIPT, block_id, option_class, name_class, meta_class)
+        # block is not on the page
+        if options is None:
+            return None
+        return [(element, name.lower().strip() if name is not None else None, meta.lower().strip() if meta is not None else None) for element, name, meta in options]
+
+    def get_outer_html(self, element_id:str) -> str:
+        """
+        Purpose - Gets the serialized markup of an element in one round trip, None if it is not on the page
+
+        Param - element_id: The id of the element
+        """
+        return self.driver.execute_script("var element = document.getElementById(arguments[0]); return element ? element.outerHTML : null;", element_id)
+
+    def get_body_text(self) -> str:
+        """
+        Purpose - Gets the visible text of the page body in one round trip (empty for a black screen)
+        """
+        return self.driver.execute_script("return document.body ? document.body.innerText : '';") or ''
+
+
     """ ------------------------------------------ Other Methods ------------------------------------------------ """
-    def xpath_dict_itr(self,xpath_dict:dict,corresponding_dict:dict={}) -> bool:
+    def xpath_dict_itr(self,xpath_dict:dict,corresponding_dict:dict={},batch:bool=False,keystroke_fields:list=[]) -> bool:
         """
         Purpose - Iterate through a dict of web element to interact consecutively, return false if the element was not available or wasnt used
 
         Param - xpath_dict: A dict of web elements to parse
 
         Param - corresponding_dict (Optional): A dict that has information for field values (rare use case).
+
+        Param - batch (Optional): Fills consecutive fields that have values with one script call instead of typing into each
+
+        Param - keystroke_fields (Optional): Keys of fields that always get real keystrokes when batching
         """
-        # element
-        ele = None
+        keys = list(xpath_dict)
+        index = 0
         # iterate through xpath dict
-        for key in xpath_dict:
-            # attempt to send keys / click elements
-            try:
-                # get element
-                ele = self.wait_for_element(By.XPATH,xpath_dict[key])
-                # if element is located
-                if ele:
-                    # check if element has a tag that allows input
-                    if ele.tag_name in ['input','select'] and ele.get_attribute('type') in ['tel', 'email','text','select-one','password']:
-                        # wait for autocomplete
-                        time.sleep(.05)
-                        # make sure element is clear of text before inputing
-                        if ele.get_attribute('type') not in ['select-one']:
-                            ele.clear()
-                        # send info
-                        ele.send_keys(corresponding_dict[key])
-                    # check if element has send keys method
-                    elif ele.tag_name in ['button','span'] or ele.get_attribute('type') in ['radio','submit']:
-                        # click element
-                        self.click_element(ele)
-                    # if element was not used
-                    else:
-                        print('Element not avaliable')
-                        return False
-                else:
-                    # if element equals false
-                    print('Warning element was not used - False.')
+        while index < len(keys):
+            # run of consecutive fields that can be filled in one script call
+            if batch and keys[index] in corresponding_dict and keys[index] not in keystroke_fields:
+                fields = {}
+                while index < len(keys) and keys[index] in corresponding_dict and keys[index] not in keystroke_fields:
+                    fields[keys[index]] = (xpath_dict[keys[index]], corresponding_dict[keys[index]])
+                    index += 1
+                if not self.fill_fields(fields):
                     return False
-            # except any exception and print            
-            except Exception as e:
-                raise(e)
-
+            # send keys / click element
+            else:
+                if not self.use_element(xpath_dict[keys[index]], corresponding_dict.get(keys[index])):
+                    return False
+                index += 1
         # if no errors and all elements were used
         return True
 
+    def use_element(self, xpath:str, value:str=None) -> bool:
+        """
+        Purpose - Types a value into a field or clicks an element, return false if the element was not available or wasnt used
 
+        Param - xpath: The xpath of the element
 
+        Param - value: The value typed into a field
+        """
+        # get element
+        ele = self.wait_for_element(By.XPATH,xpath)
+        # if element equals false
+        if not ele:
+            print('Warning element was not used - False.')
+            return False
+        # check if element has a tag that allows input
+        if ele.tag_name in ['input','select'] and ele.get_attribute('type') in ['tel', 'email','text','select-one','password']:
+            # field without a value
+            if value is None:
+                raise KeyError(xpath)
+            # wait until the field can take input
+            self.wait_for_interactable(ele)
+            # make sure element is clear of text before inputing
+            if ele.get_attribute('type') not in ['select-one']:
+                ele.clear()
+            # send info
+            ele.send_keys(value)
+        # check if element has send keys method
+        elif ele.tag_name in ['button','span'] or ele.get_attribute('type') in ['radio','submit']:
+            # click element
+            self.click_element(ele)
+        # if element was not used
+        else:
+            print('Element not avaliable')
+            return False
+        return True
+
+    def fill_fields(self, fields:dict) -> bool:
+        """
+        Purpose - Sets the values of form fields in one script call and types into only the fields the script could not set, return false if a field was not available
 
+        Param - fields: A dict of field key -> (xpath, value)
+        """
+        # wait for the first field so the form has loaded
+        first_xpath = next(iter(fields.values()))[0]
+        if not self.wait_for_element(By.XPATH,first_xpath,step='form'):
+            print('Warning element was not used - False.')
+            return False
+        # set every value and get the keys that did not take
+        failed = self.driver.execute_script(FILL_FIELDS_SCRIPT, [[key, xpath, str(value)] for key, (xpath, value) in fields.items()])
+        # fall back to keystrokes for those
+        for key in failed:
+            if not self.use_element(fields[key][0], str(fields[key][1])):
+                return False
+        return True
@@ -0,0 +1,244 @@
+# local imports
+from lib.funcs import *
+from lib.config import config
+from lib.web_funcs.ada_fruit_manager import AdaFruitManager, get_watch_list
+from lib.web_funcs.watch_manager import WatchManager
+from lib.web_funcs.login_manager import LoginError
+from lib.bot_funcs.scheduler_manager import SchedulerManager
+from lib.bot_funcs.history_manager import HistoryManager
+from lib.bot_funcs.config_manager import ConfigManager
+# other imports
+import multiprocessing, queue, time, traceback
+
+
+# spawn workers so they never inherit the parent's threads or connections
+CONTEXT = multiprocessing.get_context('spawn')
+
+
+class RaceCoordinator:
+    """
+    Purpose - Process safe purchase coordinator that enforces per account and global purchase limits
+    """
+    def __init__(self, account_names:list, account_limit:int=1, global_limit:int=1) -> None:
+        # account name -> index into the shared counters
+        self.account_names = list(account_names)
+        # limits (None is unlimited)
+        self.account_limit = account_limit
+        self.global_limit = global_limit
+        # shared counters of reserved (submitting) and committed (purchased) orders per account
+        self.lock = CONTEXT.Lock()
+        self.reserved = CONTEXT.Array('i', len(self.account_names), lock=False)
+        self.purchased = CONTEXT.Array('i', len(self.account_names), lock=False)
+
+    def eligible(self, account_name:str) -> bool:
+        """
+        Purpose - Returns true if the account could still make a purchase
+
+        Param - account_name: Name of the account
+        """
+        index = self.account_names.index(account_name)
+        with self.lock:
+            return self.under_limits(index)
+
+    def under_limits(self, index:int) -> bool:
+        """
+        Purpose - Returns true if one more order on the account stays within both limits (lock must be held)
+
+        Param - index: Index of the account
+        """
+        account_total = self.reserved[index] + self.purchased[index]
+        global_total = sum(self.reserved) + sum(self.purchased)
+        return (self.account_limit is None or account_total < self.account_limit) and (self.global_limit is None or global_total < self.global_limit)
+
+    def reserve(self, account_name:str) -> bool:
+        """
+        Purpose - Reserves an order for an account right before it submits, returns false if a limit would be exceeded
+
+        Param - account_name: Name of the account
+        """
+        index = self.account_names.index(account_name)
+        with self.lock:
+            if not self.under_limits(index):
+                return False
+            self.reserved[index] += 1
+            return True
+
+    def commit(self, account_name:str) -> None:
+        """
+        Purpose - Turns a reservation into a purchase
+
+        Param - account_name: Name of the account
+        """
+        index = self.account_names.index(account_name)
+        with self.lock:
+            self.reserved[index] -= 1
+            self.purchased[index] += 1
+
+    def release(self, account_name:str) -> None:
+        """
+        Purpose - Gives back a reservation after a failed submit
+
+        Param - account_name: Name of the account
+        """
+        index = self.account_names.index(account_name)
+        with self.lock:
+            self.reserved[index] -= 1
+
+    @property
+    def limit_reached(self) -> bool:
+        """
+        Purpose - Returns true if no account can make another purchase
+        """
+        with self.lock:
+            return not any(self.under_limits(index) for index in range(len(self.account_names)))
+
+
+def race_worker(account_name:str, os_type:str, testing_state:bool, coordinator:RaceCoordinator, stock_event:object, target:object, results:object) -> None:
+    """
+    Purpose - Worker process for one account, stays signed in and races to checkout every time the stock event is set
+
+    Param - account_name: Name of the account this worker buys with
+
+    Param - os_type: Os type windows linux etc
+
+    Param - testing_state: If the program is in testing state
+
+    Param - coordinator: The shared purchase coordinator
+
+    Param - stock_event: Event set by the parent when stock appears
+
+    Param - target: Shared dict with the round id, url and variants of the product with stock
+
+    Param - results: Queue the worker reports (round id, account name, purchased, error) to
+    """
+    # browser pinned to this account
+    ada_fruit_manager = AdaFruitManager(os_type, testing_state, account_name=account_name)
+    ada_fruit_manager.coordinator = coordinator
+    # race until the account can not buy anymore
+    while coordinator.eligible(account_name):
+        # round this worker is racing in (None while waiting for stock)
+        round_id = None
+        try:
+            # be signed in with an empty cart before stock appears
+            ada_fruit_manager.sign_in()
+            ada_fruit_manager.clear_cart()
+            # enter the address ahead of time
+            if ada_fruit_manager.prestage:
+                ada_fruit_manager.prestage_checkout()
+            # wait for stock (time out now and then to keep the session fresh)
+            if not stock_event.wait(timeout=60):
+                # recycle the browser if it grew too big or refresh
+                if not ada_fruit_manager.recycle_if_due():
+                    ada_fruit_manager.parser.refresh_page()
+                continue
+            # race to checkout
+            round_id = target['round']
+            purchased = ada_fruit_manager.race_purchase(target['url'], target['variants'])
+            results.put((round_id, account_name, purchased, None))
+        # report errors of a round to the parent (errors between rounds stay here) and keep racing
+        except Exception as e:
+            error = f'{type(e)}\n{e}\n{traceback.format_exc()}'
+            if round_id is not None:
+                results.put((round_id, account_name, False, error))
+            else:
+                print(f'\nWorker for {account_name} failed between rounds:\n{error}')
+            # a failed sign in already retried in the same browser
+            if not isinstance(e, LoginError):
+                ada_fruit_manager.parser.hard_reset()
+            ada_fruit_manager.logged_in = False
+        # wait for the round to end
+        while stock_event.is_set():
+            time.sleep(.05)
+    # done prompt
+    print(f'\n{account_name} reached its purchase limit.')
+    ada_fruit_manager.parser.quit()
+
+
+class RaceManager:
+    """
+    Purpose - Runs one browser worker process per account and has every eligible worker race to checkout when stock appears
+    """
+    def __init__(self, os_type:str, testing_state:bool, account_names:list=None) -> None:
+        # os type windows linux etc
+        self.os_type = os_type
+        # determines if program is in testing state
+        self.testing_state = testing_state
+        # validated config (an invalid config raises before any worker starts)
+        self.config_manager = ConfigManager(config)
+        # accounts to race with
+        self.account_names = account_names if account_names else list(config['ada_fruit_accounts'].keys())
+        # purchase limits
+        race_config = config.get('race', {})
+        self.coordinator = RaceCoordinator(self.account_names, race_config.get('account_limit', 1), race_config.get('global_limit', 1))
+        # seconds to wait for the workers to report after stock appears
+        self.round_timeout = race_config.get('round_timeout', 120)
+        # paces polls and backs off while throttled
+        self.scheduler = SchedulerManager.from_config(self.config_manager.scheduler.as_dict())
+        # shared state between parent and workers
+        self.sync_manager = CONTEXT.Manager()
+        self.target = self.sync_manager.dict()
+        self.stock_event = CONTEXT.Event()
+        self.results = CONTEXT.Queue()
+        # id of the current round (workers tag their results with it)
+        self.round_id = 0
+        # worker processes
+        self.workers = {}
+        # http stock poller in the parent
+        self.watch_manager = WatchManager(get_watch_list(self.testing_state), history=HistoryManager())
+        # start workers
+        [self.start_worker(account_name) for account_name in self.account_names]
+
+    def start_worker(self, account_name:str) -> None:
+        """
+        Purpose - Starts the worker process of an account
+
+        Param - account_name: Name of the account
+        """
+        worker = CONTEXT.Process(target=race_worker, args=(account_name, self.os_type, self.testing_state, self.coordinator, self.stock_event, self.target, self.results), name=f'race-{account_name}', daemon=True)
+        worker.start()
+        self.workers[account_name] = worker
+
+    def race(self) -> list:
+        """
+        Purpose - Waits for stock, lets every eligible worker race to checkout and returns the names of the accounts that purchased
+        """
+        # nothing left to buy
+        if self.coordinator.limit_reached:
+            print('\nEvery account has reached its purchase limit.')
+            time.sleep(self.scheduler.next_interval())
+            return []
+        # restart workers that died
+        for account_name, worker in list(self.workers.items()):
+            if not worker.is_alive() and self.coordinator.eligible(account_name):
+                print(f'\nRestarting worker for {account_name}......')
+                self.start_worker(account_name)
+        # wait for stock
+        entry, in_stock = self.watch_manager.wait_for_stock(self.scheduler)
+        if not entry:
+            return []
+        # start the race (results of an earlier round that timed out are dropped by its id)
+        self.round_id += 1
+        self.target.update({'round':self.round_id, 'url':entry.url, 'variants':entry.variants})
+        racing = [account_name for account_name, worker in self.workers.items() if worker.is_alive() and self.coordinator.eligible(account_name)]
+        self.stock_event.set()
+        # collect results from the racing workers
+        purchased, deadline = [], time.monotonic() + self.round_timeout
+        try:
+            waiting = set(racing)
+            while waiting:
+                round_id, account_name, account_purchased, error = self.results.get(timeout=max(0.0, deadline - time.monotonic()))
+                # late result of an earlier round
+                if round_id != self.round_id or account_name not in waiting:
+                    continue
+                waiting.discard(account_name)
+                if error:
+                    print(f'\nWorker for {account_name} failed:\n{error}')
+                if account_purchased:
+                    purchased.append(account_name)
+                    self.watch_manager.record_purchase(entry)
+        except queue.Empty:
+            print('\nNot every worker reported before the round timed out.')
+        # end the round
+        finally:
+            self.stock_event.clear()
+        return purchased
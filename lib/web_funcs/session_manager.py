@@ -0,0 +1,115 @@
+# local imports
+from lib.funcs import *
+from lib.web_funcs.parser_manager import ParserManager
+# selenium imports
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
+# other imports
+import json, time
+
+
+# saved sessions
+SESSION_PATH = convert_path_os('data/sessions/')
+# cookie fields accepted by Network.setCookies
+COOKIE_FIELDS = ['name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires']
+
+
+class SessionManager:
+    """
+    Purpose - Saves the cookies of a signed in browser per account and restores them into new drivers to skip sign in and OTP
+    """
+    def __init__(self, path:str=SESSION_PATH, max_age:float=7 * 24 * 60 * 60) -> None:
+        # directory of session files
+        self.path = path
+        # sessions older than this many seconds are not restored
+        self.max_age = max_age
+
+    def session_file(self, account_name:str) -> str:
+        """
+        Purpose - Gets the session file path of an account
+
+        Param - account_name: Name of the account
+        """
+        return os.path.join(self.path, f'{account_name}.json')
+
+    """ ------------------------------------------ Save Methods ------------------------------------------------ """
+    def save(self, parser:ParserManager, account_name:str) -> bool:
+        """
+        Purpose - Saves every cookie of the browser (all adafruit domains) for an account, returns false if it could not be saved
+
+        Param - parser: The parser with a signed in driver
+
+        Param - account_name: Name of the account
+        """
+        try:
+            # every cookie in the browser, not just the current domain
+            cookies = parser.driver.execute_cdp_cmd('Network.getAllCookies', {})['cookies']
+        except WebDriverException as e:
+            print(f'Could not save session: {e}')
+            return False
+        os.makedirs(self.path, exist_ok=True)
+        # only readable by the owner, the cookies are as good as a password
+        file_descriptor = os.open(self.session_file(account_name), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(file_descriptor, 'w') as f:
+            json.dump({'saved':time.time(), 'cookies':cookies}, f)
+        return True
+
+    def delete(self, account_name:str) -> None:
+        """
+        Purpose - Deletes the saved session of an account
+
+        Param - account_name: Name of the account
+        """
+        try:
+            os.remove(self.session_file(account_name))
+        except FileNotFoundError:
+            pass
+
+    """ ------------------------------------------ Restore Methods ------------------------------------------------ """
+    def load(self, account_name:str) -> list:
+        """
+        Purpose - Loads the unexpired cookies of an account, returns an empty list if there is no usable session
+
+        Param - account_name: Name of the account
+        """
+        try:
+            with open(self.session_file(account_name)) as f:
+                session = json.load(f)
+        except (OSError, ValueError):
+            return []
+        now = time.time()
+        # session too old
+        if now - session.get('saved', 0) > self.max_age:
+            return []
+        # drop expired cookies (session cookies have expires -1)
+        cookies = [cookie for cookie in session.get('cookies', []) if cookie.get('expires', -1) <= 0 or cookie['expires'] > now]
+        return [{key:cookie[key] for key in COOKIE_FIELDS if key in cookie} for cookie in cookies]
+
+    def restore(self, parser:ParserManager, account_name:str) -> bool:
+        """
+        Purpose - Restores the saved session of an account into the driver and checks that it is signed in, returns false if a full sign in is needed
+
+        Param - parser: The parser to restore the session into
+
+        Param - account_name: Name of the account
+        """
+        cookies = self.load(account_name)
+        if not cookies:
+            return False
+        try:
+            # set every cookie at once without visiting each domain
+            parser.driver.execute_cdp_cmd('Network.setCookies', {'cookies':cookies})
+            # one page load with the restored cookies
+            parser.set_page(parser.product_url)
+            # the account dropdown is only there when signed in
+            if parser.wait_for_element(By.CLASS_NAME,'account-dropdown.dropdown',step='session'):
+                return True
+            # session is no longer valid
+            print(f'\nSaved session for {account_name} has expired.')
+            parser.driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            parser.refresh_page()
+        except WebDriverException as e:
+            print(f'Could not restore session: {e}')
+        # fall back to a full sign in
+        self.delete(account_name)
+        return False
@@ -0,0 +1,189 @@
+# other imports
+from html.parser import HTMLParser
+import argparse, re
+
+
+# class of the shipping option labels
+SHIPPING_LABEL_CLASS = 'checkout-shipping-method-label'
+# reads every shipping label with its for id and text in one round trip
+SCAN_SHIPPING_SCRIPT = """
+var labels = document.getElementsByClassName(arguments[0]);
+var result = [];
+for (var i = 0; i < labels.length; i++) {
+    result.push([labels[i], labels[i].getAttribute('for'), labels[i].textContent]);
+}
+return result;
+"""
+# last dollar amount in a label
+PRICE_PATTERN = re.compile(r'\$\s*([\d,]+(?:\.\d+)?)')
+
+
+class ShippingOption:
+    """
+    Purpose - A parsed shipping option
+    """
+    __slots__ = ('label_id', 'carrier', 'price')
+
+    def __init__(self, label_id:str, carrier:str, price:float) -> None:
+        # for attribute of the label (id of the radio button)
+        self.label_id = label_id
+        # carrier and service name
+        self.carrier = carrier
+        # price in dollars (None if the label has no price)
+        self.price = price
+
+    def __repr__(self) -> str:
+        return f'ShippingOption({self.label_id!r}, {self.carrier!r}, {self.price!r})'
+
+    def __eq__(self, other:object) -> bool:
+        return isinstance(other, ShippingOption) and (self.label_id, self.carrier, self.price) == (other.label_id, other.carrier, other.price)
+
+
+def parse_label(label_id:str, text:str) -> ShippingOption:
+    """
+    Purpose - Parses the text of a shipping label like 'USPS Priority Mail (1-3 business days): $9.45'
+
+    Param - label_id: The for attribute of the label
+
+    Param - text: The label text
+    """
+    text = ' '.join(text.split())
+    # carrier is everything before the price
+    carrier, _, price_text = text.rpartition(':')
+    if not carrier:
+        carrier, price_text = text, ''
+    prices = PRICE_PATTERN.findall(price_text) or PRICE_PATTERN.findall(text)
+    if prices:
+        price = float(prices[-1].replace(',', ''))
+    # free shipping
+    elif 'free' in price_text.lower():
+        price = 0.0
+    else:
+        price = None
+    return ShippingOption(label_id or '', carrier.strip(), price)
+
+
+class ShippingLabelParser(HTMLParser):
+    """
+    Purpose - An html parser that reads the for id and text of every shipping label (for recorded checkout pages)
+    """
+    def __init__(self, label_class:str=SHIPPING_LABEL_CLASS) -> None:
+        super().__init__(convert_charrefs=True)
+        self.label_class = label_class
+        # parsed labels as [for id, text] pairs and if a label is open
+        self.labels = []
+        self.in_label = False
+
+    def handle_starttag(self, tag:str, attrs:list) -> None:
+        attrs = dict(attrs)
+        if tag == 'label' and self.label_class in (attrs.get('class') or '').split():
+            self.labels.append([attrs.get('for') or '', ''])
+            self.in_label = True
+
+    def handle_endtag(self, tag:str) -> None:
+        if tag == 'label':
+            self.in_label = False
+
+    def handle_data(self, data:str) -> None:
+        if self.in_label:
+            self.labels[-1][1] += data
+
+
+def parse_shipping_options(html:str) -> list:
+    """
+    Purpose - Gets every shipping option of a checkout page as a list of ShippingOption
+
+    Param - html: The checkout page html
+    """
+    parser = ShippingLabelParser()
+    parser.feed(html)
+    parser.close()
+    return [parse_label(label_id, text) for label_id, text in parser.labels]
+
+
+def select_option(options:list, shipping_type:str) -> ShippingOption:
+    """
+    Purpose - Picks a shipping option, None if there are none
+
+    Param - options: List of ShippingOption
+
+    Param - shipping_type: 'cheapest', 'expensive' or part of a label id (falls back to the cheapest)
+    """
+    priced = [option for option in options if option.price is not None]
+    if not priced:
+        return options[0] if options else None
+    # if shipping type is the expensive option
+    if shipping_type == 'expensive':
+        return max(priced, key=lambda option: option.price)
+    # if shipping type is by name
+    if shipping_type != 'cheapest':
+        named = [option for option in options if shipping_type.lower() in option.label_id.lower()]
+        if named:
+            return named[0]
+        # if label is not found
+        print(f'The shipping type recorded: {shipping_type.lower()} was not found as a shipping option.\nShipping options are changed based on number of products at checkout.')
+        print(f'The cheapest shipping method will be selected instead.')
+    # cheapest option
+    return min(priced, key=lambda option: option.price)
+
+
+class ShippingManager:
+    """
+    Purpose - Picks shipping options at checkout, remembering the pick per account, cart and shipping type so repeat checkouts skip the scan
+    """
+    def __init__(self, label_class:str=SHIPPING_LABEL_CLASS) -> None:
+        # class of the shipping labels
+        self.label_class = label_class
+        # (account, cart, shipping type) -> label id
+        self.picks = {}
+        # memo hits and scans
+        self.hits = 0
+        self.scans = 0
+
+    def scan(self, parser:object) -> list:
+        """
+        Purpose - Reads every shipping option on the page in one webdriver round trip, returns a list of (label element, ShippingOption)
+
+        Param - parser: The ParserManager
+        """
+        self.scans += 1
+        return [(element, parse_label(label_id, text)) for element, label_id, text in parser.driver.execute_script(SCAN_SHIPPING_SCRIPT, self.label_class)]
+
+    def choose(self, parser:object, account_name:str, cart:tuple, shipping_type:str) -> object:
+        """
+        Purpose - Gets the label element of the shipping option to click, None if there are no options
+
+        Param - parser: The ParserManager (on the shipping page)
+
+        Param - account_name: Name of the account checking out
+
+        Param - cart: Hashable description of the cart (the options offered depend on it)
+
+        Param - shipping_type: 'cheapest', 'expensive' or part of a label id
+        """
+        key = (account_name, cart, shipping_type)
+        # pick from an earlier checkout of the same cart
+        if key in self.picks:
+            labels = parser.driver.find_elements('css selector', f'label[for="{self.picks[key]}"]')
+            if labels:
+                self.hits += 1
+                return labels[0]
+        # scan and pick
+        options = self.scan(parser)
+        option = select_option([option for element, option in options], shipping_type)
+        if option is None:
+            return None
+        self.picks[key] = option.label_id
+        return next(element for element, scanned in options if scanned is option)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Parse the shipping options of a saved checkout page and show which one would be picked')
+    arg_parser.add_argument('html', help='path of the saved checkout page')
+    arg_parser.add_argument('--type', default='cheapest', help="'cheapest', 'expensive' or part of a label id")
+    args = arg_parser.parse_args()
+    with open(args.html) as f:
+        options = parse_shipping_options(f.read())
+    for option in options:
+        print(f'{option.label_id:<32} {option.carrier:<48} {option.price}')
+    print(f'Picked: {select_option(options, args.type)}')
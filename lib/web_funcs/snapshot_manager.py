@@ -0,0 +1,154 @@
+# local imports
+from lib.funcs import *
+from lib.bot_funcs.event_log_manager import EVENTS
+# other imports
+import hashlib, json, threading, time
+
+
+# recorded sessions
+RECORDING_PATH = convert_path_os('data/recordings/')
+# commands that wait for the page to load (the snapshot is taken right after them, start is the page the recording started on)
+LOAD_COMMANDS = {'start', 'get', 'refresh', 'goBack', 'goForward'}
+# commands that may change the page without waiting for it (the snapshot is taken once a later command sees the change)
+CHANGE_COMMANDS = {'clickElement', 'switchToWindow', 'newWindow', 'closeWindow', 'sendKeysToElement', 'elementClear'}
+# commands after a change that may still see the old page before giving up on a new snapshot
+MAX_PENDING = 50
+# reads the url, load state and markup of the page in one round trip
+SNAPSHOT_SCRIPT = "return [location.href, document.readyState, document.documentElement ? document.documentElement.outerHTML : ''];"
+
+
+def load_recording(path:str) -> tuple:
+    """
+    Purpose - Loads a recorded session, returns (list of command entries, dict of page hash -> html)
+
+    Param - path: Directory of the recording
+    """
+    with open(os.path.join(path, 'commands.jsonl')) as f:
+        commands = [json.loads(line) for line in f if line.strip()]
+    pages = {}
+    for file_name in os.listdir(os.path.join(path, 'pages')):
+        with open(os.path.join(path, 'pages', file_name), encoding='utf-8') as f:
+            pages[file_name.rsplit('.', 1)[0]] = f.read()
+    return commands, pages
+
+
+class SnapshotManager:
+    """
+    Purpose - Records the webdriver commands of a session and snapshots of every page they led to (secrets are redacted before anything is written)
+    """
+    def __init__(self, path:str) -> None:
+        # recording directory with commands.jsonl and pages/<hash>.html
+        self.path = path
+        os.makedirs(os.path.join(self.path, 'pages'), exist_ok=True)
+        self.file = open(os.path.join(self.path, 'commands.jsonl'), 'a')
+        # pages already written
+        self.pages = set(file_name.rsplit('.', 1)[0] for file_name in os.listdir(os.path.join(self.path, 'pages')))
+        # session start, number of commands and the last snapshot
+        self.start = time.perf_counter()
+        self.index = 0
+        self.last_page = None
+        # commands since a change that did not show a new page yet (None if nothing is pending)
+        self.pending = None
+        # commands from different threads do not interleave lines
+        self.lock = threading.Lock()
+
+    def record(self, driver_command:str, params:dict, seconds:float, error:Exception=None) -> dict:
+        """
+        Purpose - Records one command, returns its entry
+
+        Param - driver_command: Name of the webdriver command
+
+        Param - params: Parameters of the command
+
+        Param - seconds: How long the command took
+
+        Param - error: Exception the command raised
+        """
+        with self.lock:
+            entry = {'i':self.index, 't':round(time.perf_counter() - self.start, 4), 'command':driver_command, 'params':self.redact_params(driver_command, params or {}), 'ms':round(seconds * 1000, 3)}
+            if error is not None:
+                entry['error'] = type(error).__name__
+            self.index += 1
+            return entry
+
+    def needs_snapshot(self, driver_command:str) -> bool:
+        """
+        Purpose - Returns true if the page should be snapshot after a command
+
+        Param - driver_command: Name of the webdriver command that just ran
+        """
+        if driver_command in LOAD_COMMANDS:
+            return True
+        if driver_command in CHANGE_COMMANDS:
+            self.pending = 0
+            return False
+        # a read after a change shows the new page once it differs from the last snapshot
+        if self.pending is not None:
+            self.pending += 1
+            if self.pending > MAX_PENDING:
+                self.pending = None
+                return False
+            return True
+        return False
+
+    def snapshot(self, entry:dict, driver_command:str, url:str, ready_state:str, html:str) -> None:
+        """
+        Purpose - Writes a page snapshot (once per distinct page) and ties it to the command entry
+
+        Param - entry: The command entry the snapshot was taken after
+
+        Param - driver_command: Name of the webdriver command
+
+        Param - url: Url of the page
+
+        Param - ready_state: document.readyState of the page
+
+        Param - html: Markup of the page
+        """
+        html = EVENTS.redact_text(html)
+        page = hashlib.blake2b(html.encode('utf-8'), digest_size=16).hexdigest()
+        # still loading or the change has not shown up yet
+        if driver_command not in LOAD_COMMANDS and (ready_state == 'loading' or page == self.last_page):
+            return
+        self.pending = None
+        self.last_page = page
+        entry['url'] = EVENTS.redact_text(url)
+        entry['page'] = page
+        if page not in self.pages:
+            with open(os.path.join(self.path, 'pages', f'{page}.html'), 'w', encoding='utf-8') as f:
+                f.write(html)
+            self.pages.add(page)
+
+    def write(self, entry:dict) -> None:
+        """
+        Purpose - Appends a command entry to the log
+
+        Param - entry: The command entry
+        """
+        with self.lock:
+            self.file.write(json.dumps(entry, default=str) + '\n')
+
+    def redact_params(self, driver_command:str, params:dict) -> dict:
+        """
+        Purpose - Redacts typed text and config secrets from command parameters and shortens scripts
+
+        Param - driver_command: Name of the webdriver command
+
+        Param - params: Parameters of the command
+        """
+        # typed text can be a password or a one time password that is not in the config
+        if driver_command == 'sendKeysToElement':
+            return {**{key:value for key, value in params.items() if key not in ('text', 'value')}, 'text':'***'}
+        params = EVENTS.redact_value(params)
+        # scripts are the same every poll, keep a digest and the start
+        if isinstance(params.get('script'), str):
+            script = params['script'].strip()
+            params['script'] = f"{hashlib.blake2b(script.encode('utf-8'), digest_size=8).hexdigest()}:{' '.join(script.split())[:60]}"
+        return params
+
+    def close(self) -> None:
+        """
+        Purpose - Closes the command log
+        """
+        with self.lock:
+            self.file.close()
@@ -0,0 +1,211 @@
+# local imports
+from lib.bot_funcs.scheduler_manager import is_throttle_response, THROTTLE_STATUSES
+from lib.bot_funcs.metrics_manager import METRICS
+from lib.bot_funcs.event_log_manager import EVENTS
+# other imports
+from html.parser import HTMLParser
+import time, urllib3
+
+
+# out of stock indication
+OTS_STRING = 'Out of stock'.lower()
+# default request headers (look like the desktop browser selenium drives)
+HEADERS = {
+    'User-Agent' : 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36',
+    'Accept' : 'text/html,application/xhtml+xml',
+    'Accept-Encoding' : 'gzip, deflate',
+}
+
+
+class _BlockEnd(Exception):
+    """
+    Purpose - Raised internally to stop parsing once the product block has closed
+    """
+
+
+class ProductBlockParser(HTMLParser):
+    """
+    Purpose - A streaming html parser that only reads the variants inside the prod-right-side block
+    """
+    def __init__(self, block_id:str='prod-right-side', option_class:str='top_10enabled', name_class:str='option_name', meta_class:str='option_meta') -> None:
+        super().__init__(convert_charrefs=True)
+        # class / id names to look for
+        self.block_id = block_id
+        self.option_class = option_class
+        self.name_class = name_class
+        self.meta_class = meta_class
+        # tag name of the block and how deeply nested we are in it
+        self.block_tag = None
+        self.block_depth = 0
+        # field currently being captured ('name' or 'stock') and the tag that closes it
+        self.field = None
+        self.field_tag = None
+        # parsed variants as [name, stock] pairs
+        self.variants = []
+
+    def handle_starttag(self, tag:str, attrs:list) -> None:
+        # if the product block has not been found yet
+        if not self.block_tag:
+            # look for the block id
+            for key, value in attrs:
+                if key == 'id' and value == self.block_id:
+                    self.block_tag = tag
+                    self.block_depth = 1
+            return
+        # track nesting of the block tag so we know when it closes
+        if tag == self.block_tag:
+            self.block_depth += 1
+        # get class list of element
+        classes = ''
+        for key, value in attrs:
+            if key == 'class' and value:
+                classes = value
+        if not classes:
+            return
+        classes = classes.split()
+        # a new variant option
+        if self.option_class in classes:
+            self.variants.append(['', ''])
+        # variant name or stock meta
+        elif self.variants and self.name_class in classes:
+            self.field, self.field_tag = 0, tag
+        elif self.variants and self.meta_class in classes:
+            self.field, self.field_tag = 1, tag
+
+    def handle_endtag(self, tag:str) -> None:
+        # ignore everything outside the product block
+        if not self.block_tag:
+            return
+        # close captured field
+        if self.field is not None and tag == self.field_tag:
+            self.field = None
+        # close product block
+        if tag == self.block_tag:
+            self.block_depth -= 1
+            if self.block_depth <= 0:
+                raise _BlockEnd()
+
+    def handle_data(self, data:str) -> None:
+        # capture text for the current field
+        if self.field is not None:
+            self.variants[-1][self.field] += data
+
+
+def parse_product_block(html:str, block_id:str='prod-right-side') -> list:
+    """
+    Purpose - Parses a product page and returns a list of (variant name, stock string) tuples both lowered and stripped
+
+    Param - html: The product page html
+
+    Param - block_id: The id of the element that holds the variants
+    """
+    # skip everything before the block so the parser only sees the part we care about
+    start = html.find(f'id="{block_id}"')
+    if start < 0:
+        return []
+    start = html.rfind('<', 0, start)
+    # parse block
+    parser = ProductBlockParser(block_id)
+    try:
+        parser.feed(html[start:])
+    # block closed
+    except _BlockEnd:
+        pass
+    # return cleaned variants
+    return [(name.lower().strip(), stock.lower().strip()) for name, stock in parser.variants]
+
+
+class StockManager:
+    """
+    Purpose - Polls a product page over pooled http and reports which valid variants are in stock without a browser
+    """
+    def __init__(self, product_url:str, valid_product_types:list, timeout:float=5.0, http:urllib3.PoolManager=None) -> None:
+        # product url
+        self.product_url = product_url
+        # product types that are valid
+        self.valid_product_types = valid_product_types
+        # pooled http connections (keep alive between polls), may be shared between stock managers
+        self.http = http if http else urllib3.PoolManager(num_pools=2, maxsize=1, headers=HEADERS, retries=False, timeout=urllib3.Timeout(total=timeout))
+        # validators of the last page for conditional requests
+        self.etag = None
+        self.last_modified = None
+        # hash of the last page body and the in stock variants parsed from it
+        self.body_hash = None
+        self.last_in_stock = []
+        # every variant on the page as (name, in stock) from the last successful poll
+        self.last_variants = []
+        # number of polls made and how many of them were unchanged pages
+        self.poll_count = 0
+        self.unchanged_count = 0
+        # duration of last poll
+        self.last_poll_time = 0.0
+        # process wide poll metrics
+        self.poll_counter = METRICS.counter('adafruit_polls_total', 'Product polls', source='http')
+        self.poll_histogram = METRICS.histogram('adafruit_poll_seconds', 'Product poll latency', source='http')
+        # if the last poll was throttled
+        self.throttled = False
+        # if the last poll got the page or a not modified answer (its variants are a real observation)
+        self.ok = False
+
+    """ ------------------------------------------ Fetch Methods ------------------------------------------------ """
+    def fetch(self) -> bytes:
+        """
+        Purpose - Fetches the product page html with conditional headers, returns None if the page has not been modified and an empty string if the request failed
+        """
+        # conditional headers
+        headers = dict(HEADERS)
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        try:
+            response = self.http.request('GET', self.product_url, headers=headers)
+        # connection issues are treated as a missed poll
+        except urllib3.exceptions.HTTPError as e:
+            EVENTS.warning('stock_poll_failed', 'Stock poll failed: {error}', error=str(e), url=self.product_url)
+            self.throttled = False
+            return b''
+        # throttle status or a tiny "Retry later" page
+        self.throttled = response.status in THROTTLE_STATUSES or (response.status == 200 and len(response.data) < 256 and is_throttle_response(response.status, response.data.decode('utf-8', errors='replace')))
+        # page not modified
+        if response.status == 304:
+            return None
+        # bad status
+        if response.status != 200:
+            EVENTS.warning('stock_poll_status', 'Stock poll returned status {status}', status=response.status, url=self.product_url)
+            return b''
+        # store validators
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+        return response.data
+
+    """ ------------------------------------------ Poll Methods ------------------------------------------------ """
+    def poll(self) -> list:
+        """
+        Purpose - Polls the product page once and returns the names of the valid variants that are in stock
+        """
+        # poll start time
+        start = time.perf_counter()
+        # page body
+        body = self.fetch()
+        self.ok = (body is None or bool(body)) and not self.throttled
+        # if the page is unchanged reuse the last result without parsing
+        if body is None or (body and hash(body) == self.body_hash):
+            self.unchanged_count += 1
+            in_stock = self.last_in_stock
+        else:
+            # all variants on page
+            variants = parse_product_block(body.decode('utf-8', errors='replace'))
+            # valid variants that are in stock
+            in_stock = [name for name, stock in variants if name in self.valid_product_types and stock != OTS_STRING]
+            # only cache successful fetches
+            if body:
+                self.body_hash = hash(body)
+                self.last_in_stock = in_stock
+                self.last_variants = [(name, stock != OTS_STRING) for name, stock in variants]
+        # poll stats
+        self.poll_count += 1
+        self.last_poll_time = time.perf_counter() - start
+        self.poll_counter.inc()
+        self.poll_histogram.observe(self.last_poll_time)
+        return in_stock
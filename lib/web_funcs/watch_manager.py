@@ -0,0 +1,193 @@
+# local imports
+from lib.bot_funcs.scheduler_manager import SchedulerManager
+from lib.bot_funcs.history_manager import HistoryManager
+from lib.web_funcs.stock_manager import StockManager, HEADERS
+from lib.bot_funcs.event_log_manager import EVENTS
+# other imports
+from concurrent.futures import ThreadPoolExecutor
+import threading, time, urllib3
+
+
+class WatchEntry:
+    """
+    Purpose - A product page to watch with its own variant filters and purchase limit
+    """
+    def __init__(self, url:str, variants:list, purchase_limit:int=None, http:urllib3.PoolManager=None) -> None:
+        # product url
+        self.url = url
+        # valid variant names (lowered and stripped)
+        self.variants = [variant.lower().strip() for variant in variants]
+        # max number of purchases for this product (None is unlimited)
+        self.purchase_limit = purchase_limit
+        # number of purchases made
+        self.purchases = 0
+        # http poller for this page
+        self.stock_manager = StockManager(self.url, self.variants, http=http)
+
+    @property
+    def active(self) -> bool:
+        """
+        Purpose - Returns true if the entry has not reached its purchase limit
+        """
+        return self.purchase_limit is None or self.purchases < self.purchase_limit
+
+    def __repr__(self) -> str:
+        return f'WatchEntry({self.url!r}, {self.variants!r}, purchases={self.purchases}/{self.purchase_limit})'
+
+
+class WatchManager:
+    """
+    Purpose - Polls many product pages concurrently on a thread pool (the http calls block) and reports the first one with a valid variant in stock
+    """
+    def __init__(self, watch_list:list, concurrency:int=16, timeout:float=5.0, history:HistoryManager=None) -> None:
+        # max polls in flight
+        self.concurrency = concurrency
+        # one connection pool shared by every entry (most entries are on the same host)
+        self.http = urllib3.PoolManager(num_pools=4, maxsize=self.concurrency, block=True, headers=HEADERS, retries=False, timeout=urllib3.Timeout(total=timeout))
+        # watch entries
+        self.entries = [WatchEntry(entry['url'], entry['variants'], entry.get('purchase_limit'), http=self.http) for entry in watch_list]
+        # threads that run the blocking polls of a round
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        # duration of the last full round of polls
+        self.last_round_time = 0.0
+        # stock observation store
+        self.history = history
+        # set to stop waiting for stock (e.g. the config was reloaded)
+        self.interrupted = threading.Event()
+
+    @property
+    def active_entries(self) -> list:
+        """
+        Purpose - Returns the entries that have not reached their purchase limit
+        """
+        return [entry for entry in self.entries if entry.active]
+
+    """ ------------------------------------------ Poll Methods ------------------------------------------------ """
+    def poll_round(self) -> list:
+        """
+        Purpose - Polls every active entry at once and returns a list of (entry, in stock variants) for the entries with stock
+        """
+        # round start time
+        start = time.perf_counter()
+        # poll entries concurrently
+        entries = self.active_entries
+        results = list(self.executor.map(lambda entry: entry.stock_manager.poll(), entries))
+        # round stats
+        self.last_round_time = time.perf_counter() - start
+        # record observations of the entries that answered this round (a failed or throttled poll would repeat the last page)
+        if self.history:
+            for entry in entries:
+                if entry.stock_manager.ok and entry.stock_manager.last_variants:
+                    self.history.record(entry.url, entry.stock_manager.last_variants, entry.stock_manager.last_poll_time)
+        return [(entry, in_stock) for entry, in_stock in zip(entries, results) if in_stock]
+
+    def poll(self) -> list:
+        """
+        Purpose - Runs a single round of polls and returns a list of (entry, in stock variants) for the entries with stock
+        """
+        return self.poll_round()
+
+    def wait_round(self, scheduler:SchedulerManager, signal:object=None) -> tuple:
+        """
+        Purpose - Polls in rounds until an entry has stock and returns (entry, in stock variants)
+
+        Param - scheduler: The scheduler that paces the rounds
+
+        Param - signal: Stock signal shared with other nodes (sightings are sent to them and theirs cut the wait short)
+        """
+        while True:
+            # hand back to the caller
+            if self.interrupted.is_set():
+                return None, []
+            # if every entry has reached its purchase limit
+            if not self.active_entries:
+                time.sleep(scheduler.next_interval())
+                return None, []
+            # poll all entries
+            found = self.poll_round()
+            # a throttled page slows down every entry since they share a host
+            scheduler.record_poll(any(entry.stock_manager.throttled for entry in self.active_entries), bool(found))
+            # if an entry has stock
+            if found:
+                # alert the other nodes
+                if signal:
+                    signal.send(found[0][0].url, found[0][1])
+                return found[0]
+            # wait for the rest of the interval
+            delay = max(0.0, scheduler.next_interval() - self.last_round_time)
+            if not signal:
+                time.sleep(delay)
+                continue
+            # or until another node sees stock on a watched page
+            sighting = signal.wait(delay)
+            entry = self.match_signal(sighting) if sighting else None
+            if entry:
+                return entry, [variant for variant in sighting['variants'] if variant.lower().strip() in entry.variants]
+
+    def match_signal(self, sighting:dict) -> WatchEntry:
+        """
+        Purpose - Gets the active entry a stock signal from another node is about, None if it is not watched here
+
+        Param - sighting: The signal (url and variants)
+        """
+        for entry in self.active_entries:
+            if entry.url == sighting['url'] and any(variant.lower().strip() in entry.variants for variant in sighting['variants']):
+                return entry
+        return None
+
+    def wait_for_stock(self, scheduler:SchedulerManager, signal:object=None) -> tuple:
+        """
+        Purpose - Blocks until a watched product has a valid variant in stock and returns (entry, in stock variants), entry is None if nothing is left to watch
+
+        Param - scheduler: The scheduler that paces the rounds
+
+        Param - signal: Stock signal shared with other nodes
+        """
+        entry, in_stock = self.wait_round(scheduler, signal)
+        # interrupted or nothing left to watch
+        if entry is None:
+            if self.interrupted.is_set():
+                self.interrupted.clear()
+            else:
+                print('\nEvery watched product has reached its purchase limit.')
+            return entry, in_stock
+        # stock prompt
+        EVENTS.info('stock_found', "\nHTTP poll found {variants} in stock at {url} :)", variants=', '.join(in_stock), url=entry.url)
+        return entry, in_stock
+
+    def update(self, watch_list:list) -> None:
+        """
+        Purpose - Replaces the watched pages, entries of pages that are still watched keep their purchases and cached page
+
+        Param - watch_list: List of dicts with url, variants and purchase_limit
+        """
+        entries = {entry.url: entry for entry in self.entries}
+        updated = []
+        for item in watch_list:
+            entry = entries.get(item['url'])
+            # new page or new variant filters
+            if entry is None or entry.variants != [variant.lower().strip() for variant in item['variants']]:
+                updated.append(WatchEntry(item['url'], item['variants'], item.get('purchase_limit'), http=self.http))
+                updated[-1].purchases = entry.purchases if entry else 0
+            else:
+                entry.purchase_limit = item.get('purchase_limit')
+                updated.append(entry)
+        # one assignment so a poll round sees the old or the new list
+        self.entries = updated
+
+    def interrupt(self) -> None:
+        """
+        Purpose - Makes wait_for_stock return (None, []) after the current round
+        """
+        self.interrupted.set()
+
+    def record_purchase(self, entry:WatchEntry) -> None:
+        """
+        Purpose - Records a purchase against an entry
+
+        Param - entry: The watch entry that was purchased
+        """
+        entry.purchases += 1
+        # limit prompt
+        if not entry.active:
+            print(f'\nPurchase limit reached for {entry.url}, no longer watching it.')
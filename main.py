@@ -1,7 +1,9 @@
-from lib.bot import bot
-
 VERSION = "0.0.5"
 
 PRODUCT = 'Raspberry Pi'
 
-bot.run(VERSION, PRODUCT)
\ No newline at end of file
+# guarded so race mode worker processes can import this module without starting a bot
+if __name__ == '__main__':
+    from lib.bot import bot
+
+    bot.run(VERSION, PRODUCT)
\ No newline at end of file
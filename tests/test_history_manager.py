@@ -0,0 +1,47 @@
+# local imports
+from lib.bot_funcs.history_manager import HistoryManager
+# other imports
+from concurrent.futures import ThreadPoolExecutor
+import os, tempfile, unittest
+
+
+class ThreadTests(unittest.TestCase):
+    """
+    Purpose - Using the history store from another thread than the one that built it (the bot builds it on a startup thread)
+    """
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'history.db')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_flush_from_another_thread(self) -> None:
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='startup') as executor:
+            history = executor.submit(HistoryManager, self.path).result()
+        history.record('https://www.adafruit.com/product/1', [('4gb', False), ('8gb', True)], .05)
+        history.flush()
+        self.assertEqual(history.connection.execute('SELECT COUNT(*) FROM observations').fetchone()[0], 2)
+        history.close()
+
+    def test_record_from_many_threads(self) -> None:
+        history = HistoryManager(self.path, flush_every=5)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda index: history.record(f'https://www.adafruit.com/product/{index % 3}', [('4gb', bool(index % 2))], .01), range(100)))
+        history.flush()
+        self.assertEqual(history.connection.execute('SELECT COUNT(*) FROM observations').fetchone()[0], 100)
+        history.close()
+
+    def test_two_stores_share_a_file(self) -> None:
+        first, second = HistoryManager(self.path), HistoryManager(self.path)
+        first.record('https://www.adafruit.com/product/1', [('4gb', True)], .01)
+        second.record('https://www.adafruit.com/product/1', [('4gb', False)], .01)
+        first.flush()
+        second.flush()
+        self.assertEqual(second.connection.execute('SELECT COUNT(*) FROM observations').fetchone()[0], 2)
+        first.close()
+        second.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+# local imports
+from lib.web_funcs.shipping_manager import ShippingOption, ShippingLabelParser, ShippingManager, parse_label, parse_shipping_options, select_option
+# other imports
+import os, unittest
+
+
+# recorded checkout page with four shipping options
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'fixtures', 'checkout_shipping.html')
+# options of the recorded checkout page
+EXPECTED_OPTIONS = [
+    ShippingOption('shipping_usps_first_class', 'USPS First Class Package (2-5 business days)', 5.11),
+    ShippingOption('shipping_usps_priority', 'USPS Priority Mail (1-3 business days)', 9.45),
+    ShippingOption('shipping_ups_ground', 'UPS Ground', 12.87),
+    ShippingOption('shipping_ups_2nd_day_air', 'UPS 2nd Day Air', 24.5),
+]
+
+
+def read_fixture() -> str:
+    """
+    Purpose - Reads the recorded checkout page
+    """
+    with open(FIXTURE_PATH, encoding='utf-8') as f:
+        return f.read()
+
+
+class FakeLabel:
+    """
+    Purpose - Stands in for a label web element of the checkout page
+    """
+    def __init__(self, label_id:str) -> None:
+        self.label_id = label_id
+
+
+class FakeDriver:
+    """
+    Purpose - Answers the two webdriver calls ShippingManager makes from the recorded checkout page
+    """
+    def __init__(self, html:str) -> None:
+        parser = ShippingLabelParser()
+        parser.feed(html)
+        parser.close()
+        # [for id, text] of every label on the page
+        self.labels = parser.labels
+        # calls made
+        self.scripts = 0
+        self.finds = []
+
+    def execute_script(self, script:str, label_class:str) -> list:
+        self.scripts += 1
+        return [[FakeLabel(label_id), label_id, text] for label_id, text in self.labels]
+
+    def find_elements(self, by:str, selector:str) -> list:
+        self.finds.append(selector)
+        return [FakeLabel(label_id) for label_id, text in self.labels if selector == f'label[for="{label_id}"]']
+
+
+class FakeParser:
+    """
+    Purpose - Stands in for the ParserManager on the checkout page
+    """
+    def __init__(self, html:str) -> None:
+        self.driver = FakeDriver(html)
+
+
+class ParseTests(unittest.TestCase):
+    """
+    Purpose - Parsing shipping labels
+    """
+    def test_fixture_records(self) -> None:
+        self.assertEqual(parse_shipping_options(read_fixture()), EXPECTED_OPTIONS)
+
+    def test_label_without_price(self) -> None:
+        self.assertEqual(parse_label('shipping_pickup', 'Local Pickup'), ShippingOption('shipping_pickup', 'Local Pickup', None))
+
+    def test_free_label(self) -> None:
+        self.assertEqual(parse_label('shipping_free', 'USPS Ground Advantage: FREE'), ShippingOption('shipping_free', 'USPS Ground Advantage', 0.0))
+
+    def test_price_with_thousands(self) -> None:
+        self.assertEqual(parse_label(None, ' Freight :\n $1,204.10 ').price, 1204.1)
+
+
+class SelectTests(unittest.TestCase):
+    """
+    Purpose - Picking a shipping option
+    """
+    def setUp(self) -> None:
+        self.options = parse_shipping_options(read_fixture())
+
+    def test_cheapest(self) -> None:
+        self.assertEqual(select_option(self.options, 'cheapest').label_id, 'shipping_usps_first_class')
+
+    def test_expensive(self) -> None:
+        self.assertEqual(select_option(self.options, 'expensive').label_id, 'shipping_ups_2nd_day_air')
+
+    def test_by_name(self) -> None:
+        self.assertEqual(select_option(self.options, 'UPS_GROUND').label_id, 'shipping_ups_ground')
+
+    def test_unknown_name_falls_back_to_cheapest(self) -> None:
+        self.assertEqual(select_option(self.options, 'fedex').label_id, 'shipping_usps_first_class')
+
+    def test_no_options(self) -> None:
+        self.assertIsNone(select_option([], 'cheapest'))
+
+
+class MemoTests(unittest.TestCase):
+    """
+    Purpose - Remembering the pick per account, cart and shipping type
+    """
+    def setUp(self) -> None:
+        self.parser = FakeParser(read_fixture())
+        self.shipping = ShippingManager()
+
+    def test_repeat_checkout_hits(self) -> None:
+        first = self.shipping.choose(self.parser, 'account_1', (('pi', 1),), 'cheapest')
+        second = self.shipping.choose(self.parser, 'account_1', (('pi', 1),), 'cheapest')
+        self.assertEqual((first.label_id, second.label_id), ('shipping_usps_first_class', 'shipping_usps_first_class'))
+        self.assertEqual((self.shipping.scans, self.shipping.hits), (1, 1))
+        self.assertEqual(self.parser.driver.finds, ['label[for="shipping_usps_first_class"]'])
+
+    def test_other_account_misses(self) -> None:
+        self.shipping.choose(self.parser, 'account_1', (('pi', 1),), 'cheapest')
+        self.shipping.choose(self.parser, 'account_2', (('pi', 1),), 'cheapest')
+        self.assertEqual((self.shipping.scans, self.shipping.hits), (2, 0))
+
+    def test_other_cart_misses(self) -> None:
+        self.shipping.choose(self.parser, 'account_1', (('pi', 1),), 'cheapest')
+        self.shipping.choose(self.parser, 'account_1', (('pi', 2),), 'cheapest')
+        self.shipping.choose(self.parser, 'account_1', (('pi', 1), ('case', 1)), 'cheapest')
+        self.assertEqual((self.shipping.scans, self.shipping.hits), (3, 0))
+
+    def test_other_shipping_type_misses(self) -> None:
+        self.shipping.choose(self.parser, 'account_1', (('pi', 1),), 'cheapest')
+        picked = self.shipping.choose(self.parser, 'account_1', (('pi', 1),), 'expensive')
+        self.assertEqual(picked.label_id, 'shipping_ups_2nd_day_air')
+        self.assertEqual((self.shipping.scans, self.shipping.hits), (2, 0))
+
+    def test_missing_label_rescans(self) -> None:
+        self.shipping.choose(self.parser, 'account_1', (('pi', 1),), 'cheapest')
+        # the remembered option is no longer offered
+        self.parser.driver.labels = [label for label in self.parser.driver.labels if label[0] != 'shipping_usps_first_class']
+        picked = self.shipping.choose(self.parser, 'account_1', (('pi', 1),), 'cheapest')
+        self.assertEqual(picked.label_id, 'shipping_usps_priority')
+        self.assertEqual((self.shipping.scans, self.shipping.hits), (2, 0))
+        self.assertEqual(self.shipping.picks[('account_1', (('pi', 1),), 'cheapest')], 'shipping_usps_priority')
+
+    def test_no_options(self) -> None:
+        self.parser.driver.labels = []
+        self.assertIsNone(self.shipping.choose(self.parser, 'account_1', (('pi', 1),), 'cheapest'))
+        self.assertEqual(self.shipping.picks, {})
+
+
+if __name__ == '__main__':
+    unittest.main()